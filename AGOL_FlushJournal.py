@@ -0,0 +1,113 @@
+# ---------------------------------------------------------------------------
+# AGOL_FlushJournal.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Sends the item updates left in the update journal (see modJournal), e.g. after a portal outage, without
+# running a publish or item update.  Only the updates queued for the portal and user of the settings file
+# are sent.  Exits with code 1 when updates failed or are still queued, so a scheduled task can run it
+# again later.
+
+# Command Line Example:
+# AGOL_FlushJournal.py -i "C:\test\settings.ini"
+# Command Line Arguments
+# -i: settings file
+# -w: number of worker threads (optional, default 8)
+#---------------------------------------------------------------------------
+
+import modChange
+import modJournal
+import modSession
+import modTrace
+import modWorkspace
+import collections
+import logging
+import os
+import getopt
+import sys
+import configparser
+
+
+# Defines the entry point into the script
+def main(argv=None):
+    # Set up logging
+    LOG_FILENAME = '.\AGOL_FlushJournal.log'
+    logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s %(levelname)-8s %(threadName)s %(message)s',
+                    datefmt='%a, %d %b %Y %H:%M:%S',
+                    filename=LOG_FILENAME,
+                    filemode='w')
+    logging.info("**************************")
+    logging.info("")
+    # Timing spans and portal requests are appended as JSON lines
+    modTrace.configure('.\AGOL_FlushJournal.trace.jsonl')
+
+    syntax = "Syntax: AGOL_FlushJournal.py -i <settingsfile> [-w <workers>]"
+    settingsFile = None
+    workers = modJournal.WORKERS
+
+    # Read command line options
+    try:
+        opts, args = getopt.getopt(argv, "i:w:", ['settingsfile=', 'workers='])
+    except getopt.GetoptError:
+        print("Invalid option(s). " + syntax)
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-i", "--settingsfile"):
+            settingsFile = a
+        elif o in ("-w", "--workers"):
+            workers = int(a)
+        else:
+            assert False, "unhandled option"
+
+    # Get ini settings file
+    if not settingsFile or not os.path.isfile(settingsFile):
+        print("Input file not found. \nMake sure a valid settings file exists. " + syntax)
+        sys.exit(2)
+
+    config = configparser.ConfigParser()
+    with open(settingsFile) as fp:
+        config.read_file(fp)
+
+    # AGOL Credentials
+    inputUsername = config.get('AGOL', 'USER')
+    inputPswd = config.get('AGOL', 'PASS')
+    inputURL = config.get('AGOL', 'URL')
+    tokenFile = config.get('AGOL', 'TOKENFILE', fallback=None)  # Optional encrypted token cache
+    logging.info("Read settings file")
+
+    # The journal and manifest are in the workspace root
+    workspace = modWorkspace.open_workspace(config)
+    tempDir = workspace.root
+    journal = modJournal.open_journal(tempDir)
+    session = modSession.get_session(inputURL, inputUsername, inputPswd, tokenFile)
+    if not journal.pending(session):
+        print("No queued updates for {0} on {1}".format(inputUsername, inputURL))
+        journal.close()
+        workspace.close()
+        logging.shutdown()
+        return
+
+    manifest = modChange.ChangeManifest(os.path.join(tempDir, "AGOL_manifest.json"))
+    results = journal.flush(session, manifest=manifest, workers=workers)
+    manifest.save()
+    journal.close()
+    workspace.close()
+    counts = collections.Counter(result.status for result in results)
+    print("{0} updated, {1} unchanged, {2} missing, {3} failed, {4} still queued".format(
+        counts['updated'], counts['unchanged'], counts['missing'], counts['failed'], counts['queued']))
+
+    modTrace.summary()
+
+    #Shutdown logging
+    modSession.close_sessions()
+    logging.shutdown()
+    if counts['failed'] or counts['missing'] or counts['queued']:
+        sys.exit(1)
+
+
+# Script start
+if __name__ == "__main__":
+    main(sys.argv[1:])
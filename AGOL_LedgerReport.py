@@ -0,0 +1,96 @@
+# ---------------------------------------------------------------------------
+# AGOL_LedgerReport.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Reports trends from the run ledger written by the publishing and item update scripts.  For each service
+# the latest staging, upload and publish times, SD size, bytes uploaded and request count are compared with
+# the trailing runs before it, and values over the 95th percentile of those runs are flagged as regressions.
+# The run time of each script is reported the same way.  Exits with code 1 when a regression is found, so
+# a scheduled task can alert on it.
+
+# Command Line Example:
+# AGOL_LedgerReport.py -n 30 -r "C:\test\ledger_report.csv"
+# Command Line Arguments
+# -l: ledger file (optional, default AGOL_ledger.sqlite in the workspace root)
+# -s: report only this service (optional)
+# -n: trailing runs to compare with (optional, default 30)
+# -r: report file (optional, default AGOL_LedgerReport.csv)
+#---------------------------------------------------------------------------
+
+import modLedger
+import modWorkspace
+import logging
+import os
+import getopt
+import sys
+
+
+# Defines the entry point into the script
+def main(argv=None):
+    # Set up logging
+    LOG_FILENAME = '.\AGOL_LedgerReport.log'
+    logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s %(levelname)-8s %(message)s',
+                    datefmt='%a, %d %b %Y %H:%M:%S',
+                    filename=LOG_FILENAME,
+                    filemode='w')
+    logging.info("**************************")
+    logging.info("")
+
+    syntax = "Syntax: AGOL_LedgerReport.py [-l <ledgerfile>] [-s <service>] [-n <runs>] [-r <reportfile>]"
+    ledgerFile = os.path.join(modWorkspace.default_root(), modLedger.LEDGER_NAME)
+    service = None
+    window = modLedger.WINDOW
+    reportFile = '.\AGOL_LedgerReport.csv'
+
+    # Read command line options
+    try:
+        opts, args = getopt.getopt(argv, "l:s:n:r:", ['ledger=', 'service=', 'runs=', 'report='])
+    except getopt.GetoptError:
+        print("Invalid option(s). " + syntax)
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-l", "--ledger"):
+            ledgerFile = a
+        elif o in ("-s", "--service"):
+            service = a
+        elif o in ("-n", "--runs"):
+            window = int(a)
+        elif o in ("-r", "--report"):
+            reportFile = a
+        else:
+            assert False, "unhandled option"
+
+    if not os.path.isfile(ledgerFile):
+        print("Ledger file not found: " + ledgerFile)
+        sys.exit(2)
+
+    trends = modLedger.report(ledgerFile, window, service)
+    regressions = modLedger.write_report(trends, reportFile)
+    print("{0:<24} {1:<32} {2:>5} {3:>14} {4:>14} {5:>14}".format("service", "metric", "runs", "last", "median", "p95"))
+    for trend in trends:
+        print("{0:<24} {1:<32} {2:>5} {3:>14} {4:>14} {5:>14}{6}".format(
+            trend.service, trend.metric, trend.runs, _format(trend.last), _format(trend.median), _format(trend.p95),
+            "  REGRESSION" if trend.regression else ""))
+    print("{0} regressions. Report: {1}".format(len(regressions), reportFile))
+
+    #Shutdown logging
+    logging.shutdown()
+    if regressions:
+        sys.exit(1)
+
+
+def _format(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return "{0:.2f}".format(value)
+    return str(value)
+
+
+# Script start
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,11 +1,20 @@
 import arcpy
-from arcgis.gis import GIS
+import modAGOL
+import modChange
+import modSession
+import modTrace
+import modUpload
+import modIndex
+import modSDCache
+import modStaging
+import modShare
+import modLedger
+import modWorkspace
 import logging
 import os
 import getopt
 import sys
 import configparser
-import contextlib
 
 
 if __name__ == "__main__":
@@ -18,12 +27,15 @@ if __name__ == "__main__":
                     filemode='w')
     logging.info("**************************")
     logging.info("")
+    # Timing spans and portal requests are appended as JSON lines
+    modTrace.configure('.\AGOL_UpdateFeatLyr.trace.jsonl')
 
     # Read command line options
+    force = False       # -f: stage and publish even when the project and data are unchanged
     argv = sys.argv[1:]
     if argv:
         try:
-          opts, args = getopt.getopt(argv,"i:",['inputfile='])
+          opts, args = getopt.getopt(argv,"i:f",['inputfile=', 'force'])
         except getopt.GetoptError:
           logging.info("Invalid option(s). Syntax: update.py -i <inputfile>")
           sys.exit(2)
@@ -31,6 +43,8 @@ if __name__ == "__main__":
         for o, a in opts:
             if o in ("-i", "--inputfile"):
                 settingsFile = a
+            elif o in ("-f", "--force"):
+                force = True
             else:
                 assert False, "unhandled option"
 
@@ -52,6 +66,7 @@ if __name__ == "__main__":
         inputUsername = config.get('AGOL', 'USER')
         inputPswd = config.get('AGOL', 'PASS')
         inputURL = config.get('AGOL', 'URL')
+        tokenFile = config.get('AGOL', 'TOKENFILE', fallback=None)  # Optional encrypted token cache
 
         # FS values
         APRX_FILE = config.get('FS_INFO', 'APRX')
@@ -61,6 +76,7 @@ if __name__ == "__main__":
         inediting = config.get('FS_INFO', 'EDITING')
         inexport = config.get('FS_INFO', 'EXPORT')
         inthumbnail = config.get('FS_INFO', 'THUMBNAIL')
+        partSize = config.getint('FS_INFO', 'PARTSIZE', fallback=0) * 1024 * 1024  # Optional multipart upload part size in MB
 
         insummary = config.get('FS_INFO', 'SUMMARY')
         intags = config.get('FS_INFO', 'TAGS')
@@ -81,7 +97,7 @@ if __name__ == "__main__":
         shared = config.get('FS_SHARE', 'SHARE')
         shareeveryone = config.get('FS_SHARE', 'EVERYONE')
         shareorgs = config.get('FS_SHARE', 'ORG')
-        sharegroups = config.get('FS_SHARE', 'GROUPS')  # Groups are by ID. Multiple groups comma separated
+        sharegroups = config.get('FS_SHARE', 'GROUPS')  # Groups by ID or name. Multiple groups comma separated
         if sharegroups is None:
             sharegroups = ''
         fp.close()
@@ -90,7 +106,7 @@ if __name__ == "__main__":
     if not os.path.isfile(APRX_FILE): 
         logging.info("ArcGIS project file not found. \nMake sure a valid file exists.")
         sys.exit()
-    aprx = arcpy.mp.ArcGISProject(APRX_FILE)
+    aprx = modStaging.open_project(APRX_FILE)
     
     maplist = aprx.listMaps(MAP_NAME)
     if not maplist:
@@ -98,29 +114,47 @@ if __name__ == "__main__":
         sys.exit()           
     m = maplist[0]
    
-    # Get current path
-    localPath = sys.path[0]
-
-    # create a temp directory under the script
-    tempDir = os.path.join(localPath, "tempDir")
-    if not os.path.isdir(tempDir):
-        os.mkdir(tempDir)
-    draftSD = os.path.join(tempDir, serviceName + ".sddraft")
-    finalSD = os.path.join(tempDir, serviceName + ".sd")
-
-    # delete existing sd file
-    with contextlib.suppress(FileNotFoundError):
-        os.remove(finalSD)
-
-    # create sd file   
-    arcpy.mp.CreateWebLayerSDDraft(m, draftSD, serviceName, 'MY_HOSTED_SERVICES', 'FEATURE_ACCESS', folderName, enable_editing = blnediting, allow_exporting = blnexport, summary=insummary, tags = intags, description = indescription, credits = incredits, use_limitations = inuselimit)
-    arcpy.StageService_server(draftSD, finalSD)
+    # Stage in a folder of this run, and let one run at a time work on the service
+    workspace = modWorkspace.open_workspace(config)
+    tempDir = workspace.root
+    # Durations, sizes and outcomes of each run are kept in a ledger (see AGOL_LedgerReport.py)
+    modLedger.start_run(os.path.join(tempDir, modLedger.LEDGER_NAME), "AGOL_UpdateFeatLyr")
+    serviceDir = workspace.service_dir(serviceName)
+    draftSD = os.path.join(serviceDir, serviceName + ".sddraft")
+    finalSD = os.path.join(serviceDir, serviceName + ".sd")
+    serviceLock = workspace.lock(serviceName)
+    serviceLock.acquire()
+
+    # Reuse the staged SD while the project, data and parameters are unchanged
+    sdCache = modSDCache.SDCache(os.path.join(tempDir, "sdcache"))
+    draftParams = [serviceName, folderName, blnediting, blnexport, insummary, intags, indescription, incredits, inuselimit]
+    fingerprint = modSDCache.fingerprint(APRX_FILE, m, draftParams)
+    cached = None
+    if not force:
+        cached = sdCache.lookup(serviceName, fingerprint)
+
+    if cached:
+        finalSD = cached["sd"]
+        logging.info("Using cached sd: " + finalSD)
+    else:
+        # create sd file   
+        with modTrace.span("draft", service=serviceName):
+            arcpy.mp.CreateWebLayerSDDraft(m, draftSD, serviceName, 'MY_HOSTED_SERVICES', 'FEATURE_ACCESS', folderName, enable_editing = blnediting, allow_exporting = blnexport, summary=insummary, tags = intags, description = indescription, credits = incredits, use_limitations = inuselimit)
+        with modTrace.span("stage", service=serviceName):
+            arcpy.StageService_server(draftSD, finalSD)
+        record = sdCache.store(serviceName, fingerprint, finalSD)
+        if record:
+            finalSD = record["sd"]
   
     # add sd file to AGOL
-    gis = GIS(inputURL, inputUsername, inputPswd)
+    session = modSession.get_session(inputURL, inputUsername, inputPswd, tokenFile)
+    gis = session.gis
+
+    # Read all of the owner's items once, lookups below are exact title matches
+    index = modIndex.prefetch(session)
 
     #Find SD file, then update or add, then publish
-    sd_items = gis.content.search("title:'" + serviceName +"' AND owner:" + inputUsername, item_type="Service Definition")
+    sd_item = index.item(index.find(serviceName, "Service Definition"))
     item_properties = {"snippet": insummary,
                        "description": indescription,
                        "accessInformation": incredits,
@@ -128,23 +162,46 @@ if __name__ == "__main__":
                        "tags": intags
         }
    
-    if sd_items:
-        sd_item = sd_items[0]
-        updatesuccess = sd_item.update({},finalSD)
+    fs_item = None
+    status = "failed"
+    if cached and cached["published"] and sd_item:
+        logging.info("Service unchanged since last publish, skipped upload and publish")
+        status = "unchanged"
+    elif sd_item:
+        with modTrace.span("upload", service=serviceName, bytes=os.path.getsize(finalSD)):
+            if partSize and os.path.getsize(finalSD) > partSize:
+                updatesuccess = modUpload.upload_sd(session, sd_item, finalSD, partSize, progress=modUpload.log_progress(serviceName))
+            else:
+                updatesuccess = session.call(sd_item.update, {}, finalSD)
         if updatesuccess:
-            sd_item.publish(overwrite="true")           
+            with modTrace.span("publish", service=serviceName):
+                fs_item = session.call(sd_item.publish, overwrite="true", idempotent=False)           
+            sdCache.mark_published(serviceName, fingerprint)
+            status = "published"
+        else:
+            logging.error("SD file update failed for " + serviceName)
     else:    
-        new_sd_item = gis.content.add({}, finalSD)
-        new_sd_item.publish(overwrite="true")
+        with modTrace.span("upload", service=serviceName, bytes=os.path.getsize(finalSD)):
+            new_sd_item = session.call(gis.content.add, {}, finalSD, idempotent=False)
+        with modTrace.span("publish", service=serviceName):
+            fs_item = session.call(new_sd_item.publish, overwrite="true", idempotent=False)
+        sdCache.mark_published(serviceName, fingerprint)
+        status = "published"
        
     #Find new feature service and set sharing
-    fs_items = gis.content.search("title:'" + serviceName +"' AND owner:" + inputUsername, item_type="Feature Service")
-    if fs_items:
-        fs_item = fs_items[0]
-        if os.path.isfile(inthumbnail):
-            fs_item.update(item_properties, thumbnail = inthumbnail)
-        else:
-             fs_item.update(item_properties)
-        if shared:
-            fs_item.share(everyone = shareeveryone, org = shareorgs, groups = sharegroups)
-  
\ No newline at end of file
+    if fs_item is None:
+        fs_item = index.item(index.find(serviceName, "Feature Service"))
+    if fs_item:
+        manifest = modChange.ChangeManifest(os.path.join(tempDir, "AGOL_manifest.json"))
+        modAGOL.update_item_properties(fs_item, item_properties, inthumbnail, manifest, session)
+        manifest.save()
+        if modShare.as_bool(shared):
+            modShare.share_item(session, fs_item, shareeveryone, shareorgs, sharegroups)
+
+    modLedger.service_result(serviceName, status, "SD file update failed" if status == "failed" else "")
+    serviceLock.release()
+    modLedger.finish_run("failed" if status == "failed" else "ok")
+    workspace.close()
+    modTrace.summary()
+    if status == "failed":
+        sys.exit(1)
@@ -10,24 +10,40 @@
 # using the XSL Transform tool found in ArcToolbox
 # An html file is used as to update the item description of the feature service.  The html file can be generated using a the XSL Transform tool 
 # found in ArcToolbos with a custom XSL file 
+# Without an html file the item description is rendered from the xml file with the template in DESCTEMPLATE of
+# [FS_INFO], or the built in template (see modDescribe)
 
 # Command Line Example: 
 # AGOL_UpdateFeatLyr_meta.py -i "C:\test\settings_inputfiles.ini" -d "C:\test\RoadCenterline.html" -x "C:\test\RoadCenterline.xml"
 # Command Line Arguments
 # -i: settings file
-# -d: html file to update item description
+# -d: html file to update item description (optional, by default the description is rendered from the xml file, see modDescribe)
 # -x: xml file extract from metadata
+# -f: force staging and publishing even when the project and data are unchanged
+# With an [FS_SYNC] section in the settings file, changed features are sent with a delta sync and the
+# service is only overwritten when the sync can not be used (no snapshot yet, schema changed)
+# With [TARGET <name>] sections the SD is staged once and published to each of those portals as well,
+# all at the same time (see modFanout).  Delta sync is not used then.
 #---------------------------------------------------------------------------
 
 import modAGOL
+import modSession
+import modTrace
+import modChange
+import modDescribe
+import modFanout
+import modJournal
+import modSDCache
+import modStaging
+import modSync
+import modLedger
+import modMetaCache
+import modWorkspace
 import logging
 import os
 import getopt
 import sys
 import configparser
-import contextlib
-import codecs
-from sympy import true
 
 if __name__ == "__main__":
      # Set up logging
@@ -39,12 +55,16 @@ if __name__ == "__main__":
                     filemode='w')
     logging.info("**************************")
     logging.info("")
+    # Timing spans and portal requests are appended as JSON lines
+    modTrace.configure('.\AGOL_UpdateFeatLyr_meta.trace.jsonl')
 
     # Read command line options
+    force = False
+    htmldescFile = None
     argv = sys.argv[1:]
     if argv:
         try:
-          opts, args = getopt.getopt(argv,"i:d:x:",['inputfile=', 'descfile=', 'xmlfile='])
+          opts, args = getopt.getopt(argv,"i:d:x:f",['inputfile=', 'descfile=', 'xmlfile=', 'force'])
         except getopt.GetoptError:
           logging.info("Invalid option(s). Syntax: update.py -i <inputfile> -d <descfile>")
           sys.exit(2)
@@ -56,6 +76,8 @@ if __name__ == "__main__":
                 htmldescFile = a
             elif o in ("-x", "--xmlfile"):
                 xmlMetaFile = a
+            elif o in ("-f", "--force"):
+                force = True
             else:
                 assert False, "unhandled option"
     else:
@@ -64,7 +86,7 @@ if __name__ == "__main__":
     logging.info("Read options")
 
     # Get metadata files
-    if not os.path.isfile(htmldescFile) or not os.path.isfile(xmlMetaFile): 
+    if (htmldescFile and not os.path.isfile(htmldescFile)) or not os.path.isfile(xmlMetaFile): 
         print("Input metadata file not found. \nMake sure a valid settings files exists.")
         sys.exit()
     logging.info("Found metadata files")
@@ -83,16 +105,19 @@ if __name__ == "__main__":
         inputUsername = config.get('AGOL', 'USER')
         inputPswd = config.get('AGOL', 'PASS')
         inputURL = config.get('AGOL', 'URL')
+        tokenFile = config.get('AGOL', 'TOKENFILE', fallback=None)  # Optional encrypted token cache
 
         # FS values
         APRX_FILE = config.get('FS_INFO', 'APRX')
         MAP_NAME = config.get('FS_INFO', 'MAPNAME')
         serviceName = config.get('FS_INFO', 'SERVICENAME')
         serviceId = config.get('FS_INFO', 'SERVICEID')
+        descTemplate = config.get('FS_INFO', 'DESCTEMPLATE', fallback=None)  # Optional item description template
         SD_Id = config.get('FS_INFO', 'SD_ID')
         folderName = config.get('FS_INFO', 'FOLDERNAME')
         inediting = config.get('FS_INFO', 'EDITING')
         inexport = config.get('FS_INFO', 'EXPORT')
+        partSize = config.getint('FS_INFO', 'PARTSIZE', fallback=0) * 1024 * 1024  # Optional multipart upload part size in MB
      
         # Convert boolean inputs from string... arcpy.mp module does not seem to recognize string, but the ArcGIS Python API does.
         blnediting = True
@@ -106,9 +131,15 @@ if __name__ == "__main__":
         shared = config.get('FS_SHARE', 'SHARE')
         shareeveryone = config.get('FS_SHARE', 'EVERYONE')
         shareorgs = config.get('FS_SHARE', 'ORG')
-        sharegroups = config.get('FS_SHARE', 'GROUPS')  # Groups are by ID. Multiple groups comma separated
+        sharegroups = config.get('FS_SHARE', 'GROUPS')  # Groups by ID or name. Multiple groups comma separated
         if sharegroups is None:
             sharegroups = ''
+
+        # Optional delta sync of features
+        syncSettings = modSync.read_sync_settings(config)
+
+        # Portals to publish to, [AGOL] first
+        publishTargets = modFanout.read_targets(config)
         fp.close()
     logging.info("Read settings file")
 
@@ -117,44 +148,113 @@ if __name__ == "__main__":
         logging.info("ArcGIS project file not found. \nMake sure a valid file exists.")
         sys.exit()
 
-    # create a temp directory under the script for SD & image files
-    # Get current path
-    localPath = sys.path[0]
-    tempDir = os.path.join(localPath, "tempDir")
-    if not os.path.isdir(tempDir):
-        os.mkdir(tempDir)
+    # arcpy is imported in a staging process while the metadata is read and the session signs in.  A delta sync reads
+    # the data with arcpy in this process, a run that syncs first stages here too when it falls back to the overwrite.
+    stagingPool = None
+    if len(publishTargets) > 1 or not syncSettings or force:
+        stagingPool = modStaging.StagingPool(1)
+        stagingPool.warm()
+    try:
+        # SD & image files go to a folder of this run, and one run at a time works on the service
+        workspace = modWorkspace.open_workspace(config)
+        tempDir = workspace.root
+        # Durations, sizes and outcomes of each run are kept in a ledger (see AGOL_LedgerReport.py)
+        modLedger.start_run(os.path.join(tempDir, modLedger.LEDGER_NAME), "AGOL_UpdateFeatLyr_meta")
+        # Parsed metadata is cached between runs, unchanged XML files are not parsed again
+        modMetaCache.configure(os.path.join(tempDir, modMetaCache.CACHE_NAME))
+        serviceDir = workspace.service_dir(serviceName)
+        serviceLock = workspace.lock(serviceName)
+        serviceLock.acquire()
 
-    draftSD = os.path.join(tempDir, serviceName + ".sddraft")
-    finalSD = os.path.join(tempDir, serviceName + ".sd")
-   
-    # delete existing sd file
-    with contextlib.suppress(FileNotFoundError):
-        os.remove(finalSD)
-
-    #Get thumbnail image from xml
-    inthumbnail = tempDir + "/" + serviceName + ".jpg"
-    with contextlib.suppress(FileNotFoundError):
-        os.remove(inthumbnail)
-
-    # Read XML file
-    metadatalist =  modAGOL.metadata_to_list(xmlMetaFile, inthumbnail)
-    logging.info("Read metadata file")
+        draftSD = os.path.join(serviceDir, serviceName + ".sddraft")
+        finalSD = os.path.join(serviceDir, serviceName + ".sd")
+
+        #Get thumbnail image from xml
+        inthumbnail = os.path.join(serviceDir, serviceName + ".jpg")
+
+        # Read XML file
+        descFields = {}
+        metadatalist =  modAGOL.metadata_to_list(xmlMetaFile, inthumbnail, fields=descFields)
+        logging.info("Read metadata file")
      
-    # Create function
-    try:
-        modAGOL.createSD_and_overwrite(APRX_FILE, MAP_NAME, draftSD, serviceName, folderName, blnediting, blnexport, metadatalist[0], metadatalist[2],  metadatalist[1], metadatalist[3], finalSD, inputURL, inputUsername, inputPswd, SD_Id)
-    except:
-        logging.info("createSD_and_overwrite failed") 
-        sys.exit(1)
+        # Sign in once and share the session for publishing and updating
+        session = modSession.get_session(inputURL, inputUsername, inputPswd, tokenFile)
+
+        # Staged SD files are reused while the project, data and parameters are unchanged
+        sdCache = modSDCache.SDCache(os.path.join(tempDir, "sdcache"))
 
-   # Get description from html file..... open at last possible time
-    htmlopen = codecs.open(htmldescFile, 'r', 'utf-8')  
-    htmldesc = htmlopen.read()
-    htmlopen.close()
+        # Stage once and publish to every portal at the same time
+        if len(publishTargets) > 1:
+            htmldesc = modDescribe.read_description(htmldescFile, descFields, descTemplate)
+            manifest = modChange.ChangeManifest(os.path.join(tempDir, "AGOL_manifest.json"))
+            try:
+                targetResults = modFanout.stage_and_fan_out(APRX_FILE, MAP_NAME, draftSD, serviceName, folderName, blnediting, blnexport, metadatalist, finalSD,
+                                                            publishTargets, htmldesc, inthumbnail, manifest, sd_cache=sdCache, force=force, part_size=partSize,
+                                                            pool=stagingPool)
+            except:
+                logging.info("stage_and_fan_out failed")
+                sys.exit(1)
+            manifest.save()
+            failedTargets = [result.target for result in targetResults if result.status == "failed"]
+            serviceLock.release()
+            modLedger.finish_run("failed" if failedTargets else "ok")
+            workspace.close()
+            modTrace.summary()
+            logging.info("Published to {0} portals, {1} failed".format(len(targetResults), len(failedTargets)))
+            sys.exit(1 if failedTargets else 0)
+
+        # Send only the changed features when a sync snapshot exists, otherwise overwrite the service
+        synced = None
+        if syncSettings and not force:
+            syncStore = modSync.sync_store(tempDir, serviceName)
+            try:
+                serviceURL = session.request("content/items/" + serviceId, method="GET")["url"]
+                synced = modSync.sync_service(session, serviceURL, APRX_FILE, MAP_NAME, syncStore, syncSettings)
+                if synced is not None:
+                    modLedger.service_result(serviceName, "synced", "{0} features changed".format(sum(r.adds + r.updates + r.deletes for r in synced)))
+            except Exception as e:
+                logging.info("Sync failed, overwriting instead: " + str(e))
+            syncStore.close()
+
+        # Create function
+        published = None
+        try:
+            if synced is None:
+                published = modAGOL.createSD_and_overwrite(APRX_FILE, MAP_NAME, draftSD, serviceName, folderName, blnediting, blnexport, metadatalist[0], metadatalist[2],  metadatalist[1], metadatalist[3], finalSD, session, SD_Id, sd_cache=sdCache, force=force, part_size=partSize, pool=stagingPool)
+                if syncSettings and published is not False:
+                    # The service now holds the current data, the next run syncs from here
+                    syncStore = modSync.sync_store(tempDir, serviceName)
+                    modSync.record_baseline(syncStore, APRX_FILE, MAP_NAME, syncSettings, pool=stagingPool)
+                    syncStore.close()
+        except:
+            logging.info("createSD_and_overwrite failed") 
+            sys.exit(1)
+        if published is False:
+            # The service did not get the current data, the sync snapshot stays at what it last received
+            logging.error("SD file update or publish failed for " + serviceName)
+            sys.exit(1)
+    finally:
+        if stagingPool is not None:
+            stagingPool.close()
+
+   # Get description from html file..... open at last possible time, or render it from the xml file
+    htmldesc = modDescribe.read_description(htmldescFile, descFields, descTemplate)
 
     #Update item information
-    modAGOL.update_featureservice(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], htmldesc, inthumbnail, serviceId, inputURL, inputUsername, inputPswd, shared,
-                             shareeveryone, shareorgs, sharegroups)
+    manifest = modChange.ChangeManifest(os.path.join(tempDir, "AGOL_manifest.json"))
+    # The update is written to the journal first, updates left queued by earlier runs are sent with it
+    journal = modJournal.open_journal(tempDir)
+    modAGOL.update_featureservice(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], htmldesc, inthumbnail, serviceId, session, shared,
+                             shareeveryone, shareorgs, sharegroups, manifest=manifest, journal=journal)
+    failed = modJournal.log_failures(journal.flush(session, manifest=manifest))
+    journal.close()
+    manifest.save()
+    serviceLock.release()
+    modLedger.finish_run("failed" if failed else "ok")
+    workspace.close()
+    modTrace.summary()
+    if failed:
+        sys.exit(1)
    
     logging.info("Updated feature service")
 
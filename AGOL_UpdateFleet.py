@@ -0,0 +1,129 @@
+# ---------------------------------------------------------------------------
+# AGOL_UpdateFleet.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Publishes many hosted feature services in one run, each described by a settings file in the same
+# layout as AGOL_UpdateFeatLyr_meta.py.  SD files are staged in parallel processes while already staged
+# services are uploaded, published, updated and shared in parallel threads.
+# Services are listed either as -i settings files (with DESCFILE and XMLFILE in [FS_INFO]) or in a CSV
+# manifest with columns INI, DESCFILE, XMLFILE.  Service names must be unique within a run.
+
+# Command Line Example:
+# AGOL_UpdateFleet.py -m "C:\test\services.csv" -s 2 -u 4 -q 4
+# AGOL_UpdateFleet.py -i "C:\test\Parcels.ini" -i "C:\test\Roads.ini"
+# Command Line Arguments
+# -i: service settings file (repeat for each service)
+# -m: CSV manifest of services
+# -s: staging processes (optional, default 2)
+# -u: upload threads (optional, default 4)
+# -q: staged SD files allowed to wait for upload (optional, default 4)
+# -f: force staging and publishing even when the project and data are unchanged
+# -r: report file (optional, default AGOL_UpdateFleet.csv)
+#---------------------------------------------------------------------------
+
+import modFleet
+import modSession
+import modTrace
+import modLedger
+import modMetaCache
+import modWorkspace
+import logging
+import os
+import getopt
+import sys
+import time
+
+
+# Defines the entry point into the script
+def main(argv=None):
+    # Set up logging
+    LOG_FILENAME = '.\AGOL_UpdateFleet.log'
+    logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s %(levelname)-8s %(threadName)s %(message)s',
+                    datefmt='%a, %d %b %Y %H:%M:%S',
+                    filename=LOG_FILENAME,
+                    filemode='w')
+    logging.info("**************************")
+    logging.info("")
+    # Timing spans and portal requests are appended as JSON lines
+    modTrace.configure('.\AGOL_UpdateFleet.trace.jsonl')
+
+    syntax = "Syntax: AGOL_UpdateFleet.py (-m <manifest> | -i <settingsfile> ...) [-s <stageworkers>] [-u <uploadworkers>] [-q <queuedepth>] [-f] [-r <reportfile>]"
+    settingsFiles = []
+    manifestFile = None
+    stageWorkers = modFleet.STAGE_WORKERS
+    ioWorkers = modFleet.IO_WORKERS
+    queueDepth = modFleet.QUEUE_DEPTH
+    force = False
+    reportFile = '.\AGOL_UpdateFleet.csv'
+
+    # Read command line options
+    try:
+        opts, args = getopt.getopt(argv, "i:m:s:u:q:fr:", ['settingsfile=', 'manifest=', 'stageworkers=', 'uploadworkers=', 'queuedepth=', 'force', 'report='])
+    except getopt.GetoptError:
+        print("Invalid option(s). " + syntax)
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-i", "--settingsfile"):
+            settingsFiles.append(a)
+        elif o in ("-m", "--manifest"):
+            manifestFile = a
+        elif o in ("-s", "--stageworkers"):
+            stageWorkers = int(a)
+        elif o in ("-u", "--uploadworkers"):
+            ioWorkers = int(a)
+        elif o in ("-q", "--queuedepth"):
+            queueDepth = int(a)
+        elif o in ("-f", "--force"):
+            force = True
+        elif o in ("-r", "--report"):
+            reportFile = a
+        else:
+            assert False, "unhandled option"
+
+    if not settingsFiles and not manifestFile:
+        print("No services given. " + syntax)
+        sys.exit(2)
+
+    services = []
+    try:
+        if manifestFile:
+            services.extend(modFleet.read_manifest(manifestFile))
+        for settingsFile in settingsFiles:
+            services.append(modFleet.read_service_settings(settingsFile))
+    except (IOError, OSError, ValueError, KeyError) as e:
+        logging.info("Invalid service list: " + str(e))
+        print("Invalid service list: " + str(e))
+        sys.exit(2)
+    logging.info("Read {0} service settings".format(len(services)))
+
+    # Scratch files go to a folder of this run under the workspace root (tempDir under the script by default)
+    workspace = modWorkspace.open_workspace()
+    tempDir = workspace.root
+    # Durations, sizes and outcomes of each run are kept in a ledger (see AGOL_LedgerReport.py)
+    modLedger.start_run(os.path.join(tempDir, modLedger.LEDGER_NAME), "AGOL_UpdateFleet")
+    # Parsed metadata is cached between runs, unchanged XML files are not parsed again
+    modMetaCache.configure(os.path.join(tempDir, modMetaCache.CACHE_NAME))
+
+    start = time.time()
+    results = modFleet.run_fleet(services, tempDir, stageWorkers, ioWorkers, queueDepth, force, workspace=workspace)
+    counts = modFleet.write_report(results, reportFile, time.time() - start)
+    modLedger.finish_run("failed" if counts['failed'] else "ok")
+    workspace.close()
+    print("{0} published, {1} unchanged, {2} failed. Report: {3}".format(counts['published'], counts['unchanged'], counts['failed'], reportFile))
+
+    modTrace.summary()
+
+    #Shutdown logging
+    modSession.close_sessions()
+    logging.shutdown()
+    if counts['failed']:
+        sys.exit(1)
+
+
+# Script start
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -10,24 +10,31 @@
 # using the XSL Transform tool found in ArcToolbox
 # An html file is used as to update the item description of the feature service.  The html file can be generated using a the XSL Transform tool 
 # found in ArcToolbox with a custom XSL file 
+# Without an html file the item description is rendered from the xml file with the template in DESCTEMPLATE of
+# [FS_INFO], or the built in template (see modDescribe)
 
 # Command Line Example: 
 # AGOL_UpdateItemInfo.py -i "C:\test\settings_inputfiles.ini" -d "C:\test\RoadCenterline.html" -x "C:\test\RoadCenterline.xml"
 # Command Line Arguments
 # -i: settings file
-# -d: html file to update item description
+# -d: html file to update item description (optional, by default the description is rendered from the xml file, see modDescribe)
 # -x: xml file extract from metadata
 #---------------------------------------------------------------------------
 
 import modAGOL
+import modSession
+import modTrace
+import modChange
+import modDescribe
+import modJournal
+import modLedger
+import modMetaCache
+import modWorkspace
 import logging
 import os
 import getopt
 import sys
 import configparser
-import contextlib
-import codecs
-from sympy import true
 
 if __name__ == "__main__":
      # Set up logging
@@ -39,8 +46,11 @@ if __name__ == "__main__":
                     filemode='w')
     logging.info("**************************")
     logging.info("")
+    # Timing spans and portal requests are appended as JSON lines
+    modTrace.configure('.\AGOL_UpdateItemInfo.trace.jsonl')
 
     # Read command line options
+    htmldescFile = None
     argv = sys.argv[1:]
     if argv:
         try:
@@ -64,7 +74,7 @@ if __name__ == "__main__":
     logging.info("Read options")
 
     # Get metadata files
-    if not os.path.isfile(htmldescFile) or not os.path.isfile(xmlMetaFile): 
+    if (htmldescFile and not os.path.isfile(htmldescFile)) or not os.path.isfile(xmlMetaFile): 
         print("Input metadata file not found. \nMake sure a valid settings files exists.")
         sys.exit()
     logging.info("Found metadata files")
@@ -83,39 +93,58 @@ if __name__ == "__main__":
         inputUsername = config.get('AGOL', 'USER')
         inputPswd = config.get('AGOL', 'PASS')
         inputURL = config.get('AGOL', 'URL')
+        tokenFile = config.get('AGOL', 'TOKENFILE', fallback=None)  # Optional encrypted token cache
 
         # FS values
         serviceName = config.get('FS_INFO', 'SERVICENAME')
         serviceId = config.get('FS_INFO', 'SERVICEID')
+        descTemplate = config.get('FS_INFO', 'DESCTEMPLATE', fallback=None)  # Optional item description template
        
     
         fp.close()
     logging.info("Read settings file")
 
 
-    # create a temp directory under the script for SD & image files
-    # Get current path
-    localPath = sys.path[0]
-    tempDir = os.path.join(localPath, "tempDir")
-    if not os.path.isdir(tempDir):
-        os.mkdir(tempDir)
+    # Image files go to a folder of this run, and one run at a time works on the service
+    workspace = modWorkspace.open_workspace(config)
+    tempDir = workspace.root
+    # Durations, sizes and outcomes of each run are kept in a ledger (see AGOL_LedgerReport.py)
+    modLedger.start_run(os.path.join(tempDir, modLedger.LEDGER_NAME), "AGOL_UpdateItemInfo")
+    # Parsed metadata is cached between runs, unchanged XML files are not parsed again
+    modMetaCache.configure(os.path.join(tempDir, modMetaCache.CACHE_NAME))
+    serviceLock = workspace.lock(serviceName)
+    serviceLock.acquire()
 
     #Get thumbnail image from xml
-    inthumbnail = tempDir + "/" + serviceName + ".jpg"
-    with contextlib.suppress(FileNotFoundError):
-        os.remove(inthumbnail)
+    inthumbnail = os.path.join(workspace.service_dir(serviceName), serviceName + ".jpg")
 
     # Read XML file
-    metadatalist =  modAGOL.metadata_to_list(xmlMetaFile, inthumbnail)
+    descFields = {}
+    metadatalist =  modAGOL.metadata_to_list(xmlMetaFile, inthumbnail, fields=descFields)
     logging.info("Read metadata file")
      
-   # Get description from html file..... open at last possible time
-    htmlopen = codecs.open(htmldescFile, 'r', 'utf-8')  
-    htmldesc = htmlopen.read()
-    htmlopen.close()
+   # Get description from html file..... open at last possible time, or render it from the xml file
+    htmldesc = modDescribe.read_description(htmldescFile, descFields, descTemplate)
 
     #Update item information
-    modAGOL.update_iteminfo(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], htmldesc, inthumbnail, serviceId, inputURL, inputUsername, inputPswd)
+    session = modSession.get_session(inputURL, inputUsername, inputPswd, tokenFile)
+    manifest = modChange.ChangeManifest(os.path.join(tempDir, "AGOL_manifest.json"))
+    # The update is written to the journal first, updates left queued by earlier runs are sent with it
+    journal = modJournal.open_journal(tempDir)
+    modAGOL.update_iteminfo(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], htmldesc, inthumbnail, serviceId, session, manifest=manifest, journal=journal)
+    flushed = journal.flush(session, manifest=manifest)
+    journal.close()
+    manifest.save()
+    result = dict((result.itemid, result) for result in flushed).get(serviceId)
+    modLedger.service_result(serviceName, result.status if result else "updated", result.message if result else "")
+    # Any failed update, of this item or one queued by an earlier run, fails the run
+    failed = modJournal.log_failures(flushed)
+    serviceLock.release()
+    modLedger.finish_run("failed" if failed else "ok")
+    workspace.close()
+    modTrace.summary()
+    if failed:
+        sys.exit(1)
    
     logging.info("Updated feature service item information")
 
@@ -0,0 +1,175 @@
+# ---------------------------------------------------------------------------
+# AGOL_UpdateItemInfo_Batch.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Updates ArcGIS Online item information for many items at once.  Item Ids and metadata file names
+# are listed in a CSV file, SQLite table or ArcGIS table (fields AGOL_ITEMID, FILENAME).  For each item
+# <FILENAME>.xml and <FILENAME>.html are read from the metadata directory, without the html file the
+# description is rendered from the xml file (see modDescribe).  Items are updated in
+# parallel by a pool of worker threads, and a CSV report of each item result is written at the end.
+# Metadata files of larger batches are parsed in a pool of processes, one per core, ahead of the updates.
+# Updates are written to the update journal in the workspace first (see modJournal), items the portal could
+# not take while it was down stay queued and are sent by the next run.
+# arcpy is only needed when the item list is an ArcGIS table.
+
+# Command Line Example:
+# AGOL_UpdateItemInfo_Batch.py -i "C:\test\settings.ini" -t "C:\test\items.csv" -d "C:\test\Metadata_Export" -w 8
+# Command Line Arguments
+# -i: settings file
+# -t: item table (.csv, .sqlite or ArcGIS table)
+# -d: metadata directory
+# -w: number of worker threads (optional, default 8)
+# -p: number of metadata parsing processes (optional, default one per core for 20 or more items, 0 to parse in the worker threads)
+# -s: table name inside a SQLite database (optional, default ITEMINFO)
+# -r: report file (optional, default AGOL_UpdateItemInfo_Batch.csv)
+# -c: change manifest file (optional, default tempDir\AGOL_manifest.json)
+# -v: verify the metadata cache, hash every XML file instead of trusting size and modification time
+# -e: item description template for items without an html file (optional, default the built in template)
+#---------------------------------------------------------------------------
+
+import modBatch
+import modChange
+import modIndex
+import modJournal
+import modMetaCache
+import modSession
+import modTrace
+import modLedger
+import modWorkspace
+import logging
+import os
+import getopt
+import sys
+import time
+import configparser
+
+
+# Defines the entry point into the script
+def main(argv=None):
+    # Set up logging
+    LOG_FILENAME = '.\AGOL_UpdateItemInfo_Batch.log'
+    logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s %(levelname)-8s %(threadName)s %(message)s',
+                    datefmt='%a, %d %b %Y %H:%M:%S',
+                    filename=LOG_FILENAME,
+                    filemode='w')
+    logging.info("**************************")
+    logging.info("")
+    # Timing spans and portal requests are appended as JSON lines
+    modTrace.configure('.\AGOL_UpdateItemInfo_Batch.trace.jsonl')
+
+    syntax = "Syntax: AGOL_UpdateItemInfo_Batch.py -i <settingsfile> -t <inputtable> -d <metadatadirectory> [-w <workers>] [-p <parseworkers>] [-s <sqlitetable>] [-r <reportfile>] [-c <changemanifest>] [-v] [-e <template>]"
+    settingsFile = InputTable = metadir = None
+    workers = modBatch.WORKERS
+    parseWorkers = None
+    sqliteTable = modBatch.SQLITE_TABLE
+    reportFile = '.\AGOL_UpdateItemInfo_Batch.csv'
+    manifestFile = None
+    verify = False
+    template = None
+
+    # Read command line options
+    try:
+        opts, args = getopt.getopt(argv, "i:t:d:w:p:s:r:c:ve:", ['settingsfile=', 'inputtable=', 'metadatadirectory=', 'workers=', 'parseworkers=', 'sqlitetable=', 'report=', 'changemanifest=', 'verify', 'template='])
+    except getopt.GetoptError:
+        print("Invalid option(s). " + syntax)
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-i", "--settingsfile"):
+            settingsFile = a
+        elif o in ("-t", "--inputtable"):
+            InputTable = a
+        elif o in ("-d", "--metadatadirectory"):
+            metadir = a
+        elif o in ("-w", "--workers"):
+            workers = int(a)
+        elif o in ("-p", "--parseworkers"):
+            parseWorkers = int(a)
+        elif o in ("-s", "--sqlitetable"):
+            sqliteTable = a
+        elif o in ("-r", "--report"):
+            reportFile = a
+        elif o in ("-c", "--changemanifest"):
+            manifestFile = a
+        elif o in ("-v", "--verify"):
+            verify = True
+        elif o in ("-e", "--template"):
+            template = a
+        else:
+            assert False, "unhandled option"
+
+    if not settingsFile or not InputTable or not metadir:
+        print("Missing option(s). " + syntax)
+        sys.exit(2)
+
+    if template and not os.path.isfile(template):
+        print("Template file not found: " + template)
+        sys.exit(2)
+
+    #get input directory and table
+    if not os.path.isdir(metadir):
+        print("Input directory not found. \nMake sure a valid path exists.")
+        sys.exit()
+
+    # Get ini settings file
+    if not os.path.isfile(settingsFile):
+        print("Input file not found. \nMake sure a valid settings file exists.")
+        sys.exit()
+
+    config = configparser.ConfigParser()
+    with open(settingsFile) as fp:
+        config.read_file(fp)
+
+    # AGOL Credentials
+    inputUsername = config.get('AGOL', 'USER')
+    inputPswd = config.get('AGOL', 'PASS')
+    inputURL = config.get('AGOL', 'URL')
+    tokenFile = config.get('AGOL', 'TOKENFILE', fallback=None)  # Optional encrypted token cache
+    logging.info("Read settings file")
+
+    # Thumbnails go to a folder of this run, the manifest stays in the workspace root
+    workspace = modWorkspace.open_workspace(config)
+    tempDir = workspace.root
+    # Durations, sizes and outcomes of each run are kept in a ledger (see AGOL_LedgerReport.py)
+    modLedger.start_run(os.path.join(tempDir, modLedger.LEDGER_NAME), "AGOL_UpdateItemInfo_Batch")
+
+    # Hashes of what was last pushed to each item, so unchanged items are skipped
+    if not manifestFile:
+        manifestFile = os.path.join(tempDir, "AGOL_manifest.json")
+    manifest = modChange.ChangeManifest(manifestFile)
+    # Parsed metadata is cached between runs, unchanged XML files are not parsed again
+    modMetaCache.configure(os.path.join(tempDir, modMetaCache.CACHE_NAME), verify=verify)
+
+    start = time.time()
+    items = modBatch.read_items(InputTable, sqliteTable)
+    session = modSession.get_session(inputURL, inputUsername, inputPswd, tokenFile)
+    index = modIndex.prefetch(session)
+    # Updates are written to the journal first and sent in batches, with those left queued by earlier runs
+    journal = modJournal.open_journal(tempDir)
+    results = modBatch.run_batch(items, metadir, workspace.run_dir, session, workers, index, manifest, parseWorkers, journal, template)
+    journal.close()
+    manifest.save()
+    counts = modBatch.write_report(results, reportFile, time.time() - start)
+    # One ledger row per item, missing items count as failed like in the update journal
+    for result in results:
+        modLedger.service_result(result.itemid, result.status, result.message)
+    failed = counts['failed'] + counts['missing']
+    modLedger.finish_run("failed" if failed else "ok")
+    workspace.close()
+    print("{0} updated, {1} unchanged, {2} missing, {3} failed, {4} queued. Report: {5}".format(counts['updated'], counts['unchanged'], counts['missing'], counts['failed'], counts['queued'], reportFile))
+
+    modTrace.summary()
+
+    #Shutdown logging
+    modSession.close_sessions()
+    logging.shutdown()
+    if failed:
+        sys.exit(1)
+
+
+# Script start
+if __name__ == "__main__":
+    main(sys.argv[1:])
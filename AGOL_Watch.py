@@ -0,0 +1,157 @@
+# ---------------------------------------------------------------------------
+# AGOL_Watch.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Watches metadata exports and service projects and pushes changes to ArcGIS Online as they happen,
+# instead of waiting for the nightly batch.  Items are listed as for AGOL_UpdateItemInfo_Batch.py (a table
+# with AGOL_ITEMID and FILENAME, metadata files in a directory) and services as for AGOL_UpdateFleet.py
+# (a CSV manifest of service settings files).  When a metadata file changes the item information is updated,
+# and when a project, data source or metadata file of a service changes the service is restaged and
+# republished.  Changes are pushed after the files have been quiet for the debounce time, so one export
+# of many files is pushed together.  The process, portal session and item index stay warm between changes.
+# Stop with Ctrl+C.
+
+# Command Line Example:
+# AGOL_Watch.py -i "C:\test\settings.ini" -t "C:\test\items.csv" -d "C:\test\Metadata_Export" -m "C:\test\services.csv"
+# Command Line Arguments
+# -i: settings file (portal sign in for the items)
+# -t: item table (.csv, .sqlite or ArcGIS table), needs -d
+# -d: metadata directory
+# -m: CSV manifest of services
+# -w: number of item worker threads (optional, default 8)
+# -p: seconds between checks for changes (optional, default 5)
+# -b: debounce seconds (optional, default 10)
+# -a: push all items and services once at start (unchanged ones are skipped)
+#---------------------------------------------------------------------------
+
+import modBatch
+import modChange
+import modFleet
+import modIndex
+import modMetaCache
+import modSession
+import modTrace
+import modWorkspace
+import modWatch
+import logging
+import os
+import getopt
+import sys
+import configparser
+
+
+# Defines the entry point into the script
+def main(argv=None):
+    # Set up logging
+    LOG_FILENAME = '.\AGOL_Watch.log'
+    logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s %(levelname)-8s %(threadName)s %(message)s',
+                    datefmt='%a, %d %b %Y %H:%M:%S',
+                    filename=LOG_FILENAME,
+                    filemode='w')
+    logging.info("**************************")
+    logging.info("")
+    # Timing spans and portal requests are appended as JSON lines
+    modTrace.configure('.\AGOL_Watch.trace.jsonl')
+
+    syntax = "Syntax: AGOL_Watch.py [-i <settingsfile> -t <inputtable> -d <metadatadirectory>] [-m <manifest>] [-w <workers>] [-p <interval>] [-b <debounce>] [-a]"
+    settingsFile = InputTable = metadir = manifestFile = None
+    workers = modBatch.WORKERS
+    interval = modWatch.INTERVAL
+    debounce = modWatch.DEBOUNCE
+    pushAll = False
+
+    # Read command line options
+    try:
+        opts, args = getopt.getopt(argv, "i:t:d:m:w:p:b:a", ['settingsfile=', 'inputtable=', 'metadatadirectory=', 'manifest=', 'workers=', 'interval=', 'debounce=', 'all'])
+    except getopt.GetoptError:
+        print("Invalid option(s). " + syntax)
+        sys.exit(2)
+
+    for o, a in opts:
+        if o in ("-i", "--settingsfile"):
+            settingsFile = a
+        elif o in ("-t", "--inputtable"):
+            InputTable = a
+        elif o in ("-d", "--metadatadirectory"):
+            metadir = a
+        elif o in ("-m", "--manifest"):
+            manifestFile = a
+        elif o in ("-w", "--workers"):
+            workers = int(a)
+        elif o in ("-p", "--interval"):
+            interval = float(a)
+        elif o in ("-b", "--debounce"):
+            debounce = float(a)
+        elif o in ("-a", "--all"):
+            pushAll = True
+        else:
+            assert False, "unhandled option"
+
+    if not InputTable and not manifestFile:
+        print("Nothing to watch. " + syntax)
+        sys.exit(2)
+    if InputTable and (not settingsFile or not metadir):
+        print("An item table needs a settings file and a metadata directory. " + syntax)
+        sys.exit(2)
+
+    # Scratch files go to a folder of this run under the workspace root (tempDir under the script by default)
+    workspace = modWorkspace.open_workspace()
+    tempDir = workspace.root
+    # Parsed metadata is cached between runs, unchanged XML files are not parsed again
+    modMetaCache.configure(os.path.join(tempDir, modMetaCache.CACHE_NAME))
+
+    # One manifest for items and services, kept in memory for the whole watch
+    manifest = modChange.ChangeManifest(os.path.join(tempDir, "AGOL_manifest.json"))
+
+    items = []
+    session = index = None
+    if InputTable:
+        if not os.path.isdir(metadir):
+            print("Input directory not found. \nMake sure a valid path exists.")
+            sys.exit()
+        if not os.path.isfile(settingsFile):
+            print("Input file not found. \nMake sure a valid settings file exists.")
+            sys.exit()
+
+        config = configparser.ConfigParser()
+        with open(settingsFile) as fp:
+            config.read_file(fp)
+
+        # AGOL Credentials
+        inputUsername = config.get('AGOL', 'USER')
+        inputPswd = config.get('AGOL', 'PASS')
+        inputURL = config.get('AGOL', 'URL')
+        tokenFile = config.get('AGOL', 'TOKENFILE', fallback=None)  # Optional encrypted token cache
+        logging.info("Read settings file")
+
+        items = modBatch.read_items(InputTable)
+        session = modSession.get_session(inputURL, inputUsername, inputPswd, tokenFile)
+        index = modIndex.prefetch(session)
+
+    services = []
+    if manifestFile:
+        try:
+            services = modFleet.read_manifest(manifestFile)
+        except (IOError, OSError, ValueError, KeyError) as e:
+            logging.info("Invalid service list: " + str(e))
+            print("Invalid service list: " + str(e))
+            sys.exit(2)
+        logging.info("Read {0} service settings".format(len(services)))
+
+    modWatch.run_watch(items, metadir, services, tempDir, session, index, manifest, workers,
+                       interval=interval, debounce=debounce, push_all=pushAll, workspace=workspace)
+    manifest.save()
+    workspace.close()
+    modTrace.summary()
+
+    #Shutdown logging
+    modSession.close_sessions()
+    logging.shutdown()
+
+
+# Script start
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,369 @@
+# ---------------------------------------------------------------------------
+# bench_agol.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Offline benchmarks.  Runs the publishing and item update code against a local fake portal
+# (fakeportal.py) and an arcpy stub (stubs/arcpy), so throughput can be measured without an
+# ArcGIS Online organization or an ArcGIS Pro license.  The arcgis and requests packages are
+# still required for the portal scenarios; the parse scenario needs only the standard library.
+# Scenarios:
+#   parse    - metadata_to_list on a large metadata XML with an embedded thumbnail, parsed and from the metadata cache
+#   iteminfo - batch item information updates of 10, 100 and 1000 items, with empty metadata and thumbnail caches
+#   publish  - stage, upload and overwrite publish of a single service
+#   sync     - delta sync of a 20000 feature layer after 1% of its rows changed, against the stand-in feature service
+#   import   - cold import time of the modules and of the item information script, in fresh interpreters
+#              without the arcpy stub, and which heavy packages (arcpy, arcgis, sympy) each one loads.  A module
+#              that fails to import is reported as failed.  With -b the same modules are timed in a git worktree
+#              of that commit, for a before and after comparison.
+
+# Command Line Example:
+# python benchmarks\bench_agol.py -s iteminfo -l 0.05 -w 8
+# Command Line Arguments
+# -s: scenario: parse, iteminfo, publish, sync, import or all (default all)
+# -l: latency in seconds added to every portal request (default 0.02)
+# -t: portal rate limit in requests per second, 0 for none (default 0)
+# -w: worker threads for item updates (default 8)
+# -m: size of the fake SD file in MB (default 10)
+# -x: size of the embedded thumbnail in the large metadata XML in MB (default 20)
+# -j: write results as json to this file
+# -b: git commit to compare import times with (optional, e.g. HEAD~1)
+#---------------------------------------------------------------------------
+
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "stubs"))
+sys.path.insert(1, os.path.dirname(BENCH_DIR))
+
+import base64
+import csv
+import getopt
+import json
+import logging
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import arcpy
+import fakeportal
+import modAGOL
+
+
+ITEM_COUNTS = [10, 100, 1000]
+SYNC_ROWS = 20000
+SYNC_CHANGES = (150, 30, 20)    # Rows updated, added and deleted between the two syncs
+IMPORT_TARGETS = ["modAGOL", "modBatch", "modSession", "modIndex", "modFleet", "AGOL_UpdateItemInfo", "AGOL_UpdateItemInfo_Batch"]
+HEAVY_MODULES = ["arcpy", "arcgis", "sympy", "requests"]
+IMPORT_REPEATS = 5
+IMPORT_CODE = ("import sys, time\n"
+               "start = time.perf_counter()\n"
+               "import {0}\n"
+               "print(time.perf_counter() - start)\n"
+               "print(' '.join(name for name in {1!r} if name in sys.modules))\n")
+
+
+# Function: write_metadata
+# Description: Write a metadata XML export with an embedded thumbnail of thumb_bytes random bytes
+def write_metadata(xmlfile, title, thumb_bytes=2048):
+    with open(xmlfile, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<metadata xml:lang="en"><Esri><CreaDate>20260101</CreaDate></Esri>')
+        f.write("<dataIdInfo><idPurp>Summary of {0}</idPurp><idCredit>Town GIS</idCredit>".format(title))
+        f.write("<searchKeys><keyword>Easton</keyword><keyword>{0}</keyword></searchKeys>".format(title))
+        f.write("<resConst><Consts><useLimit>Use at your own risk.</useLimit></Consts></resConst>")
+        f.write("<resConst><LegConsts><othConsts>Not a survey.</othConsts></LegConsts></resConst></dataIdInfo>")
+        f.write('<Binary><Thumbnail><Data EsriPropertyType="PictureX">')
+        remaining = thumb_bytes
+        while remaining > 0:
+            chunk = min(remaining, 3 * 256 * 1024)
+            f.write(base64.encodebytes(os.urandom(chunk)).decode("ascii"))
+            remaining -= chunk
+        f.write("</Data></Thumbnail></Binary></metadata>")
+
+
+# Function: bench_parse
+# Description: Time and peak memory of metadata_to_list on a large export, then the time of a read from the metadata cache
+def bench_parse(workdir, thumb_mb):
+    import modMetaCache
+
+    xmlfile = os.path.join(workdir, "Large.xml")
+    thumbfile = os.path.join(workdir, "Large.jpg")
+    write_metadata(xmlfile, "Large", int(thumb_mb * 1024 * 1024))
+    tracemalloc.start()
+    start = time.time()
+    modAGOL.metadata_to_list(xmlfile, thumbfile, cache=False)
+    seconds = time.time() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cache = modMetaCache.MetadataCache(os.path.join(workdir, "metacache.sqlite"))
+    modAGOL.metadata_to_list(xmlfile, thumbfile, cache)
+    start = time.time()
+    modAGOL.metadata_to_list(xmlfile, thumbfile, cache)
+    cached_seconds = time.time() - start
+    cache.close()
+    return [{"scenario": "parse", "size_mb": round(os.path.getsize(xmlfile) / 1048576.0, 1), "seconds": round(seconds, 3),
+             "peak_mb": round(peak / 1048576.0, 1), "cached_seconds": round(cached_seconds, 3)}]
+
+
+# Function: bench_iteminfo
+# Description: Batch item information updates against the fake portal.  Each run starts with empty metadata and
+# thumbnail caches, so every file is parsed and converted as on a first run.
+def bench_iteminfo(workdir, latency, rate_limit, workers):
+    import modBatch
+    import modIndex
+    import modMetaCache
+    import modSession
+    import modThumb
+
+    results = []
+    for count in ITEM_COUNTS:
+        portal = fakeportal.FakePortal(latency=latency, rate_limit=rate_limit).start()
+        metadir = os.path.join(workdir, "meta{0}".format(count))
+        tempdir = os.path.join(workdir, "temp{0}".format(count))
+        os.makedirs(metadir)
+        os.makedirs(tempdir)
+        modMetaCache.configure(os.path.join(tempdir, modMetaCache.CACHE_NAME))
+        modThumb.THUMB_CACHE = os.path.join(tempdir, "thumbcache")
+        items = []
+        for num in range(count):
+            name = "Layer{0:04d}".format(num)
+            item = portal.add_item(name, "Feature Service")
+            write_metadata(os.path.join(metadir, name + ".xml"), name)
+            with open(os.path.join(metadir, name + ".html"), "w") as f:
+                f.write("<p>{0} description</p>".format(name))
+            items.append((item["id"], name))
+
+        start = time.time()
+        session = modSession.get_session(portal.url, portal.user, "password")
+        index = modIndex.prefetch(session)
+        batch = modBatch.run_batch(items, metadir, tempdir, session, workers, index)
+        seconds = time.time() - start
+        failed = [result for result in batch if result.status == "failed"]
+        results.append({"scenario": "iteminfo", "items": count, "workers": workers, "seconds": round(seconds, 3),
+                        "items_per_s": round(count / seconds, 1), "failed": len(failed),
+                        "requests": portal.stats["requests"], "throttled": portal.stats["throttled"]})
+        if failed:
+            logging.info("First failure: " + failed[0].message)
+        modSession.close_sessions()
+        portal.stop()
+    return results
+
+
+# Function: bench_publish
+# Description: Stage, upload and overwrite publish of one service against the fake portal
+def bench_publish(workdir, latency, rate_limit, sd_mb):
+    import modSession
+
+    portal = fakeportal.FakePortal(latency=latency, rate_limit=rate_limit, publish_seconds=1.0).start()
+    projectdir = os.path.join(workdir, "project")
+    os.makedirs(projectdir)
+    aprx_file = os.path.join(projectdir, "Bench.aprx")
+    for name in ("Bench.aprx", "Parcels.dat", "Roads.dat"):
+        with open(os.path.join(projectdir, name), "wb") as f:
+            f.write(os.urandom(1024))
+    sd_item = portal.add_item("Bench", "Service Definition")
+    portal.add_item("Bench", "Feature Service")
+    arcpy.SD_SIZE = int(sd_mb * 1024 * 1024)
+
+    start = time.time()
+    session = modSession.get_session(portal.url, portal.user, "password")
+    modAGOL.createSD_and_overwrite(aprx_file, "Map", os.path.join(workdir, "Bench.sddraft"), "Bench", "", False, False,
+                                   "Summary", "Easton", "Town GIS", "None", os.path.join(workdir, "Bench.sd"), session, sd_item["id"])
+    seconds = time.time() - start
+    modSession.close_sessions()
+    portal.stop()
+    return [{"scenario": "publish", "sd_mb": sd_mb, "seconds": round(seconds, 3), "requests": portal.stats["requests"],
+             "uploaded_mb": round(portal.stats["bytes_in"] / 1048576.0, 1)}]
+
+
+# Function: write_parcels
+# Description: Write a CSV table of parcels for the arcpy stub, rows is a list of (id, owner, value)
+def write_parcels(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["OBJECTID", "PARCEL_ID", "OWNER", "VALUE", "SHAPE@JSON"])
+        for num, (parcelid, owner, value) in enumerate(rows):
+            x = 100000 + (num % 200) * 50
+            y = 800000 + (num // 200) * 50
+            shape = json.dumps({"rings": [[[x, y], [x + 40, y], [x + 40, y + 40], [x, y + 40], [x, y]]], "spatialReference": {"wkid": 2249}})
+            writer.writerow([num + 1, parcelid, owner, value, shape])
+
+
+# Function: bench_sync
+# Description: Delta sync of one layer after a small share of its rows changed
+def bench_sync(workdir, latency, rate_limit):
+    import modSession
+    import modSync
+
+    portal = fakeportal.FakePortal(latency=latency, rate_limit=rate_limit).start()
+    projectdir = os.path.join(workdir, "syncproject")
+    os.makedirs(projectdir)
+    aprx_file = os.path.join(projectdir, "Sync.aprx")
+    with open(aprx_file, "wb") as f:
+        f.write(os.urandom(1024))
+    source = os.path.join(projectdir, "Parcels.dat")
+    rows = [("P{0:06d}".format(num), "Owner {0}".format(num), str(num * 10)) for num in range(SYNC_ROWS)]
+    write_parcels(source, rows)
+    item = portal.add_feature_service("Sync", [("Parcels.dat", ["PARCEL_ID", "OWNER", "VALUE"])])
+    settings = {"keyfield": "PARCEL_ID", "layers": [], "batchsize": modSync.BATCH_SIZE}
+
+    # The published service and the snapshot start from the same rows
+    fields, has_shape, signature = modSync.source_schema(source, "PARCEL_ID")
+    portal.add_features("Sync", 0, [{"attributes": attributes, "geometry": json.loads(shape)}
+                                    for key, rowhash, attributes, shape in modSync.read_rows(source, fields, has_shape, "PARCEL_ID")])
+    store = modSync.sync_store(workdir, "Sync")
+    start = time.time()
+    modSync.record_baseline(store, aprx_file, "Map", settings)
+    baseline_seconds = time.time() - start
+
+    updated, added, deleted = SYNC_CHANGES
+    for num in range(updated):
+        rows[num * 97] = (rows[num * 97][0], rows[num * 97][1] + " Trust", rows[num * 97][2])
+    del rows[-deleted:]
+    rows.extend(("N{0:06d}".format(num), "New owner", "0") for num in range(added))
+    write_parcels(source, rows)
+
+    requests_before = portal.stats["requests"]
+    bytes_before = portal.stats["bytes_in"]
+    session = modSession.get_session(portal.url, portal.user, "password")
+    start = time.time()
+    results = modSync.sync_service(session, item["url"], aprx_file, "Map", store, settings)
+    seconds = time.time() - start
+    store.close()
+    features = portal.services["Sync"]["layers"][0]["features"]
+    modSession.close_sessions()
+    portal.stop()
+    return [{"scenario": "sync", "rows": SYNC_ROWS, "adds": results[0].adds, "updates": results[0].updates, "deletes": results[0].deletes,
+             "seconds": round(seconds, 3), "baseline_seconds": round(baseline_seconds, 3),
+             "requests": portal.stats["requests"] - requests_before,
+             "uploaded_mb": round((portal.stats["bytes_in"] - bytes_before) / 1048576.0, 2),
+             "matches": len(features) == len(rows)}]
+
+
+# Function: time_import
+# Description: Median cold import time of a module in repodir over fresh interpreters and the heavy packages it
+# loaded.  Returns (seconds, loads, error), seconds is None when the import failed.
+def time_import(target, repodir, repeats=IMPORT_REPEATS):
+    times = []
+    loaded = ""
+    for num in range(repeats):
+        proc = subprocess.run([sys.executable, "-c", IMPORT_CODE.format(target, HEAVY_MODULES)], cwd=repodir,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if proc.returncode != 0:
+            lines = proc.stderr.strip().splitlines()
+            return None, "", lines[-1] if lines else "exit code {0}".format(proc.returncode)
+        lines = proc.stdout.splitlines()
+        times.append(float(lines[0]))
+        loaded = lines[1] if len(lines) > 1 else ""
+    return round(sorted(times)[len(times) // 2], 3), loaded.replace(" ", ",") or "-", ""
+
+
+# Function: bench_import
+# Description: Cold import time of each target in this tree, and in a git worktree of the baseline commit when given
+def bench_import(workdir, repeats=IMPORT_REPEATS, baseline=None):
+    results = []
+    repodir = os.path.dirname(BENCH_DIR)
+    basedir = None
+    if baseline:
+        basedir = os.path.join(workdir, "baseline")
+        subprocess.run(["git", "worktree", "add", "--detach", basedir, baseline], cwd=repodir, check=True,
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for target in IMPORT_TARGETS:
+            seconds, loads, error = time_import(target, repodir, repeats)
+            result = {"scenario": "import", "module": target, "status": "failed" if error else "ok"}
+            if error:
+                result["error"] = error
+            else:
+                result["seconds"] = seconds
+                result["loads"] = loads
+            if basedir:
+                seconds, loads, error = time_import(target, basedir, repeats)
+                result["baseline"] = baseline
+                if error:
+                    result["baseline_error"] = error
+                else:
+                    result["baseline_seconds"] = seconds
+                    result["baseline_loads"] = loads
+            results.append(result)
+    finally:
+        if basedir:
+            subprocess.run(["git", "worktree", "remove", "--force", basedir], cwd=repodir,
+                           stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return results
+
+
+# Function: print_results
+# Description: Print one line per result
+def print_results(results):
+    for result in results:
+        print("  ".join("{0}={1}".format(key, value) for key, value in result.items()))
+
+
+# Defines the entry point into the script
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)-8s %(message)s')
+    scenario = "all"
+    latency = 0.02
+    rate_limit = 0
+    workers = 8
+    sd_mb = 10
+    thumb_mb = 20
+    jsonfile = None
+    baseline = None
+
+    try:
+        opts, args = getopt.getopt(argv, "s:l:t:w:m:x:j:b:", ['scenario=', 'latency=', 'ratelimit=', 'workers=', 'sdmb=', 'thumbmb=', 'json=', 'baseline='])
+    except getopt.GetoptError:
+        print("Invalid option(s). Syntax: bench_agol.py [-s parse|iteminfo|publish|sync|import|all] [-l <latency>] [-t <ratelimit>] [-w <workers>] [-m <sdmb>] [-x <thumbmb>] [-j <jsonfile>] [-b <commit>]")
+        sys.exit(2)
+    for o, a in opts:
+        if o in ("-s", "--scenario"):
+            scenario = a
+        elif o in ("-l", "--latency"):
+            latency = float(a)
+        elif o in ("-t", "--ratelimit"):
+            rate_limit = int(a)
+        elif o in ("-w", "--workers"):
+            workers = int(a)
+        elif o in ("-m", "--sdmb"):
+            sd_mb = float(a)
+        elif o in ("-x", "--thumbmb"):
+            thumb_mb = float(a)
+        elif o in ("-j", "--json"):
+            jsonfile = a
+        elif o in ("-b", "--baseline"):
+            baseline = a
+
+    workdir = tempfile.mkdtemp(prefix="bench_agol_")
+    results = []
+    try:
+        if scenario in ("parse", "all"):
+            results.extend(bench_parse(workdir, thumb_mb))
+        if scenario in ("iteminfo", "all"):
+            results.extend(bench_iteminfo(workdir, latency, rate_limit, workers))
+        if scenario in ("publish", "all"):
+            results.extend(bench_publish(workdir, latency, rate_limit, sd_mb))
+        if scenario in ("sync", "all"):
+            results.extend(bench_sync(workdir, latency, rate_limit))
+        if scenario in ("import", "all"):
+            results.extend(bench_import(workdir, baseline=baseline))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if jsonfile:
+        with open(jsonfile, "w") as f:
+            json.dump(results, f, indent=1)
+    if any(result.get("status") == "failed" for result in results):
+        sys.exit(1)
+
+
+# Script start
+if __name__ == "__main__":
+    main(sys.argv[1:])
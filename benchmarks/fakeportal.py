@@ -0,0 +1,395 @@
+# ---------------------------------------------------------------------------
+# fakeportal.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Local stand-in for the ArcGIS Online sharing/rest API used by the benchmarks.  Items live in memory.
+# Supports sign in, search, item json, item update (with thumbnail and file), addItem, multipart
+# upload (addPart, parts, commit, status), publish jobs, sharing, item groups and group search.  Hosted
+# feature services answer layer json, query and applyEdits.  Every request can be delayed by a fixed
+# latency, and requests over a rate limit are answered with HTTP 429.
+#---------------------------------------------------------------------------
+
+import email.parser
+import json
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Class: FakePortal
+# Description: In-memory portal.  latency is seconds added to every request, rate_limit is requests per
+# second allowed before throttling (0 = no limit), publish_seconds is how long publish jobs take.
+class FakePortal(object):
+    def __init__(self, user="bench", latency=0.0, rate_limit=0, publish_seconds=1.0):
+        self.user = user
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.publish_seconds = publish_seconds
+        self.items = {}
+        self.groups = {}
+        self.parts = {}
+        self.jobs = {}
+        self.services = {}
+        self.stats = {"requests": 0, "throttled": 0, "bytes_in": 0, "bytes_out": 0}
+        self._lock = threading.Lock()
+        self._window = [time.time(), 0]
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{0}".format(self._server.server_address[1])
+
+    # Function: start
+    # Description: Serve on a free local port in a background thread
+    def start(self):
+        portal = self
+
+        class Handler(_Handler):
+            pass
+        Handler.portal = portal
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="FakePortal", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # Function: add_item
+    # Description: Add an item owned by the portal user and return its json
+    def add_item(self, title, item_type, itemid=None, **props):
+        with self._lock:
+            itemid = itemid or "{0:032x}".format(len(self.items) + 1)
+            item = {"id": itemid, "owner": self.user, "title": title, "type": item_type, "name": title,
+                    "snippet": "", "description": "", "accessInformation": "", "licenseInfo": "", "tags": [],
+                    "created": int(time.time() * 1000), "modified": int(time.time() * 1000), "ownerFolder": None,
+                    "access": "private", "size": 0, "thumbnail": None, "url": None}
+            item.update(props)
+            self.items[itemid] = item
+            item["_groups"] = []
+            return item
+
+    def add_group(self, title):
+        with self._lock:
+            groupid = "{0:032x}".format(0xfff00 + len(self.groups) + 1)
+            self.groups[groupid] = {"id": groupid, "title": title, "owner": self.user}
+            return self.groups[groupid]
+
+    # Function: add_feature_service
+    # Description: Add a hosted feature service with a layer per (name, fields) and its item.  Returns the item json.
+    def add_feature_service(self, title, layers):
+        service = {"layers": []}
+        for num, (name, fields) in enumerate(layers):
+            layerfields = [{"name": "OBJECTID", "type": "esriFieldTypeOID", "editable": False}]
+            layerfields += [{"name": field, "type": "esriFieldTypeString", "editable": True} for field in fields]
+            service["layers"].append({"id": num, "name": name, "objectIdField": "OBJECTID", "fields": layerfields,
+                                      "features": {}, "nextId": 1})
+        with self._lock:
+            self.services[title] = service
+        return self.add_item(title, "Feature Service", url="{0}/arcgis/rest/services/{1}/FeatureServer".format(self.url, title))
+
+    # Function: add_features
+    # Description: Load features (json with attributes and geometry) into a layer, as a publish would
+    def add_features(self, title, layer, features):
+        with self._lock:
+            target = self.services[title]["layers"][layer]
+            for feature in features:
+                oid = target["nextId"]
+                target["nextId"] += 1
+                feature = {"attributes": dict(feature["attributes"], OBJECTID=oid), "geometry": feature.get("geometry")}
+                target["features"][oid] = feature
+
+    def throttled(self):
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.time()
+            if now - self._window[0] >= 1.0:
+                self._window = [now, 0]
+            self._window[1] += 1
+            return self._window[1] > self.rate_limit
+
+    def public(self, item):
+        return dict((key, value) for key, value in item.items() if not key.startswith("_"))
+
+
+# Class: _Handler
+# Description: HTTP handler dispatching sharing/rest paths to the FakePortal
+class _Handler(BaseHTTPRequestHandler):
+    portal = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query), {})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        body = self.rfile.read(length)
+        with self.portal._lock:
+            self.portal.stats["bytes_in"] += length
+        ctype = self.headers.get("Content-Type", "")
+        params = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        files = {}
+        if ctype.startswith("multipart/form-data"):
+            message = email.parser.BytesParser().parsebytes(b"Content-Type: " + ctype.encode("latin-1") + b"\r\n\r\n" + body)
+            for part in message.get_payload():
+                name = part.get_param("name", header="content-disposition")
+                if part.get_filename():
+                    files[name] = part.get_payload(decode=True)
+                else:
+                    params[name] = [part.get_payload(decode=True).decode("utf-8")]
+        else:
+            params.update(urllib.parse.parse_qs(body.decode("utf-8")))
+        self._handle(params, files)
+
+    def _send(self, status, result):
+        data = json.dumps(result).encode("utf-8")
+        with self.portal._lock:
+            self.portal.stats["bytes_out"] += len(data)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, params, files):
+        portal = self.portal
+        with portal._lock:
+            portal.stats["requests"] += 1
+        if portal.latency:
+            time.sleep(portal.latency)
+        if portal.throttled():
+            with portal._lock:
+                portal.stats["throttled"] += 1
+            self._send(429, {"error": {"code": 429, "message": "Too many requests"}})
+            return
+        params = dict((key, values[-1]) for key, values in params.items())
+        path = urllib.parse.urlsplit(self.path).path
+        path = re.sub(r"^/sharing/rest", "", path).rstrip("/")
+        try:
+            if path.startswith("/arcgis/rest/services/"):
+                result = self._service(path, params)
+            else:
+                result = self._route(path, params, files)
+        except KeyError as e:
+            self._send(200, {"error": {"code": 400, "message": "Item does not exist or is inaccessible: " + str(e)}})
+            return
+        if result is None:
+            self._send(404, {"error": {"code": 404, "message": "Not found: " + path}})
+        else:
+            self._send(200, result)
+
+    def _route(self, path, params, files):
+        portal = self.portal
+        user = {"username": portal.user, "fullName": portal.user, "role": "org_admin", "privileges": [], "groups": list(portal.groups.values())}
+        if path == "/generateToken":
+            return {"token": "fake-token", "expires": int((time.time() + 7200) * 1000), "ssl": False}
+        if path in ("", "/info"):
+            return {"currentVersion": "10.3", "authInfo": {"isTokenBasedSecurity": True}}
+        if path == "/portals/self":
+            return {"id": "fake", "name": "Fake Portal", "isPortal": False, "urlKey": "fake", "portalHostname": "127.0.0.1",
+                    "currentVersion": "10.3", "user": user, "helperServices": {}, "supportsOAuth": False}
+        if path == "/community/self" or path == "/community/users/" + portal.user:
+            return user
+        if path == "/search":
+            return self._search(params)
+        if path == "/community/groups":
+            query = params.get("q", "")
+            groups = [group for group in portal.groups.values() if group["title"] in query or not query]
+            return {"total": len(groups), "start": 1, "num": len(groups), "nextStart": -1, "results": groups}
+
+        match = re.match(r"^/content/items/(\w+)(/\w+)?$", path)
+        if match:
+            item = portal.items[match.group(1)]
+            action = match.group(2)
+            if action is None:
+                return portal.public(item)
+            if action == "/share":
+                return self._share([item], params)
+            if action == "/groups":
+                groups = [portal.groups[groupid] for groupid in item["_groups"] if groupid in portal.groups]
+                return {"admin": groups, "member": [], "other": []}
+            return None
+
+        match = re.match(r"^/content/users/[^/]+(?:/(\w+))?/(shareItems|unshareItems|addItem|publish)$", path)
+        if match:
+            action = match.group(2)
+            if action == "addItem":
+                item = portal.add_item(params.get("title", "item"), params.get("type", "Service Definition"))
+                if "file" in files:
+                    item["size"] = len(files["file"])
+                return {"success": True, "id": item["id"], "folder": None}
+            if action == "publish":
+                return self._publish(params)
+            items = [portal.items[itemid] for itemid in params.get("items", "").split(",") if itemid]
+            if action == "unshareItems":
+                return self._unshare(items, params)
+            return self._share(items, params)
+
+        match = re.match(r"^/content/users/[^/]+(?:/\w+)?/items/(\w+)/(update|addPart|parts|commit|status|share)$", path)
+        if match:
+            item = portal.items[match.group(1)]
+            return self._item_action(item, match.group(2), params, files)
+        return None
+
+    def _service(self, path, params):
+        match = re.match(r"^/arcgis/rest/services/([^/]+)/FeatureServer(?:/(\d+))?(?:/(query|applyEdits))?$", path)
+        if not match:
+            return None
+        service = self.portal.services[match.group(1)]
+        if match.group(2) is None:
+            return {"layers": [{"id": layer["id"], "name": layer["name"]} for layer in service["layers"]], "tables": []}
+        layer = service["layers"][int(match.group(2))]
+        with self.portal._lock:
+            if match.group(3) is None:
+                return dict((key, value) for key, value in layer.items() if key not in ("features", "nextId"))
+            if match.group(3) == "query":
+                return self._query(layer, params)
+            return self._apply_edits(layer, params)
+
+    def _query(self, layer, params):
+        features = list(layer["features"].values())
+        where = params.get("where", "1=1")
+        match = re.match(r"^(\w+) IN \((.*)\)$", where)
+        if match:
+            values = set(value.strip().strip("'").replace("''", "'") for value in match.group(2).split(","))
+            features = [feature for feature in features if str(feature["attributes"].get(match.group(1))) in values]
+        if params.get("returnCountOnly") == "true":
+            return {"count": len(features)}
+        outfields = params.get("outFields", "*")
+        result = []
+        for feature in features:
+            attributes = feature["attributes"]
+            if outfields != "*":
+                attributes = dict((name, attributes.get(name)) for name in outfields.split(","))
+            found = {"attributes": attributes}
+            if params.get("returnGeometry", "true") != "false":
+                found["geometry"] = feature["geometry"]
+            result.append(found)
+        return {"objectIdFieldName": layer["objectIdField"], "features": result}
+
+    def _apply_edits(self, layer, params):
+        result = {"addResults": [], "updateResults": [], "deleteResults": []}
+        for feature in json.loads(params.get("adds", "[]")):
+            oid = layer["nextId"]
+            layer["nextId"] += 1
+            feature["attributes"]["OBJECTID"] = oid
+            layer["features"][oid] = feature
+            result["addResults"].append({"objectId": oid, "success": True})
+        for feature in json.loads(params.get("updates", "[]")):
+            oid = feature["attributes"]["OBJECTID"]
+            if oid in layer["features"]:
+                layer["features"][oid]["attributes"].update(feature["attributes"])
+                if "geometry" in feature:
+                    layer["features"][oid]["geometry"] = feature["geometry"]
+                result["updateResults"].append({"objectId": oid, "success": True})
+            else:
+                result["updateResults"].append({"objectId": oid, "success": False, "error": {"code": 1019, "description": "Object is missing"}})
+        for oid in [int(value) for value in params.get("deletes", "").split(",") if value]:
+            success = layer["features"].pop(oid, None) is not None
+            result["deleteResults"].append({"objectId": oid, "success": success})
+        return result
+
+    def _search(self, params):
+        portal = self.portal
+        query = params.get("q", "")
+        num = int(params.get("num", 10))
+        start = int(params.get("start", 1))
+        with portal._lock:
+            items = list(portal.items.values())
+        for term in query.split(" AND "):
+            term = term.strip()
+            if term.startswith("id:"):
+                items = [item for item in items if item["id"] == term[3:]]
+            elif term.startswith("group:"):
+                items = [item for item in items if term[6:] in item["_groups"]]
+            elif term.startswith("owner:"):
+                items = [item for item in items if item["owner"] == term[6:]]
+            elif term.startswith("title:"):
+                title = term[6:].strip("'\"")
+                items = [item for item in items if title.lower() in item["title"].lower()]
+        results = [portal.public(item) for item in items[start - 1:start - 1 + num]]
+        nextstart = start + num if start - 1 + num < len(items) else -1
+        return {"query": query, "total": len(items), "start": start, "num": num, "nextStart": nextstart, "results": results}
+
+    def _item_action(self, item, action, params, files):
+        portal = self.portal
+        itemid = item["id"]
+        if action == "update":
+            if params.get("multipart") == "true":
+                with portal._lock:
+                    portal.parts[itemid] = {}
+                return {"success": True, "id": itemid}
+            for key in ("snippet", "description", "accessInformation", "licenseInfo", "title"):
+                if key in params:
+                    item[key] = params[key]
+            if "tags" in params:
+                item["tags"] = [tag.strip() for tag in params["tags"].split(",") if tag.strip()]
+            if "thumbnail" in files:
+                item["thumbnail"] = "thumbnail/thumbnail.jpg"
+                item["_thumbsize"] = len(files["thumbnail"])
+            if "file" in files:
+                item["size"] = len(files["file"])
+            item["modified"] = int(time.time() * 1000)
+            return {"success": True, "id": itemid}
+        if action == "addPart":
+            with portal._lock:
+                portal.parts.setdefault(itemid, {})[int(params["partNum"])] = len(files.get("file", b""))
+            return {"success": True}
+        if action == "parts":
+            with portal._lock:
+                if itemid not in portal.parts:
+                    return {"error": {"code": 400, "message": "No multipart upload in progress"}}
+                return {"parts": sorted(portal.parts[itemid])}
+        if action == "commit":
+            with portal._lock:
+                item["size"] = sum(portal.parts.pop(itemid, {}).values())
+            return {"success": True, "id": itemid}
+        if action == "status":
+            job = portal.jobs.get(params.get("jobId"))
+            if job is None:
+                return {"status": "completed", "itemId": itemid}
+            if time.time() - job["submitted"] >= portal.publish_seconds:
+                return {"status": "completed", "itemId": itemid, "jobId": job["id"]}
+            return {"status": "processing", "itemId": itemid, "jobId": job["id"]}
+        if action == "share":
+            return self._share([item], params)
+        return None
+
+    def _publish(self, params):
+        portal = self.portal
+        sd_item = portal.items[params["itemId"]]
+        services = [item for item in portal.items.values() if item["type"] == "Feature Service" and item["title"] == sd_item["title"]]
+        service = services[0] if services else portal.add_item(sd_item["title"], "Feature Service")
+        with portal._lock:
+            jobid = "job{0}".format(len(portal.jobs) + 1)
+            portal.jobs[jobid] = {"id": jobid, "submitted": time.time(), "item": service["id"]}
+        return {"services": [{"type": "Feature Service", "serviceItemId": service["id"], "jobId": jobid,
+                              "serviceurl": "https://services.fake/arcgis/rest/services/{0}/FeatureServer".format(service["title"])}]}
+
+    def _share(self, items, params):
+        for item in items:
+            if params.get("everyone") == "true":
+                item["access"] = "public"
+            elif params.get("org") == "true":
+                item["access"] = "org"
+            groups = [groupid for groupid in params.get("groups", "").split(",") if groupid]
+            item["_groups"] = sorted(set(item["_groups"]) | set(groups))
+        return {"results": [{"itemId": item["id"], "success": True, "notSharedWith": []} for item in items]}
+
+    def _unshare(self, items, params):
+        groups = set(groupid for groupid in params.get("groups", "").split(",") if groupid)
+        for item in items:
+            item["_groups"] = sorted(set(item["_groups"]) - groups)
+        return {"results": [{"itemId": item["id"], "success": True, "notUnsharedFrom": []} for item in items]}
@@ -0,0 +1,68 @@
+# ---------------------------------------------------------------------------
+# arcpy stub for the benchmarks
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Just enough of arcpy for modAGOL to stage services without ArcGIS Pro.  StageService_server writes a
+# fake SD file of SD_SIZE bytes and takes STAGE_SECONDS, both set by the benchmark.  Tables are CSV
+# files: OBJECTID is the object id field, a SHAPE@JSON column holds the geometry, other fields are text.
+#---------------------------------------------------------------------------
+
+import collections
+import csv
+import os
+import time
+
+from . import mp
+from . import da
+
+
+SD_SIZE = 1024 * 1024
+STAGE_SECONDS = 0.0
+_messages = ""
+
+Field = collections.namedtuple('Field', ['name', 'type'])
+SpatialReference = collections.namedtuple('SpatialReference', ['factoryCode'])
+
+
+def StageService_server(in_service_definition_draft, out_service_definition):
+    global _messages
+    if not os.path.isfile(in_service_definition_draft):
+        _messages = "ERROR 001: draft not found " + in_service_definition_draft
+        raise RuntimeError(_messages)
+    if STAGE_SECONDS:
+        time.sleep(STAGE_SECONDS)
+    block = os.urandom(min(SD_SIZE, 1024 * 1024))
+    with open(out_service_definition, "wb") as f:
+        written = 0
+        while written < SD_SIZE:
+            f.write(block[:SD_SIZE - written])
+            written += len(block[:SD_SIZE - written])
+    _messages = "Succeeded"
+
+
+def GetMessages(severity=0):
+    return _messages
+
+
+def ListFields(dataset):
+    with open(dataset, newline="") as f:
+        header = next(csv.reader(f))
+    fields = []
+    for name in header:
+        if name == "OBJECTID":
+            fields.append(Field(name, "OID"))
+        elif name == "SHAPE@JSON":
+            fields.append(Field("Shape", "Geometry"))
+        else:
+            fields.append(Field(name, "String"))
+    return fields
+
+
+class Describe(object):
+    def __init__(self, value):
+        self.catalogPath = value
+        if any(field.type == "Geometry" for field in ListFields(value)):
+            self.shapeType = "Polygon"
+            self.spatialReference = SpatialReference(2249)
@@ -0,0 +1,20 @@
+# ---------------------------------------------------------------------------
+# arcpy.da stub for the benchmarks.  SearchCursor reads a CSV file in place of a table.
+#---------------------------------------------------------------------------
+
+import csv
+
+
+class SearchCursor(object):
+    def __init__(self, in_table, field_names):
+        with open(in_table, newline="") as f:
+            self._rows = [tuple(row[name] for name in field_names) for row in csv.DictReader(f)]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
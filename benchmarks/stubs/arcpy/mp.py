@@ -0,0 +1,49 @@
+# ---------------------------------------------------------------------------
+# arcpy.mp stub for the benchmarks
+#---------------------------------------------------------------------------
+
+import os
+
+
+class Layer(object):
+    def __init__(self, name, dataSource):
+        self.name = name
+        self.dataSource = dataSource
+
+    def supports(self, property_name):
+        return property_name == "DATASOURCE"
+
+
+class Map(object):
+    def __init__(self, name, layers):
+        self.name = name
+        self._layers = layers
+
+    def listLayers(self, wildcard=None):
+        return list(self._layers)
+
+    def listTables(self, wildcard=None):
+        return []
+
+
+# Class: ArcGISProject
+# Description: Every project has one map named "Map" with a layer for each file next to the .aprx
+class ArcGISProject(object):
+    def __init__(self, aprx_path):
+        if not os.path.isfile(aprx_path):
+            raise OSError(aprx_path)
+        self.filePath = aprx_path
+        folder = os.path.dirname(os.path.abspath(aprx_path))
+        layers = [Layer(name, os.path.join(folder, name)) for name in sorted(os.listdir(folder)) if name.endswith(".dat")]
+        self._maps = [Map("Map", layers)]
+
+    def listMaps(self, wildcard=None):
+        return [m for m in self._maps if wildcard in (None, "", "*", m.name)]
+
+
+def CreateWebLayerSDDraft(map_or_layers, out_sddraft, service_name, server_type="MY_HOSTED_SERVICES", service_type="FEATURE_ACCESS",
+                          folder_name=None, overwrite_existing_service=True, copy_data_to_server=True, enable_editing=False,
+                          allow_exporting=False, enable_sync=False, summary=None, tags=None, description=None, credits=None,
+                          use_limitations=None):
+    with open(out_sddraft, "w") as f:
+        f.write("<SVCManifest><Name>{0}</Name><Folder>{1}</Folder></SVCManifest>".format(service_name, folder_name))
@@ -5,108 +5,273 @@
 
 # Description: 
 # Shared functions related to publishing and updating items in ArcGIS Online
+# arcpy is only imported by stage_service, so metadata parsing and item updates load without it.  Staging can run
+# in the warm processes of a modStaging.StagingPool.
 #---------------------------------------------------------------------------
 
-import arcpy
-from arcgis.gis import GIS
-import xml.etree.ElementTree as ET
+import xml.parsers.expat as expat
 import base64
 import os
+import re
 import logging
 
+import modChange
+import modMetaCache
+import modSDCache
+import modShare
+import modStaging
+import modThumb
+import modUpload
+import modJobs
+import modLedger
+import modTrace
+
+
+#Parameters for editor tracking
+PUBLISH_PARAMETERS = {"editorTrackingInfo" : {"enableEditorTracking":'true',  "preserveEditUsersAndTimestamps":'true'}}
+
+
+# Class: _MetadataReader
+# Description: Streaming reader for metadata XML extracted from ArcCatalog.  The file is fed to expat in
+# blocks, only the values used for item information are kept, and the base64 thumbnail is decoded in
+# pieces straight to the thumbnail file, so large exports with embedded graphics are never held in memory.
+class _MetadataReader(object):
+    BLOCK_SIZE = 64 * 1024
+    B64_CHARS = re.compile(r"[^A-Za-z0-9+/=]")
+
+    def __init__(self, thumbpath):
+        self.thumbpath = thumbpath
+        self.summary = None
+        self.credits = None
+        self.title = None
+        self.abstract = None
+        self.keywords = []
+        self.uselimits = []
+        self.legalconsts = []
+        self.has_summary = False
+        self.has_credits = False
+        self.has_title = False
+        self.has_abstract = False
+        self.has_tags = False
+        self.has_thumbnail = False
+        self._path = []
+        self._dataidinfo = 0
+        self._searchkeys = 0
+        self._seen_in_const = False
+        self._text = None
+        self._textdepth = 0
+        self._textopen = False
+        self._thumbfile = None
+        self._thumbpending = ""
+
+    def read(self, metadatafile):
+        parser = expat.ParserCreate("UTF-8")
+        parser.StartElementHandler = self._start
+        parser.EndElementHandler = self._end
+        parser.CharacterDataHandler = self._chars
+        # Hand over text in large pieces instead of one call per line of base64
+        parser.buffer_text = True
+        parser.buffer_size = self.BLOCK_SIZE
+        try:
+            with open(metadatafile, "rb") as f:
+                for block in iter(lambda: f.read(self.BLOCK_SIZE), b""):
+                    parser.Parse(block, False)
+                parser.Parse(b"", True)
+        finally:
+            if self._thumbfile is not None:
+                self._thumbfile.close()
+
+    def _start(self, tag, attrs):
+        self._path.append(tag)
+        path = tuple(self._path[1:])
+        # Like ElementTree's text, a value is the text before the first child element
+        if self._text is not None and len(self._path) > self._textdepth:
+            self._textopen = False
+        if path == ("dataIdInfo",):
+            self._dataidinfo += 1
+        elif path == ("dataIdInfo", "searchKeys"):
+            self._searchkeys += 1
+        elif path[-1:] in (("Consts",), ("LegConsts",)):
+            self._seen_in_const = False
+        # Only the first dataIdInfo, first searchKeys and first value of each constraint are used
+        if self._dataidinfo == 1 and (
+                (path == ("dataIdInfo", "idPurp") and not self.has_summary) or
+                (path == ("dataIdInfo", "idCredit") and not self.has_credits) or
+                (path == ("dataIdInfo", "idCitation", "resTitle") and not self.has_title) or
+                (path == ("dataIdInfo", "idAbs") and not self.has_abstract) or
+                (path == ("dataIdInfo", "searchKeys", "keyword") and self._searchkeys == 1) or
+                (path in (("dataIdInfo", "resConst", "Consts", "useLimit"), ("dataIdInfo", "resConst", "LegConsts", "othConsts")) and not self._seen_in_const)):
+            self._text = []
+            self._textdepth = len(self._path)
+            self._textopen = True
+        elif path == ("Binary", "Thumbnail", "Data") and not self.has_thumbnail:
+            self.has_thumbnail = True
+            self._thumbfile = open(self.thumbpath, "wb")
+
+    def _chars(self, data):
+        if self._thumbfile is not None:
+            self._thumbpending += self.B64_CHARS.sub("", data)
+            usable = len(self._thumbpending) // 4 * 4
+            if usable:
+                self._thumbfile.write(base64.b64decode(self._thumbpending[:usable]))
+                self._thumbpending = self._thumbpending[usable:]
+        elif self._text is not None and self._textopen and len(self._path) == self._textdepth:
+            self._text.append(data)
+
+    def _end(self, tag):
+        path = tuple(self._path[1:])
+        depth = len(self._path)
+        self._path.pop()
+        if self._thumbfile is not None and path == ("Binary", "Thumbnail", "Data"):
+            if self._thumbpending:
+                self._thumbfile.write(base64.b64decode(self._thumbpending + "=" * (-len(self._thumbpending) % 4)))
+            self._thumbfile.close()
+            self._thumbfile = None
+            return
+        if self._text is None or depth != self._textdepth:
+            return
+        text = "".join(self._text) if self._text else None
+        self._text = None
+        if path == ("dataIdInfo", "idPurp"):
+            self.summary = text
+            self.has_summary = True
+        elif path == ("dataIdInfo", "idCredit"):
+            self.credits = text
+            self.has_credits = True
+        elif path == ("dataIdInfo", "idCitation", "resTitle"):
+            self.title = text
+            self.has_title = True
+        elif path == ("dataIdInfo", "idAbs"):
+            self.abstract = text
+            self.has_abstract = True
+        elif path == ("dataIdInfo", "searchKeys", "keyword"):
+            self.has_tags = True
+            if text:
+                self.keywords.append(text)
+        elif path[-1] == "useLimit":
+            self._seen_in_const = True
+            if text:
+                self.uselimits.append(text)
+        elif path[-1] == "othConsts":
+            self._seen_in_const = True
+            if text:
+                self.legalconsts.append(text)
 
 
 # Function: metadata_to_list
-# Description: Read metadata XML extracted from ArcCatalog
-def metadata_to_list(metadatafile, thumbpath):
-    insummary = ""
-    incredits = ""
-    #intags = ""
-   # inuselimit = ""
+# Description: Read metadata XML extracted from ArcCatalog.  Files parsed before are read from the metadata cache
+# (see modMetaCache), pass cache=False to always parse.  Pass a dict as fields to also get the values the item
+# description is rendered from (see modDescribe), read in the same pass.
+def metadata_to_list(metadatafile, thumbpath, cache=None, fields=None):
     logging.info("Start metadata_to_list") 
+    if cache is None:
+        cache = modMetaCache.default_cache()
+    if cache:
+        metadatalist = cache.load(metadatafile, thumbpath, _parse_metadata)
+    else:
+        metadatalist = _parse_metadata(metadatafile, thumbpath)
+    if fields is not None:
+        fields.update(metadatalist[4])
+    return metadatalist[:4]
+
+
+def _parse_metadata(metadatafile, thumbpath):
 
     #Get metadata from xml file
-    xmlparser = ET.XMLParser(encoding="UTF-8")
-    tree = ET.parse(metadatafile, parser=xmlparser)
-    root = tree.getroot()
-    dataIdInfo = root.find('dataIdInfo')
+    reader = _MetadataReader(thumbpath)
+    with modTrace.span("parse", file=os.path.basename(metadatafile)):
+        reader.read(metadatafile)
 
-    try:
-        metasummary = dataIdInfo.find('idPurp')
-        insummary = metasummary.text
-    except:
-        metasummary = 'There is no summary for this item.' 
+    insummary = ""
+    if reader.has_summary:
+        insummary = reader.summary
+    else:
         logging.info("Metadata missing purpose")     
-    
     logging.info("Metadata - Purpose")  
-    
-    try:
-        metacredits = dataIdInfo.find('idCredit')
-        incredits = metacredits.text
-    except:
-        metacredits = 'There is not credit information for this item.' 
-        logging.info("Metadata missing purpose")    
-        
+
+    incredits = ""
+    if reader.has_credits:
+        incredits = reader.credits
+    else:
+        logging.info("Metadata missing credits")    
     logging.info("Metadata - credits") 
 
     # Create tags
-    intags = ''
-    try:
-        metaTags = dataIdInfo.find('searchKeys')
-        for keyword in metaTags.findall('keyword'):
-            if intags == '':
-                intags = keyword.text
-            else:
-                intags = intags + "," + keyword.text
-    except:
+    if not reader.has_tags:
         logging.info("Metadata missing tags") 
+    intags = ",".join(reader.keywords)
     logging.info("Metadata - tags") 
 
-    inuselimit = ''
     # Create constraints from Use and then Legal
-    try:
-        for resconst in dataIdInfo.findall('resConst'):
-            for const in resconst.findall('Consts'):
-                UseConst = const.find('useLimit')
-                if inuselimit == '':
-                    inuselimit = UseConst.text
-                else:
-                    inuselimit = inuselimit + "\n" + UseConst.text
-    except:
-        logging.info("Metadata missing use limits") 
-
-    try:
-        for resconst in dataIdInfo.findall('resConst'):
-            for const in resconst.findall('LegConsts'):
-                LegalConst = const.find('othConsts')
-                if inuselimit == '':
-                    inuselimit = LegalConst.text
-                else:
-                    inuselimit = inuselimit + "\n" + LegalConst.text
-    except:
-        logging.info("Metadata missing legal constraints") 
-         
+    inuselimit = "\n".join(reader.uselimits + reader.legalconsts)
     if inuselimit == '':
         inuselimit = 'There are not access and use constraints for this item.'  
-    
     logging.info("Metadata - use limits") 
 
-    thumbdata = root.findall("Binary/Thumbnail/Data")
-    if thumbdata:
-        metathumbnail = thumbdata[0].text
-        with open(thumbpath,"wb") as f:
-            f.write(base64.b64decode(metathumbnail))
+    if reader.has_thumbnail:
+        logging.info("Metadata - thumbnail") 
 
-    logging.info("Metadata - thumbnail") 
-        
-                   
-    metadatalist = [insummary,incredits,intags,inuselimit]
+    # Values for the item description, lists are kept apart for the template
+    descfields = {"title": reader.title or "",
+                  "abstract": reader.abstract or "",
+                  "summary": insummary or "",
+                  "credits": incredits or "",
+                  "tags": reader.keywords,
+                  "uselimits": reader.uselimits,
+                  "legalconsts": reader.legalconsts
+    }
+
+    metadatalist = [insummary,incredits,intags,inuselimit,descfields]
     return metadatalist
 
 
+# Function: find_item
+# Description: Find an item by id.  Uses the prefetched item index when given (see modIndex), otherwise
+# searches the portal.  With owned=True only items of the session user are returned.
+def find_item(session, itemid, item_type, index=None, owned=True):
+    if index is not None:
+        item = index.item(index.get(itemid, item_type))
+        if item is not None or owned:
+            return item
+    query = "id:" + itemid
+    if owned:
+        query = query + " AND owner:" + session.user
+    items = session.call(session.gis.content.search, query, item_type=item_type)
+    if items:
+        return items[0]
+    return None
+
+
+# Function: update_item_properties
+# Description: Send only the properties and thumbnail that changed (see modChange).  Returns False
+# when the item was already up to date and nothing was sent.  The thumbnail is normalized first (see modThumb).
+# With a session the update is sent under its portal governor (see modGovernor).
+def update_item_properties(fs_item, item_properties, itemthumb_file, manifest=None, session=None):
+    changed = modChange.changed_properties(fs_item, item_properties, manifest)
+    itemthumb_file = modThumb.optimize_thumbnail(itemthumb_file)
+    thumbhash = modChange.file_hash(itemthumb_file)
+    thumbchanged = modChange.thumbnail_changed(fs_item.id, thumbhash, manifest)
+    if not changed and not thumbchanged:
+        logging.info("Item unchanged, skipped " + fs_item.id)
+        return False
+
+    logging.info("Item " + fs_item.id + " changed: " + ", ".join(sorted(changed) + (["thumbnail"] if thumbchanged else [])))
+    with modTrace.span("update", item=fs_item.id):
+        call = session.call if session is not None else lambda fn, *args, **kwargs: fn(*args, **kwargs)
+        if thumbchanged:
+            call(fs_item.update, changed, thumbnail = itemthumb_file)
+        else:
+            call(fs_item.update, changed)
+    if manifest is not None:
+        manifest.record(fs_item.id, item_properties, thumbhash)
+    return True
+
+
 # Function: update_featureservice
-# Description: Update feature service item information and sharing
-def update_featureservice(itemsummary, itemcredits, itemuselimits, itemtags, itemdesc, itemthumb_file, itemid, agol_url, agol_user, agol_pass, shared, share_everyone, share_org, share_groups):
+# Description: Update feature service item information and sharing.  Sharing is only sent when it differs from the
+# item's current sharing (see modShare).  Pass a modShare.ShareEngine as sharing to queue it for one bulk request instead.
+# Pass a modJournal.UpdateJournal as journal to write the update to the journal, it is sent when the journal is flushed.
+def update_featureservice(itemsummary, itemcredits, itemuselimits, itemtags, itemdesc, itemthumb_file, itemid, session, shared, share_everyone, share_org, share_groups, index=None, manifest=None, sharing=None, journal=None):
     item_properties = {"snippet": itemsummary,
                        "description": itemdesc,
                        "accessInformation": itemcredits,
@@ -114,20 +279,24 @@ def update_featureservice(itemsummary, itemcredits, itemuselimits, itemtags, ite
                        "tags": itemtags
     }   
 
-    gis = GIS(agol_url, agol_user, agol_pass)
-    fs_items = gis.content.search("id:" + itemid + " AND owner:" + agol_user, item_type="Feature Service")
-    if fs_items:
-        fs_item = fs_items[0]
-        if os.path.isfile(itemthumb_file):
-            fs_item.update(item_properties, thumbnail = itemthumb_file)
-        else:
-            fs_item.update(item_properties)
-        if shared:
-            fs_item.share(everyone = share_everyone, org = share_org, groups = share_groups)
+    if journal is not None:
+        return journal.enqueue(session, itemid, item_properties, itemthumb_file,
+                               (share_everyone, share_org, share_groups) if modShare.as_bool(shared) else None)
+
+    fs_item = find_item(session, itemid, "Feature Service", index)
+    if fs_item:
+        changed = update_item_properties(fs_item, item_properties, itemthumb_file, manifest, session)
+        if modShare.as_bool(shared):
+            if sharing is not None:
+                sharing.add(fs_item, share_everyone, share_org, share_groups)
+            else:
+                changed = modShare.share_item(session, fs_item, share_everyone, share_org, share_groups) or changed
+        return changed
+    return False
 
 # Function: update_iteminfo
-# Description: Update feature service item information
-def update_iteminfo(itemsummary, itemcredits, itemuselimits, itemtags, itemdesc, itemthumb_file, itemid, agol_url, agol_user, agol_pass):
+# Description: Update feature service item information, or queue it in a journal (see update_featureservice)
+def update_iteminfo(itemsummary, itemcredits, itemuselimits, itemtags, itemdesc, itemthumb_file, itemid, session, index=None, manifest=None, journal=None):
     item_properties = {"snippet": itemsummary,
                        "description": itemdesc,
                        "accessInformation": itemcredits,
@@ -135,58 +304,154 @@ def update_iteminfo(itemsummary, itemcredits, itemuselimits, itemtags, itemdesc,
                        "tags": itemtags
     }   
 
-    gis = GIS(agol_url, agol_user, agol_pass)
-    fs_items = gis.content.search("id:" + itemid, item_type="Feature Service")
-    if fs_items:
-        fs_item = fs_items[0]
-        if os.path.isfile(itemthumb_file):
-            fs_item.update(item_properties, thumbnail = itemthumb_file)
-        else:
-            fs_item.update(item_properties)
+    if journal is not None:
+        return journal.enqueue(session, itemid, item_properties, itemthumb_file, owned=False)
 
-# Function: createSD_and_overwrite
-# Description: Creates a SD file from ArcGIS Pro, then updates an existing SD file in ArcGIS Online.  The new SD file is published.
-def createSD_and_overwrite(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled, 
-                           itemsummary, itemtags, itemcredits, itemuselimits, final_sd, agol_url, agol_user, agol_pass, sd_itemid ):
-    logging.info("Start createSD_and_overwrite") 
-    aprx = arcpy.mp.ArcGISProject(aprx_file)
+    fs_item = find_item(session, itemid, "Feature Service", index, owned=False)
+    if fs_item:
+        return update_item_properties(fs_item, item_properties, itemthumb_file, manifest, session)
+    return False
+
+# Function: stage_service
+# Description: Creates a SD file from a map in an ArcGIS Pro project.  With an sd_cache (see modSDCache) staging is
+# skipped when the project, data and parameters are unchanged.  force=True always stages.
+# Returns (sd file, fingerprint, already published).  Raises RuntimeError when the map is missing or staging fails.
+def stage_service(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled,
+                  itemsummary, itemtags, itemcredits, itemuselimits, final_sd, sd_itemid, sd_cache=None, force=False):
+    import arcpy
+    logging.info("Start stage_service " + service_name) 
+    aprx = modStaging.open_project(aprx_file)
     
     maplist = aprx.listMaps(map_name)
     if not maplist:
-        logging.info("Map not found in ArcGIS project file. \nMake sure a valid map exists.")
-        sys.exit()             
+        raise RuntimeError("Map not found in ArcGIS project file. \nMake sure a valid map exists.")
     m = maplist[0]
     logging.info("Map found")
 
+    # Check for an SD staged from the same inputs
+    fingerprint = None
+    if sd_cache is not None:
+        draft_params = [service_name, folder_name, edit_enabled, export_enabled, itemsummary, itemtags, itemcredits, itemuselimits, sd_itemid]
+        fingerprint = modSDCache.fingerprint(aprx_file, m, draft_params)
+        cached = None
+        if not force:
+            cached = sd_cache.lookup(service_name, fingerprint)
+        if cached:
+            logging.info("Using cached sd: " + cached["sd"])
+            return cached["sd"], fingerprint, cached["published"]
+
     # create sd file
     try:
         logging.info("SDDraft: " + draft_sd)
         logging.info("Service: " + service_name)
         logging.info("AGOL folder: " + folder_name)
-        arcpy.mp.CreateWebLayerSDDraft(m, draft_sd, service_name, 'MY_HOSTED_SERVICES', 'FEATURE_ACCESS', folder_name, enable_editing = edit_enabled, allow_exporting = export_enabled, summary=itemsummary, tags = itemtags, credits = itemcredits, use_limitations = itemuselimits)
+        with modTrace.span("draft", service=service_name):
+            arcpy.mp.CreateWebLayerSDDraft(m, draft_sd, service_name, 'MY_HOSTED_SERVICES', 'FEATURE_ACCESS', folder_name, enable_editing = edit_enabled, allow_exporting = export_enabled, summary=itemsummary, tags = itemtags, credits = itemcredits, use_limitations = itemuselimits)
         logging.info("Created draft sd")
-        arcpy.StageService_server(draft_sd, final_sd)
+        with modTrace.span("stage", service=service_name):
+            arcpy.StageService_server(draft_sd, final_sd)
         logging.info("Staged service") 
-    except:
-        logging.info(arcpy.GetMessages())
-        sys.exit()
-
-    #Push sd file to AGOL
-    gis = GIS(agol_url, agol_user, agol_pass)
-   
-    #Find SD file, then update or add, then publish
-    sd_items = gis.content.search("id:" + sd_itemid +" AND owner:" + agol_user, item_type="Service Definition")
-
-    #Parameters for editor tracking
-    pub_params = {"editorTrackingInfo" : {"enableEditorTracking":'true',  "preserveEditUsersAndTimestamps":'true'}}
-
-    if sd_items:
-        sd_item = sd_items[0]
-        updatesuccess = sd_item.update({},final_sd)
-        if updatesuccess:
-            sd_item.publish(publish_parameters=pub_params, overwrite="true")
-            logging.info("SD file published")           
-    else:    
-        logging.info("SD item not found. \nMake sure a sd file exists.")
-        sys.exit() 
- 
+    except Exception:
+        raise RuntimeError(arcpy.GetMessages())
+    if sd_cache is not None:
+        record = sd_cache.store(service_name, fingerprint, final_sd)
+        if record:
+            final_sd = record["sd"]
+    return final_sd, fingerprint, False
+
+
+# Function: stage_job
+# Description: stage_service for a staging process (see modStaging).  The SD cache is passed by its folder.
+def stage_job(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled,
+              itemsummary, itemtags, itemcredits, itemuselimits, final_sd, sd_itemid, sd_cache_dir=None, force=False):
+    sd_cache = modSDCache.SDCache(sd_cache_dir) if sd_cache_dir else None
+    return stage_service(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled,
+                         itemsummary, itemtags, itemcredits, itemuselimits, final_sd, sd_itemid, sd_cache, force)
+
+
+# Function: stage
+# Description: stage_service in a process of pool when one is given, otherwise in this process
+def stage(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled,
+          itemsummary, itemtags, itemcredits, itemuselimits, final_sd, sd_itemid, sd_cache=None, force=False, pool=None):
+    if pool is None:
+        return stage_service(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled,
+                             itemsummary, itemtags, itemcredits, itemuselimits, final_sd, sd_itemid, sd_cache, force)
+    # Spans of the staging process are not seen by this one, the wait for its result is timed here
+    with modTrace.span("stage", service=service_name):
+        return pool.submit(stage_job, aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled,
+                           itemsummary, itemtags, itemcredits, itemuselimits, final_sd, sd_itemid,
+                           sd_cache.cache_dir if sd_cache is not None else None, force).result()
+
+
+# Function: upload_sd
+# Description: Replaces the file of an existing SD item with a staged SD file.  SD files larger than part_size are
+# uploaded in resumable parts (see modUpload).  Returns (SD item, True when uploaded).
+# Raises RuntimeError when the SD item is not found.
+def upload_sd(final_sd, session, sd_itemid, index=None, part_size=None):
+    sd_item = find_item(session, sd_itemid, "Service Definition", index)
+    if not sd_item:
+        raise RuntimeError("SD item not found. \nMake sure a sd file exists.")
+
+    # SD files are named after their service
+    service_name = os.path.splitext(os.path.basename(final_sd))[0]
+    with modTrace.span("upload", service=service_name, item=sd_itemid, bytes=os.path.getsize(final_sd)):
+        if part_size and os.path.getsize(final_sd) > part_size:
+            updatesuccess = modUpload.upload_sd(session, sd_item, final_sd, part_size, progress=modUpload.log_progress(os.path.basename(final_sd)))
+        else:
+            updatesuccess = session.call(sd_item.update, {}, final_sd)
+    return sd_item, updatesuccess
+
+
+# Function: publish_sd
+# Description: Updates an existing SD file in ArcGIS Online with a staged SD file and publishes it over the
+# existing service.  Returns True when published.  Raises RuntimeError when the SD item is not found.
+def publish_sd(final_sd, session, sd_itemid, index=None, part_size=None):
+    sd_item, updatesuccess = upload_sd(final_sd, session, sd_itemid, index, part_size)
+    if updatesuccess:
+        with modTrace.span("publish", service=os.path.splitext(os.path.basename(final_sd))[0], item=sd_itemid):
+            session.call(sd_item.publish, publish_parameters=PUBLISH_PARAMETERS, overwrite="true", idempotent=False)
+        logging.info("SD file published")           
+        return True
+    return False
+
+
+# Function: submit_sd
+# Description: Same as publish_sd, but the overwrite is only submitted and a job handle is returned without waiting
+# (see modJobs).  callback(job) is called by the job poller when publishing finishes.  Returns None when the upload failed.
+def submit_sd(final_sd, session, sd_itemid, index=None, part_size=None, name=None, callback=None):
+    sd_item, updatesuccess = upload_sd(final_sd, session, sd_itemid, index, part_size)
+    if updatesuccess:
+        return modJobs.submit_publish(session, sd_item, PUBLISH_PARAMETERS, name, callback)
+    return None
+
+
+# Function: createSD_and_overwrite
+# Description: Creates a SD file from ArcGIS Pro, then updates an existing SD file in ArcGIS Online.  The new SD file is published.
+# With an sd_cache (see modSDCache) staging is skipped when the project, data and parameters are unchanged, and the
+# upload and publish are skipped when that SD was already published.  force=True always stages and publishes.
+# With a staging pool (see modStaging) the SD is staged in one of its warm processes.
+# Returns True when the service was published, None when the same SD was published before and nothing was sent,
+# False when staging, the upload or the publish failed.  Failures are logged and recorded in the run ledger, the caller
+# decides whether the run stops.
+def createSD_and_overwrite(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled, 
+                           itemsummary, itemtags, itemcredits, itemuselimits, final_sd, session, sd_itemid, index=None, sd_cache=None, force=False, part_size=None, pool=None ):
+    logging.info("Start createSD_and_overwrite") 
+    try:
+        final_sd, fingerprint, published = stage(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled,
+                                                 itemsummary, itemtags, itemcredits, itemuselimits, final_sd, sd_itemid, sd_cache, force, pool)
+        if published:
+            logging.info("Service unchanged since last publish, skipped " + service_name)
+            modLedger.service_result(service_name, "unchanged")
+            return None
+
+        if publish_sd(final_sd, session, sd_itemid, index, part_size):
+            if sd_cache is not None:
+                sd_cache.mark_published(service_name, fingerprint)
+            modLedger.service_result(service_name, "published")
+            return True
+    except RuntimeError as e:
+        logging.error(str(e))
+        modLedger.service_result(service_name, "failed", str(e))
+        return False
+    modLedger.service_result(service_name, "failed", "SD file update failed")
+    return False
@@ -0,0 +1,140 @@
+# ---------------------------------------------------------------------------
+# modBatch.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Batch update of ArcGIS Online item information.  Items are read from a CSV file, a SQLite
+# table or an ArcGIS table with AGOL_ITEMID and FILENAME fields, and updated through a
+# bounded pool of worker threads that share one portal session.  Large batches have their
+# metadata files parsed in a pool of processes (see modIngest) ahead of the updates.
+#---------------------------------------------------------------------------
+
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import logging
+import os
+import sqlite3
+import time
+
+import modAGOL
+import modIngest
+import modTrace
+
+
+ITEM_FIELDS = ['AGOL_ITEMID', 'FILENAME']
+SQLITE_TABLE = 'ITEMINFO'
+WORKERS = 8
+
+# Result of one item update.  status is one of: updated, unchanged, missing, failed, queued (left in the update journal)
+ItemResult = collections.namedtuple('ItemResult', ['itemid', 'filename', 'status', 'seconds', 'message'])
+
+
+# Function: read_items
+# Description: Read (item id, file name) pairs from a CSV file, a SQLite database or an ArcGIS table
+def read_items(source, sqlite_table=SQLITE_TABLE):
+    ext = os.path.splitext(source)[1].lower()
+    items = []
+    if ext in ('.csv', '.txt'):
+        with open(source, newline='') as f:
+            for row in csv.DictReader(f):
+                items.append((row[ITEM_FIELDS[0]].strip(), row[ITEM_FIELDS[1]].strip()))
+    elif ext in ('.sqlite', '.db', '.sqlite3'):
+        with contextlib.closing(sqlite3.connect(source)) as conn:
+            sql = 'SELECT {0}, {1} FROM "{2}"'.format(ITEM_FIELDS[0], ITEM_FIELDS[1], sqlite_table)
+            for row in conn.execute(sql):
+                items.append((row[0], row[1]))
+    else:
+        # Geodatabase or other ArcGIS table, only this path needs arcpy
+        import arcpy
+        with arcpy.da.SearchCursor(source, ITEM_FIELDS) as cursor:
+            for row in cursor:
+                items.append((row[0], row[1]))
+    logging.info("Read {0} items from {1}".format(len(items), source))
+    return items
+
+
+# Function: update_item
+# Description: Update one item from <filename>.xml and <filename>.html in the metadata directory
+def update_item(itemid, filename, metadir, tempdir, session, index=None, manifest=None, journal=None, template=None):
+    return update_record(modIngest.read_pair(itemid, filename, metadir, tempdir, template), session, index, manifest, journal)
+
+
+# Function: update_record
+# Description: Update one item from its parsed metadata files (see modIngest).  With a journal (modJournal.UpdateJournal)
+# the update is only queued.
+def update_record(record, session, index=None, manifest=None, journal=None):
+    start = time.time() - record.seconds
+    if record.status != 'ok':
+        return ItemResult(record.itemid, record.filename, record.status, record.seconds, record.message)
+
+    try:
+        metadatalist = record.metadata
+        changed = modAGOL.update_featureservice(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], record.htmldesc, record.thumbnail, record.itemid, session, False,
+                False, False, "None", index, manifest, journal=journal)
+    except Exception as e:
+        return ItemResult(record.itemid, record.filename, 'failed', time.time() - start, str(e))
+    if journal is not None:
+        return ItemResult(record.itemid, record.filename, 'queued', time.time() - start, "")
+    return ItemResult(record.itemid, record.filename, 'updated' if changed else 'unchanged', time.time() - start, "")
+
+
+# Function: run_batch
+# Description: Update all items with a pool of worker threads.  Results are returned in input order.
+# Pass an item index (modIndex.prefetch) so items are not searched one at a time, and a change
+# manifest (modChange.ChangeManifest) to skip items that have not changed since the last run.
+# With parse_workers processes (default: one per core for batches of modIngest.MIN_ITEMS or more, 0 for none)
+# the metadata files are parsed in a process pool and each item is updated as soon as its files are read.
+# With a journal (modJournal.UpdateJournal) the updates are queued, then the journal is flushed in batches,
+# and items the portal could not take stay queued for the next run.  Descriptions of items without an html file
+# are rendered with the template (see modDescribe).
+def run_batch(items, metadir, tempdir, session, workers=WORKERS, index=None, manifest=None, parse_workers=None, journal=None, template=None):
+    if parse_workers is None:
+        parse_workers = modIngest.PARSE_WORKERS if len(items) >= modIngest.MIN_ITEMS else 0
+    logging.info("Start batch of {0} items with {1} workers, {2} parse processes".format(len(items), workers, parse_workers))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        if parse_workers:
+            futures = []
+            for record in modIngest.ingest(items, metadir, tempdir, parse_workers, template):
+                modTrace.record("ingest", record.seconds, record.status == 'ok', item=record.itemid)
+                futures.append(executor.submit(update_record, record, session, index, manifest, journal))
+        else:
+            futures = [executor.submit(update_item, itemid, filename, metadir, tempdir, session, index, manifest, journal, template) for itemid, filename in items]
+        results = []
+        for future in futures:
+            result = future.result()
+            logging.info("{0} {1} ({2}) in {3:.2f}s {4}".format(result.status, result.itemid, result.filename, result.seconds, result.message))
+            results.append(result)
+
+    if journal is not None:
+        start = time.time()
+        flushed = dict((result.itemid, result) for result in journal.flush(session, index, manifest, workers=workers))
+        seconds = (time.time() - start) / max(1, len(flushed))
+        for num, result in enumerate(results):
+            if result.status == 'queued' and result.itemid in flushed:
+                done = flushed[result.itemid]
+                results[num] = ItemResult(result.itemid, result.filename, done.status, result.seconds + seconds, done.message)
+    return results
+
+
+# Function: write_report
+# Description: Write per item results to a CSV file and log a summary
+def write_report(results, reportfile, elapsed=None):
+    with open(reportfile, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(ItemResult._fields)
+        for result in results:
+            writer.writerow([result.itemid, result.filename, result.status, "{0:.3f}".format(result.seconds), result.message])
+
+    counts = collections.Counter(result.status for result in results)
+    latencies = sorted(result.seconds for result in results if result.status == 'updated')
+    logging.info("Batch summary: {0} items, {1} updated, {2} unchanged, {3} missing, {4} failed, {5} queued".format(
+        len(results), counts['updated'], counts['unchanged'], counts['missing'], counts['failed'], counts['queued']))
+    if latencies:
+        logging.info("Item latency: mean {0:.2f}s, median {1:.2f}s, max {2:.2f}s".format(
+            sum(latencies) / len(latencies), latencies[len(latencies) // 2], latencies[-1]))
+    if elapsed is not None:
+        logging.info("Batch wall time {0:.2f}s".format(elapsed))
+    return counts
@@ -0,0 +1,127 @@
+# ---------------------------------------------------------------------------
+# modChange.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Change detection for item updates.  New item properties and thumbnails are compared with the
+# values last pushed (kept as content hashes in a local manifest file) or with the item's current
+# values, so only the fields that differ are sent and unchanged items are skipped.
+#---------------------------------------------------------------------------
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import modWorkspace
+
+
+ITEM_FIELDS = ["snippet", "description", "accessInformation", "licenseInfo", "tags"]
+THUMBNAIL = "thumbnail"
+
+
+# Function: normalize
+# Description: Put a property value in a form that compares equal between the portal and our inputs.
+# Tags come back from the portal as a list, and are sent as a comma separated string.
+def normalize(field, value):
+    if value is None:
+        return ""
+    if field == "tags":
+        if isinstance(value, str):
+            value = value.split(",")
+        return ",".join(tag.strip() for tag in value if tag and tag.strip())
+    return str(value).strip()
+
+
+# Function: content_hash
+# Description: sha1 of a normalized property value
+def content_hash(field, value):
+    return hashlib.sha1(normalize(field, value).encode("utf-8")).hexdigest()
+
+
+# Function: file_hash
+# Description: sha1 of a file's contents, or None when the file does not exist
+def file_hash(path):
+    if not path or not os.path.isfile(path):
+        return None
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+# Class: ChangeManifest
+# Description: Content hashes of the properties and thumbnail last pushed to each item, saved as json
+class ChangeManifest(object):
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._changed = set()
+        self._lock = threading.Lock()
+        if os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                logging.info("Manifest file unreadable, starting a new one: " + path)
+
+    def get(self, itemid):
+        with self._lock:
+            return self.entries.get(itemid)
+
+    # Function: record
+    # Description: Remember what was pushed for an item
+    def record(self, itemid, item_properties, thumbhash=None):
+        with self._lock:
+            entry = self.entries.setdefault(itemid, {})
+            self._changed.add(itemid)
+            for field, value in item_properties.items():
+                entry[field] = content_hash(field, value)
+            if thumbhash:
+                entry[THUMBNAIL] = thumbhash
+
+    # Function: save
+    # Description: Write the manifest.  Items recorded by other runs since it was read are kept.
+    def save(self):
+        with self._lock, modWorkspace.FileLock(self.path + ".lock"):
+            if self._changed and os.path.isfile(self.path):
+                try:
+                    with open(self.path) as f:
+                        entries = json.load(f)
+                except ValueError:
+                    entries = {}
+                for itemid in self._changed:
+                    entries[itemid] = self.entries[itemid]
+                self.entries = entries
+            tmpfile = modWorkspace.temp_name(self.path)
+            with open(tmpfile, "w") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmpfile, self.path)
+
+
+# Function: changed_properties
+# Description: Return the properties that differ from the item.  Uses the manifest entry for the item
+# when there is one, otherwise the item's current values.
+def changed_properties(item, item_properties, manifest=None):
+    entry = manifest.get(item.id) if manifest is not None else None
+    changed = {}
+    for field, value in item_properties.items():
+        if entry is not None and field in entry:
+            if entry[field] != content_hash(field, value):
+                changed[field] = value
+        elif normalize(field, value) != normalize(field, getattr(item, field, None)):
+            changed[field] = value
+    return changed
+
+
+# Function: thumbnail_changed
+# Description: True when the thumbnail file exists and differs from the one last pushed to the item.
+# Without a manifest entry the thumbnail is always treated as changed.
+def thumbnail_changed(itemid, thumbhash, manifest=None):
+    if thumbhash is None:
+        return False
+    entry = manifest.get(itemid) if manifest is not None else None
+    return entry is None or entry.get(THUMBNAIL) != thumbhash
@@ -0,0 +1,155 @@
+# ---------------------------------------------------------------------------
+# modDescribe.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Item description html rendered from the metadata XML, in place of the html file made with the XSL
+# Transform tool.  The values are read in the same pass as the item information (see metadata_to_list)
+# and kept in the metadata cache, so an unchanged XML file is not read at all.  Templates are html files
+# with ${name} fields and <!--if name--> ... <!--end name--> blocks that are left out when the field is
+# empty.  Fields: title, abstract, summary, credits, tags, uselimits, legalconsts.  Abstract and
+# constraints written in the ArcGIS Pro metadata editor are html already and are used as they are, other
+# text is escaped.  A template is compiled once per process and again only when its file changes.
+#---------------------------------------------------------------------------
+
+import codecs
+import html
+import os
+import re
+import threading
+
+import modAGOL
+
+
+DEFAULT_TEMPLATE = """<div style="text-align:Left;">
+<!--if abstract--><div><p><span style="font-weight:bold;">Description</span></p>${abstract}</div><!--end abstract-->
+<!--if summary--><div><p><span style="font-weight:bold;">Purpose</span></p>${summary}</div><!--end summary-->
+<!--if credits--><div><p><span style="font-weight:bold;">Credits</span></p>${credits}</div><!--end credits-->
+<!--if uselimits--><div><p><span style="font-weight:bold;">Use limitations</span></p>${uselimits}</div><!--end uselimits-->
+<!--if legalconsts--><div><p><span style="font-weight:bold;">Legal constraints</span></p>${legalconsts}</div><!--end legalconsts-->
+<!--if tags--><div><p><span style="font-weight:bold;">Keywords</span></p><p>${tags}</p></div><!--end tags-->
+</div>"""
+
+_TOKEN = re.compile(r"<!--if (\w+)-->\s*|\s*<!--end (\w+)-->|\$\{(\w+)\}")
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+# Class: Template
+# Description: A compiled template, a list of text, field and block parts
+class Template(object):
+    def __init__(self, text, name="default"):
+        self.name = name
+        self.parts = self._compile(text)
+
+    def _compile(self, text):
+        root = []
+        stack = [(None, root)]
+        pos = 0
+        for match in _TOKEN.finditer(text):
+            if match.start() > pos:
+                stack[-1][1].append(("text", text[pos:match.start()]))
+            pos = match.end()
+            block, end, field = match.groups()
+            if block:
+                parts = []
+                stack[-1][1].append(("block", block, parts))
+                stack.append((block, parts))
+            elif end:
+                if stack[-1][0] != end:
+                    raise ValueError("Template {0}: <!--end {1}--> does not close a block".format(self.name, end))
+                stack.pop()
+            else:
+                stack[-1][1].append(("field", field))
+        if len(stack) > 1:
+            raise ValueError("Template {0}: block {1} is not closed".format(self.name, stack[-1][0]))
+        if pos < len(text):
+            root.append(("text", text[pos:]))
+        return root
+
+    # Function: render
+    # Description: The html for a dict of rendered field values
+    def render(self, values):
+        out = []
+        self._render(self.parts, values, out)
+        return "".join(out)
+
+    def _render(self, parts, values, out):
+        for part in parts:
+            if part[0] == "text":
+                out.append(part[1])
+            elif part[0] == "field":
+                out.append(values.get(part[1], ""))
+            elif values.get(part[1]):
+                self._render(part[2], values, out)
+
+
+# Function: get_template
+# Description: The compiled template of a file, or the built in template when path is None.  Compiled templates are
+# kept for the life of the process and compiled again when the file changes.
+def get_template(path=None):
+    key = os.path.normcase(os.path.abspath(path)) if path else None
+    stamp = None
+    if path:
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime)
+    with _templates_lock:
+        cached = _templates.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    if path:
+        with codecs.open(path, 'r', 'utf-8') as f:
+            template = Template(f.read(), os.path.basename(path))
+    else:
+        template = Template(DEFAULT_TEMPLATE)
+    with _templates_lock:
+        _templates[key] = (stamp, template)
+    return template
+
+
+# Text written in the metadata editor is html, text from other editors is escaped and kept in paragraphs
+def _html(text):
+    if not text:
+        return ""
+    if re.search(r"<[A-Za-z][^>]*>", text):
+        return text
+    return "".join("<p>" + html.escape(line) + "</p>" for line in text.splitlines() if line.strip())
+
+
+# Function: field_values
+# Description: The template values of the description fields read by metadata_to_list
+def field_values(fields):
+    return {"title": html.escape(fields.get("title") or ""),
+            "abstract": _html(fields.get("abstract")),
+            "summary": _html(fields.get("summary")),
+            "credits": _html(fields.get("credits")),
+            "tags": html.escape(", ".join(fields.get("tags") or [])),
+            "uselimits": "".join(_html(text) for text in fields.get("uselimits") or []),
+            "legalconsts": "".join(_html(text) for text in fields.get("legalconsts") or [])
+    }
+
+
+# Function: render
+# Description: The item description html for the description fields of one item
+def render(fields, template=None):
+    return get_template(template).render(field_values(fields))
+
+
+# Function: describe
+# Description: Read a metadata XML file and render its item description.  Returns the metadata list of
+# metadata_to_list and the description html.
+def describe(metadatafile, thumbpath, template=None, cache=None):
+    fields = {}
+    metadatalist = modAGOL.metadata_to_list(metadatafile, thumbpath, cache, fields)
+    return metadatalist, render(fields, template)
+
+
+# Function: read_description
+# Description: The item description from an html file made with the XSL Transform tool when one is given,
+# otherwise rendered from the description fields
+def read_description(htmlfile, fields, template=None):
+    if htmlfile:
+        with codecs.open(htmlfile, 'r', 'utf-8') as htmlopen:
+            return htmlopen.read()
+    return render(fields, template)
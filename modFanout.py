@@ -0,0 +1,141 @@
+# ---------------------------------------------------------------------------
+# modFanout.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Publishing one staged SD to several portals, e.g. the ArcGIS Online organization and an ArcGIS
+# Enterprise portal.  The SD is staged once, then uploaded, published over the existing service,
+# updated and shared on every target at the same time, each with its own credentials, item ids and
+# sharing.  Each target gets its own result, and a target that failed is tried again on the next run
+# while the targets that already have this SD are skipped.
+# The first target is the [AGOL] section with SERVICEID and SD_ID of [FS_INFO] and the sharing of
+# [FS_SHARE].  Each [TARGET <name>] section adds one:
+#   URL, USER, PASS, TOKENFILE (optional) - portal and credentials
+#   SERVICEID, SD_ID                      - feature service and SD item ids on that portal
+#   SHARE, EVERYONE, ORG, GROUPS          - sharing on that portal (optional, default [FS_SHARE])
+#---------------------------------------------------------------------------
+
+import collections
+import concurrent.futures
+import logging
+import time
+
+import modAGOL
+import modLedger
+import modSession
+import modTrace
+
+
+# Result of one target.  status is one of: published, unchanged, failed
+TargetResult = collections.namedtuple('TargetResult', ['target', 'status', 'seconds', 'message'])
+
+
+# Function: read_targets
+# Description: Read the publishing targets of a settings file, the [AGOL] portal first
+def read_targets(config):
+    share = dict((key, config.get('FS_SHARE', key.upper(), fallback=None)) for key in ("share", "everyone", "org", "groups"))
+    targets = [{"name": "AGOL",
+                "url": config.get('AGOL', 'URL'),
+                "user": config.get('AGOL', 'USER'),
+                "pass": config.get('AGOL', 'PASS'),
+                "tokenfile": config.get('AGOL', 'TOKENFILE', fallback=None),
+                "serviceid": config.get('FS_INFO', 'SERVICEID'),
+                "sd_id": config.get('FS_INFO', 'SD_ID'),
+                "shared": share["share"],
+                "everyone": share["everyone"],
+                "org": share["org"],
+                "groups": share["groups"] or ''
+    }]
+    for section in config.sections():
+        if not section.upper().startswith("TARGET"):
+            continue
+        targets.append({"name": section[len("TARGET"):].strip() or section,
+                        "url": config.get(section, 'URL'),
+                        "user": config.get(section, 'USER'),
+                        "pass": config.get(section, 'PASS'),
+                        "tokenfile": config.get(section, 'TOKENFILE', fallback=None),
+                        "serviceid": config.get(section, 'SERVICEID'),
+                        "sd_id": config.get(section, 'SD_ID'),
+                        "shared": config.get(section, 'SHARE', fallback=share["share"]),
+                        "everyone": config.get(section, 'EVERYONE', fallback=share["everyone"]),
+                        "org": config.get(section, 'ORG', fallback=share["org"]),
+                        "groups": config.get(section, 'GROUPS', fallback=share["groups"]) or ''
+        })
+    return targets
+
+
+# Function: target_key
+# Description: Key of a target in the SD cache record
+def target_key(target):
+    return "{0}|{1}".format(target["url"].rstrip("/").lower(), target["sd_id"])
+
+
+# Function: publish_target
+# Description: Runs in a thread per target.  Publishes the SD over the target's service unless it already has it,
+# then updates the item information and sharing.  Returns True when published.
+def publish_target(final_sd, target, service_name, metadatalist, htmldesc, thumbnail, manifest=None, part_size=None, skip_publish=False):
+    session = modSession.get_session(target["url"], target["user"], target["pass"], target["tokenfile"])
+    with modTrace.context(service_name):
+        published = False
+        if skip_publish:
+            logging.info("{0} already published to {1}, skipped".format(service_name, target["name"]))
+        elif modAGOL.publish_sd(final_sd, session, target["sd_id"], part_size=part_size):
+            published = True
+        else:
+            raise RuntimeError("SD file update failed")
+        modAGOL.update_featureservice(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], htmldesc, thumbnail, target["serviceid"], session,
+                                      target["shared"], target["everyone"], target["org"], target["groups"], manifest=manifest)
+    return published
+
+
+# Function: fan_out
+# Description: Publish a staged SD to all targets at once.  With an sd_cache and the SD's fingerprint, targets that
+# already have this SD are only updated, unless force is set.  Returns a TargetResult per target, in target order.
+def fan_out(final_sd, targets, service_name, metadatalist, htmldesc, thumbnail, manifest=None, part_size=None,
+            sd_cache=None, fingerprint=None, force=False):
+    done = set()
+    if sd_cache is not None and not force:
+        done = set(sd_cache.published_targets(service_name, fingerprint))
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        futures = {}
+        for target in targets:
+            skip = target_key(target) in done
+            futures[pool.submit(publish_target, final_sd, target, service_name, metadatalist, htmldesc, thumbnail,
+                                manifest, part_size, skip)] = (target, time.time())
+        for future in concurrent.futures.as_completed(futures):
+            target, start = futures[future]
+            try:
+                published = future.result()
+            except Exception as e:
+                results[target["name"]] = TargetResult(target["name"], "failed", time.time() - start, str(e))
+            else:
+                if published and sd_cache is not None:
+                    sd_cache.mark_published(service_name, fingerprint, target_key(target))
+                results[target["name"]] = TargetResult(target["name"], "published" if published else "unchanged", time.time() - start, "")
+            result = results[target["name"]]
+            logging.info("{0} {1} on {2} in {3:.1f}s {4}".format(result.status, service_name, result.target, result.seconds, result.message))
+
+    results = [results[target["name"]] for target in targets]
+    failed = [result.target for result in results if result.status == "failed"]
+    if failed:
+        modLedger.service_result(service_name, "failed", "Failed on " + ", ".join(failed))
+    else:
+        if sd_cache is not None:
+            sd_cache.mark_published(service_name, fingerprint)
+        modLedger.service_result(service_name, "published" if any(result.status == "published" for result in results) else "unchanged")
+    return results
+
+
+# Function: stage_and_fan_out
+# Description: Stage the SD once (reusing a cached SD when unchanged, see modSDCache) and publish it to all targets.
+# The first target's SD item id is part of the SD fingerprint.  With a staging pool (see modStaging) the SD is staged
+# in one of its warm processes.  Returns a TargetResult per target.
+def stage_and_fan_out(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled, metadatalist,
+                      final_sd, targets, htmldesc, thumbnail, manifest=None, sd_cache=None, force=False, part_size=None, pool=None):
+    logging.info("Start stage_and_fan_out of {0} to {1}".format(service_name, ", ".join(target["name"] for target in targets)))
+    final_sd, fingerprint, published = modAGOL.stage(aprx_file, map_name, draft_sd, service_name, folder_name, edit_enabled, export_enabled,
+                                                     metadatalist[0], metadatalist[2], metadatalist[1], metadatalist[3], final_sd,
+                                                     targets[0]["sd_id"], sd_cache, force, pool)
+    return fan_out(final_sd, targets, service_name, metadatalist, htmldesc, thumbnail, manifest, part_size, sd_cache, fingerprint, force)
@@ -0,0 +1,292 @@
+# ---------------------------------------------------------------------------
+# modFleet.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Publishes many hosted feature services in one run.  Service definitions are staged in a pool of warm
+# processes (staging is CPU bound and arcpy is not thread safe, see modStaging), and as each SD is ready its upload,
+# publish, item update and sharing run in a pool of threads.  Staging of the next services overlaps
+# the uploads of the finished ones, and publish jobs overlap on the portal.  The number of staged SDs
+# waiting for upload is bounded.
+#---------------------------------------------------------------------------
+
+import collections
+import concurrent.futures
+import configparser
+import contextlib
+import csv
+import logging
+import os
+import time
+
+import modAGOL
+import modChange
+import modDescribe
+import modJobs
+import modLedger
+import modSDCache
+import modSession
+import modShare
+import modStaging
+import modTrace
+import modWorkspace
+
+
+STAGE_WORKERS = 2       # Processes staging SD files
+IO_WORKERS = 4          # Threads uploading, publishing and updating items
+QUEUE_DEPTH = 4         # Staged SD files allowed to wait for upload
+
+# Result of one service.  status is one of: published, unchanged, failed
+ServiceResult = collections.namedtuple('ServiceResult', ['service', 'status', 'stage_seconds', 'publish_seconds', 'message'])
+
+
+# Function: read_service_settings
+# Description: Read a service settings file (same layout as for AGOL_UpdateFeatLyr_meta.py).  The html and
+# xml metadata files come from the arguments, or from DESCFILE and XMLFILE in the [FS_INFO] section.  Without
+# an html file the description is rendered from the xml file with DESCTEMPLATE (see modDescribe).
+def read_service_settings(settingsfile, htmldescfile=None, xmlmetafile=None):
+    config = configparser.ConfigParser()
+    with open(settingsfile) as fp:
+        config.read_file(fp)
+
+    settings = {"settingsfile": settingsfile,
+                "url": config.get('AGOL', 'URL'),
+                "user": config.get('AGOL', 'USER'),
+                "pass": config.get('AGOL', 'PASS'),
+                "tokenfile": config.get('AGOL', 'TOKENFILE', fallback=None),
+                "aprx": config.get('FS_INFO', 'APRX'),
+                "mapname": config.get('FS_INFO', 'MAPNAME'),
+                "servicename": config.get('FS_INFO', 'SERVICENAME'),
+                "serviceid": config.get('FS_INFO', 'SERVICEID'),
+                "sd_id": config.get('FS_INFO', 'SD_ID'),
+                "foldername": config.get('FS_INFO', 'FOLDERNAME'),
+                "editing": config.get('FS_INFO', 'EDITING') != "false",
+                "export": config.get('FS_INFO', 'EXPORT') != "false",
+                "descfile": htmldescfile or config.get('FS_INFO', 'DESCFILE', fallback=None),
+                "xmlfile": xmlmetafile or config.get('FS_INFO', 'XMLFILE', fallback=None),
+                "template": config.get('FS_INFO', 'DESCTEMPLATE', fallback=None),
+                "shared": config.get('FS_SHARE', 'SHARE'),
+                "everyone": config.get('FS_SHARE', 'EVERYONE'),
+                "org": config.get('FS_SHARE', 'ORG'),
+                "groups": config.get('FS_SHARE', 'GROUPS') or '',
+                "partsize": config.getint('FS_INFO', 'PARTSIZE', fallback=0) * 1024 * 1024
+    }
+    for key in ("aprx", "descfile", "xmlfile", "template"):
+        if key in ("descfile", "template") and not settings[key]:
+            continue
+        if not settings[key] or not os.path.isfile(settings[key]):
+            raise ValueError("{0}: {1} file not found: {2}".format(settingsfile, key, settings[key]))
+    return settings
+
+
+# Function: read_manifest
+# Description: Read a CSV manifest with columns INI, DESCFILE and XMLFILE (the last two optional)
+def read_manifest(manifestfile):
+    services = []
+    with open(manifestfile, newline='') as f:
+        for row in csv.DictReader(f):
+            services.append(read_service_settings(row['INI'], row.get('DESCFILE') or None, row.get('XMLFILE') or None))
+    return services
+
+
+# Function: _stage_job
+# Description: Runs in a staging process.  Reads the metadata and stages the SD for one service in its scratch folder.
+def _stage_job(settings, scratchdir, tempdir, force):
+    start = time.time()
+    serviceName = settings["servicename"]
+    draftSD = os.path.join(scratchdir, serviceName + ".sddraft")
+    finalSD = os.path.join(scratchdir, serviceName + ".sd")
+    inthumbnail = os.path.join(scratchdir, serviceName + ".jpg")
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(inthumbnail)
+
+    descfields = {}
+    metadatalist = modAGOL.metadata_to_list(settings["xmlfile"], inthumbnail, fields=descfields)
+    sdCache = modSDCache.SDCache(os.path.join(tempdir, "sdcache"))
+    finalSD, fingerprint, published = modAGOL.stage_service(settings["aprx"], settings["mapname"], draftSD, serviceName, settings["foldername"],
+                                                            settings["editing"], settings["export"], metadatalist[0], metadatalist[2], metadatalist[1],
+                                                            metadatalist[3], finalSD, settings["sd_id"], sdCache, force)
+    return {"sd": finalSD,
+            "fingerprint": fingerprint,
+            "published": published,
+            "metadata": metadatalist,
+            "fields": descfields,
+            "thumbnail": inthumbnail,
+            "seconds": time.time() - start
+    }
+
+
+# Function: _upload_job
+# Description: Runs in an I/O thread.  Uploads the staged SD and submits the overwrite publish without waiting for it.
+# Returns the publish job, or None when the SD was already published.
+def _upload_job(settings, staged):
+    if staged["published"]:
+        return None
+    session = modSession.get_session(settings["url"], settings["user"], settings["pass"], settings["tokenfile"])
+    with modTrace.context(settings["servicename"]):
+        job = modAGOL.submit_sd(staged["sd"], session, settings["sd_id"], part_size=settings["partsize"], name=settings["servicename"])
+    if job is None:
+        raise RuntimeError("SD file update failed")
+    return job
+
+
+# Function: _update_job
+# Description: Runs in an I/O thread.  Updates item information once the service is published, and queues its sharing
+# with the share engine of its session.
+def _update_job(settings, staged, manifest, sharing):
+    session = modSession.get_session(settings["url"], settings["user"], settings["pass"], settings["tokenfile"])
+    htmldesc = modDescribe.read_description(settings["descfile"], staged["fields"], settings["template"])
+    metadatalist = staged["metadata"]
+    with modTrace.context(settings["servicename"]):
+        modAGOL.update_featureservice(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], htmldesc, staged["thumbnail"], settings["serviceid"], session,
+                                      settings["shared"], settings["everyone"], settings["org"], settings["groups"], manifest=manifest, sharing=sharing[session])
+
+
+# Function: run_fleet
+# Description: Stage and publish all services.  Staging runs in stage_workers processes, uploads and updates in
+# io_workers threads.  New staging jobs wait while queue_depth staged SDs are waiting for upload.  Publish jobs
+# run on the portal without holding a thread (see modJobs), and each service's item update starts when its job finishes.
+# Pass a change manifest to share it with other work in the same process, otherwise tempdir\AGOL_manifest.json is used.
+# Sharing of all services is sent at the end in bulk, only where it differs (see modShare).
+# SD files are staged in the folders of a workspace (see modWorkspace) under tempdir, unless one is passed.  A service
+# locked by another run fails without waiting.  Pass a modStaging.StagingPool to stage in processes that are already
+# warm and keep them for the next call, otherwise a pool of stage_workers processes is started for this run.
+def run_fleet(services, tempdir, stage_workers=STAGE_WORKERS, io_workers=IO_WORKERS, queue_depth=QUEUE_DEPTH, force=False, manifest=None, workspace=None,
+              pool=None):
+    logging.info("Start fleet of {0} services, {1} staging processes, {2} upload threads".format(len(services), stage_workers, io_workers))
+    own_workspace = workspace is None
+    if own_workspace:
+        workspace = modWorkspace.Workspace(tempdir)
+    locks = {}
+    if manifest is None:
+        manifest = modChange.ChangeManifest(os.path.join(tempdir, "AGOL_manifest.json"))
+    sdCache = modSDCache.SDCache(os.path.join(tempdir, "sdcache"))
+    poller = modJobs.JobPoller()
+    sharing = {}
+    for settings in services:
+        session = modSession.get_session(settings["url"], settings["user"], settings["pass"], settings["tokenfile"])
+        if session not in sharing:
+            sharing[session] = modShare.ShareEngine(session)
+    results = {}
+    todo = collections.deque(services)
+    staging = {}
+    uploading = {}
+    updating = {}
+    state = {}
+
+    def finish(settings, status, message=""):
+        name = settings["servicename"]
+        info = state.get(name, {})
+        publish_seconds = time.time() - info["publish_start"] if "publish_start" in info else 0
+        result = ServiceResult(name, status, info.get("stage_seconds", 0), publish_seconds, message)
+        results[name] = result
+        modLedger.service_result(name, status, message)
+        lock = locks.pop(name, None)
+        if lock is not None:
+            lock.release()
+        logging.info("{0} {1} stage {2:.1f}s publish {3:.1f}s {4}".format(result.status, result.service, result.stage_seconds, result.publish_seconds, result.message))
+
+    def published(job, settings, staged):
+        if job.status != "completed":
+            finish(settings, "failed", "Publish failed: " + job.message)
+            return
+        sdCache.mark_published(settings["servicename"], staged["fingerprint"])
+        state[settings["servicename"]]["status"] = "published"
+        updating[iopool.submit(_update_job, settings, staged, manifest, sharing)] = settings
+
+    # A pool that was passed in stays open for the caller
+    if pool is not None:
+        stage_workers = pool.workers
+    with (modStaging.StagingPool(stage_workers) if pool is None else contextlib.nullcontext(pool)) as stagepool, \
+         concurrent.futures.ThreadPoolExecutor(max_workers=io_workers) as iopool:
+        while todo or staging or uploading or updating or poller.pending:
+            # Keep the staging processes busy while the upload queue has room
+            while todo and len(staging) < stage_workers and len(staging) + len(uploading) < stage_workers + queue_depth:
+                settings = todo.popleft()
+                lock = workspace.lock(settings["servicename"])
+                if not lock.acquire(timeout=0):
+                    finish(settings, "failed", "Locked by another run")
+                    continue
+                locks[settings["servicename"]] = lock
+                scratchdir = workspace.service_dir(settings["servicename"])
+                staging[stagepool.submit(_stage_job, settings, scratchdir, tempdir, force)] = settings
+
+            futures = list(staging) + list(uploading) + list(updating)
+            timeout = poller.next_due()
+            if futures:
+                done, pending = concurrent.futures.wait(futures, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+            else:
+                done = []
+                time.sleep(timeout or 0)
+
+            for future in done:
+                if future in staging:
+                    settings = staging.pop(future)
+                    try:
+                        staged = future.result()
+                    except Exception as e:
+                        finish(settings, "failed", "Staging failed: " + str(e))
+                        continue
+                    logging.info("Staged {0} in {1:.1f}s".format(settings["servicename"], staged["seconds"]))
+                    modTrace.record("stage", staged["seconds"], service=settings["servicename"])
+                    state[settings["servicename"]] = {"stage_seconds": staged["seconds"], "publish_start": time.time(), "staged": staged, "status": "unchanged"}
+                    uploading[iopool.submit(_upload_job, settings, staged)] = settings
+                elif future in uploading:
+                    settings = uploading.pop(future)
+                    staged = state[settings["servicename"]]["staged"]
+                    try:
+                        job = future.result()
+                    except Exception as e:
+                        finish(settings, "failed", "Upload failed: " + str(e))
+                        continue
+                    if job is None:
+                        updating[iopool.submit(_update_job, settings, staged, manifest, sharing)] = settings
+                    else:
+                        job.callback = lambda job, settings=settings, staged=staged: published(job, settings, staged)
+                        poller.add(job)
+                else:
+                    settings = updating.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        finish(settings, "failed", "Item update failed: " + str(e))
+                        continue
+                    finish(settings, state[settings["servicename"]]["status"])
+
+            # A publish callback that raised left its service without a result
+            for job in poller.poll():
+                if job.status == "failed" and job.name not in results and job.name in locks:
+                    finish(next(settings for settings in services if settings["servicename"] == job.name), "failed", job.message)
+
+    # Share all services that need it, a few bulk requests per portal user
+    names = dict((settings["serviceid"], settings["servicename"]) for settings in services)
+    for engine in sharing.values():
+        for result in engine.apply():
+            name = names.get(result.itemid)
+            if result.status == "failed" and name in results:
+                results[name] = results[name]._replace(status="failed", message="Sharing failed: " + result.message)
+                modLedger.service_result(name, "failed", "Sharing failed: " + result.message)
+                logging.info("Sharing failed for {0}: {1}".format(name, result.message))
+    manifest.save()
+    if own_workspace:
+        workspace.close()
+    return [results[settings["servicename"]] for settings in services]
+
+
+# Function: write_report
+# Description: Write per service results to a CSV file and log a summary
+def write_report(results, reportfile, elapsed=None):
+    with open(reportfile, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(ServiceResult._fields)
+        for result in results:
+            writer.writerow([result.service, result.status, "{0:.1f}".format(result.stage_seconds), "{0:.1f}".format(result.publish_seconds), result.message])
+
+    counts = collections.Counter(result.status for result in results)
+    logging.info("Fleet summary: {0} services, {1} published, {2} unchanged, {3} failed".format(
+        len(results), counts['published'], counts['unchanged'], counts['failed']))
+    if elapsed is not None:
+        logging.info("Fleet wall time {0:.1f}s, staging {1:.1f}s, publishing {2:.1f}s".format(
+            elapsed, sum(r.stage_seconds for r in results), sum(r.publish_seconds for r in results)))
+    return counts
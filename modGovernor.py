@@ -0,0 +1,194 @@
+# ---------------------------------------------------------------------------
+# modGovernor.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Governs the requests sent to one portal.  Throttled (429) and transient (5xx, connection and timeout)
+# failures are retried a few times with jittered exponential backoff.  The number of requests in flight
+# adapts to the portal: it grows by one per round of healthy responses and is halved when the portal
+# throttles or fails (AIMD).  After repeated failures a circuit breaker pauses all work on the portal for
+# a cool down, then lets one probe request through before the rest resume.
+#---------------------------------------------------------------------------
+
+import logging
+import random
+import re
+import threading
+import time
+
+import modTrace
+
+
+START_LIMIT = 4             # Requests in flight at the start
+MAX_LIMIT = 16              # Most requests in flight, matches the session connection pool
+MAX_RETRIES = 5             # Retries of one request
+BASE_BACKOFF = 1.0          # Seconds before the first retry, doubled for each retry
+MAX_BACKOFF = 60.0
+LATENCY_FACTOR = 2.0        # Responses slower than this times the best latency seen do not raise the limit
+DECREASE_INTERVAL = 2.0     # Seconds between decreases, so one burst of 429s only halves the limit once
+BREAKER_THRESHOLD = 5       # Failures in a row that open the circuit breaker
+BREAKER_COOLDOWN = 30.0     # Seconds paused when the breaker opens, doubled while the portal stays down
+MAX_COOLDOWN = 300.0
+MAX_PAUSE = 1800.0          # Seconds a request waits on an open breaker before giving up
+
+THROTTLED = "throttled"
+TRANSIENT = "transient"
+_ERROR_CODE = re.compile(r"(?:Portal error|Error Code:?|HTTP Error)\s*(\d{3})", re.IGNORECASE)
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+# Function: classify
+# Description: Return THROTTLED or TRANSIENT for failures worth retrying, or None.  Works on requests
+# exceptions (with or without a response), on portal errors raised by modSession and on arcgis exceptions.
+def classify(error):
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        match = _ERROR_CODE.search(str(error))
+        if match:
+            status = int(match.group(1))
+        elif "too many requests" in str(error).lower():
+            status = 429
+    if status == 429:
+        return THROTTLED
+    if status in (500, 502, 503, 504):
+        return TRANSIENT
+    if status is None and isinstance(error, OSError):
+        # Connection refused or reset, timeouts (requests exceptions are OSErrors too)
+        return TRANSIENT
+    return None
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+# Class: Governor
+# Description: Concurrency limit, retries and circuit breaker of one portal.  Safe to share between threads.
+class Governor(object):
+    def __init__(self, name, limit=START_LIMIT, max_limit=MAX_LIMIT):
+        self.name = name
+        self.limit = float(limit)
+        self.max_limit = max_limit
+        self.active = 0
+        self.latency = None
+        self.best_latency = None
+        self.failures = 0
+        self.state = "closed"
+        self.open_until = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self._probing = False
+        self._last_decrease = 0
+        self._cond = threading.Condition()
+
+    # Function: call
+    # Description: Run fn() under the limit and retry it on throttled and transient failures.  Transient failures
+    # are only retried when idempotent, a request the portal throttled was never run and is always safe to send again.
+    # Failures while the breaker is open do not use up retries, the request waits for the portal up to MAX_PAUSE.
+    def call(self, fn, idempotent=True):
+        attempt = 0
+        deadline = time.time() + MAX_PAUSE
+        while True:
+            self._acquire(deadline)
+            start = time.time()
+            try:
+                result = fn()
+            except Exception as e:
+                kind = classify(e)
+                self._release(time.time() - start, kind)
+                if kind is None or (kind == TRANSIENT and not idempotent):
+                    raise
+                if self.state == "open":
+                    continue
+                if attempt >= MAX_RETRIES:
+                    raise
+                delay = random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+                delay = max(delay, _retry_after(e) or 0)
+                attempt += 1
+                logging.info("{0} from {1}, retry {2} of {3} in {4:.1f}s: {5}".format(kind, self.name, attempt, MAX_RETRIES, delay, e))
+                modTrace.record("retry", delay, False, portal=self.name, kind=kind)
+                time.sleep(delay)
+                continue
+            self._release(time.time() - start, None)
+            return result
+
+    def _acquire(self, deadline):
+        with self._cond:
+            while True:
+                now = time.time()
+                if self.state == "open":
+                    if now < self.open_until:
+                        if now > deadline:
+                            raise RuntimeError("Portal {0} unavailable, gave up after {1:.0f}s".format(self.name, MAX_PAUSE))
+                        self._cond.wait(min(self.open_until - now, 5))
+                        continue
+                    self.state = "half-open"
+                    self._probing = False
+                if self.state == "half-open":
+                    # One probe request tests the portal, the rest wait for its result
+                    if not self._probing:
+                        self._probing = True
+                        self.active += 1
+                        return
+                elif self.active < int(self.limit):
+                    self.active += 1
+                    return
+                self._cond.wait(1)
+
+    def _release(self, seconds, kind):
+        with self._cond:
+            self.active -= 1
+            now = time.time()
+            if kind is None:
+                self.failures = 0
+                if self.state == "half-open":
+                    self.state = "closed"
+                    self.cooldown = BREAKER_COOLDOWN
+                    logging.info("Portal {0} is back, circuit closed".format(self.name))
+                self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+                self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+                if self.latency <= LATENCY_FACTOR * self.best_latency and self.limit < self.max_limit:
+                    # Additive increase: about one more request in flight per round of healthy responses
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            else:
+                if now - self._last_decrease > DECREASE_INTERVAL:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+                    logging.info("{0} from {1}, limit lowered to {2}".format(kind, self.name, int(self.limit)))
+                if kind == TRANSIENT:
+                    self.failures += 1
+                    if self.state == "half-open":
+                        self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+                        self._open(now)
+                    elif self.state == "closed" and self.failures >= BREAKER_THRESHOLD:
+                        self._open(now)
+                elif self.state == "half-open":
+                    # Throttled, but answering: the lowered limit takes over from the breaker
+                    self.state = "closed"
+                    self.cooldown = BREAKER_COOLDOWN
+            self._cond.notify_all()
+
+    def _open(self, now):
+        self.state = "open"
+        self.open_until = now + self.cooldown
+        logging.info("Portal {0} failing, circuit open, work paused for {1:.0f}s".format(self.name, self.cooldown))
+        modTrace.record("breaker", self.cooldown, False, portal=self.name)
+
+
+# Function: get_governor
+# Description: Return the governor shared by all sessions of a portal
+def get_governor(url):
+    key = url.rstrip("/").lower()
+    with _governors_lock:
+        governor = _governors.get(key)
+        if governor is None:
+            governor = Governor(key)
+            _governors[key] = governor
+        return governor
@@ -0,0 +1,110 @@
+# ---------------------------------------------------------------------------
+# modIndex.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# In-memory index of the items owned by the signed in user.  All of the owner's items are read
+# in one paged search sweep, then looked up by id, exact title and type for the rest of the run
+# instead of calling gis.content.search for every item.
+#---------------------------------------------------------------------------
+
+import logging
+import threading
+
+
+PAGE_SIZE = 100     # Largest page the portal search returns
+
+
+# Class: ItemIndex
+# Description: Items of one owner keyed by id, title and type.  Each entry is the portal item
+# json (id, title, type, modified, snippet, tags, ...).
+class ItemIndex(object):
+    def __init__(self, session, owner=None):
+        self.session = session
+        self.owner = owner or session.user
+        self.by_id = {}
+        self.by_title = {}
+        self.by_type = {}
+        self._items = {}
+        self._lock = threading.RLock()
+
+    # Function: refresh
+    # Description: Read all of the owner's items in one paged sweep and rebuild the index
+    def refresh(self):
+        items = []
+        start = 1
+        while start > 0:
+            result = self.session.request("search", {"q": "owner:" + self.owner,
+                                                     "num": PAGE_SIZE,
+                                                     "start": start,
+                                                     "sortField": "modified"}, method="GET")
+            items.extend(result.get("results", []))
+            start = result.get("nextStart", -1)
+        with self._lock:
+            self.by_id = {}
+            self.by_title = {}
+            self.by_type = {}
+            self._items = {}
+            for itemdict in items:
+                self.add(itemdict)
+        logging.info("Indexed {0} items for {1}".format(len(items), self.owner))
+        return self
+
+    # Function: add
+    # Description: Add or replace the json for an item, e.g. after it is published or updated
+    def add(self, itemdict):
+        with self._lock:
+            old = self.by_id.get(itemdict["id"])
+            if old is not None:
+                self._remove(old)
+            self.by_id[itemdict["id"]] = itemdict
+            self.by_title.setdefault(itemdict.get("title"), []).append(itemdict)
+            self.by_type.setdefault(itemdict.get("type"), []).append(itemdict)
+            self._items.pop(itemdict["id"], None)
+
+    def _remove(self, itemdict):
+        for key, table in ((itemdict.get("title"), self.by_title), (itemdict.get("type"), self.by_type)):
+            entries = table.get(key, [])
+            if itemdict in entries:
+                entries.remove(itemdict)
+
+    # Function: get
+    # Description: Return the json for an item id, or None.  item_type must match when given.
+    def get(self, itemid, item_type=None):
+        itemdict = self.by_id.get(itemid)
+        if itemdict is None or (item_type and itemdict.get("type") != item_type):
+            return None
+        return itemdict
+
+    # Function: find
+    # Description: Return the json for the item with exactly this title, or None
+    def find(self, title, item_type=None):
+        for itemdict in self.by_title.get(title, []):
+            if not item_type or itemdict.get("type") == item_type:
+                return itemdict
+        return None
+
+    # Function: of_type
+    # Description: Return the json of all items of one type
+    def of_type(self, item_type):
+        return list(self.by_type.get(item_type, []))
+
+    # Function: item
+    # Description: Return an arcgis Item built from the indexed json, so no extra request is made
+    def item(self, itemdict):
+        from arcgis.gis import Item
+        if itemdict is None:
+            return None
+        with self._lock:
+            item = self._items.get(itemdict["id"])
+            if item is None:
+                item = Item(self.session.gis, itemdict["id"], itemdict)
+                self._items[itemdict["id"]] = item
+            return item
+
+
+# Function: prefetch
+# Description: Build the item index for the session owner
+def prefetch(session, owner=None):
+    return ItemIndex(session, owner).refresh()
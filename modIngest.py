@@ -0,0 +1,74 @@
+# ---------------------------------------------------------------------------
+# modIngest.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Multi-core ingest of a metadata directory.  The XML and HTML exports of each item are read in a pool
+# of processes, so XML parsing and thumbnail decoding use all cores instead of sharing one with the
+# portal requests.  Each process writes its thumbnails to its own folder.  Records are handed to the
+# caller in input order as soon as they are ready, while later files are still being parsed.  Items
+# without an HTML export get their description rendered from the XML (see modDescribe), each process
+# compiles the template once for all its items.
+#---------------------------------------------------------------------------
+
+import collections
+import concurrent.futures
+import contextlib
+import os
+import time
+
+import modAGOL
+import modDescribe
+import modMetaCache
+
+
+PARSE_WORKERS = os.cpu_count() or 1
+MIN_ITEMS = 20          # Smaller batches are parsed in the update threads, a process pool costs more than it saves
+CHUNK_SIZE = 4          # Files sent to a process at a time
+
+# Parsed exports of one item.  status is one of: ok, missing, failed
+MetadataRecord = collections.namedtuple('MetadataRecord', ['itemid', 'filename', 'status', 'metadata', 'htmldesc', 'thumbnail', 'seconds', 'message'])
+
+
+# Function: read_pair
+# Description: Read <filename>.xml and <filename>.html from the metadata directory.  Without the html file the
+# description is rendered from the xml file with the template (None for the built in one).  The thumbnail is
+# written to a folder of the calling process under tempdir\ingest.
+def read_pair(itemid, filename, metadir, tempdir, template=None):
+    start = time.time()
+    htmlfile = os.path.join(metadir, filename + ".html")
+    xmlfile = os.path.join(metadir, filename + ".xml")
+    if not os.path.isfile(xmlfile):
+        return MetadataRecord(itemid, filename, 'missing', None, None, None, time.time() - start, "Metadata files not found")
+    if not os.path.isfile(htmlfile):
+        htmlfile = None
+
+    try:
+        workdir = os.path.join(tempdir, "ingest", str(os.getpid()))
+        if not os.path.isdir(workdir):
+            os.makedirs(workdir)
+        inthumbnail = os.path.join(workdir, filename + ".jpg")
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(inthumbnail)
+
+        descfields = {}
+        metadatalist = modAGOL.metadata_to_list(xmlfile, inthumbnail, fields=descfields)
+        htmldesc = modDescribe.read_description(htmlfile, descfields, template)
+    except Exception as e:
+        return MetadataRecord(itemid, filename, 'failed', None, None, None, time.time() - start, str(e))
+    return MetadataRecord(itemid, filename, 'ok', metadatalist, htmldesc, inthumbnail, time.time() - start, "")
+
+
+def _read_pair(args):
+    return read_pair(*args)
+
+
+# Function: ingest
+# Description: Read the exports of all items in a pool of processes.  Yields a MetadataRecord per item, in input order.
+# The metadata cache settings of this process (see modMetaCache) are used in the pool.
+def ingest(items, metadir, tempdir, workers=PARSE_WORKERS, template=None):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=modMetaCache.configure,
+                                                initargs=modMetaCache.settings()) as pool:
+        for record in pool.map(_read_pair, [(itemid, filename, metadir, tempdir, template) for itemid, filename in items], chunksize=CHUNK_SIZE):
+            yield record
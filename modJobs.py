@@ -0,0 +1,158 @@
+# ---------------------------------------------------------------------------
+# modJobs.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Non-blocking publish of service definitions.  Overwrite publish jobs are submitted to the portal and
+# a job handle is returned right away.  A poller checks the status of many jobs, backing off between
+# checks, and calls each job's callback as it finishes so the follow up item update and sharing can
+# start while other services are still publishing.
+#---------------------------------------------------------------------------
+
+import json
+import logging
+import threading
+import time
+
+import modTrace
+
+
+FIRST_POLL = 2          # Seconds before the first status check
+MAX_POLL = 30           # Longest wait between status checks
+BACKOFF = 1.5
+JOB_TIMEOUT = 3600      # Seconds before a job is given up
+
+
+# Class: PublishJob
+# Description: Handle of one publish job.  status is submitted, processing, completed or failed.
+class PublishJob(object):
+    def __init__(self, session, name, sd_itemid, service_itemid, job_id, callback=None):
+        self.session = session
+        self.name = name
+        self.sd_itemid = sd_itemid
+        self.service_itemid = service_itemid
+        self.job_id = job_id
+        self.callback = callback
+        self.status = "submitted"
+        self.message = ""
+        self.submitted = time.time()
+        self.finished = None
+        self.next_poll = self.submitted + FIRST_POLL
+        self.delay = FIRST_POLL
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed")
+
+    @property
+    def seconds(self):
+        return (self.finished or time.time()) - self.submitted
+
+    # Function: check
+    # Description: Ask the portal for the job status once
+    def check(self):
+        path = "content/users/{0}/items/{1}/status".format(self.session.user, self.service_itemid)
+        try:
+            result = self.session.request(path, {"jobId": self.job_id, "jobType": "publish"}, method="GET")
+        except Exception as e:
+            # A failed status request is not a failed job, try again later
+            logging.info("Status check failed for {0}: {1}".format(self.name, e))
+            return self.status
+        status = result.get("status", "processing")
+        if status in ("completed", "failed"):
+            self.status = status
+            self.message = result.get("statusMessage", "")
+            self.finished = time.time()
+        else:
+            self.status = "processing"
+        return self.status
+
+
+# Function: submit_publish
+# Description: Submit an overwrite publish of an SD item and return its job handle without waiting.
+# callback(job) is called by the poller when the job finishes.
+def submit_publish(session, sd_item, publish_parameters=None, name=None, callback=None):
+    params = {"itemId": sd_item.id,
+              "filetype": "serviceDefinition",
+              "overwrite": "true",
+              "publishParameters": json.dumps(publish_parameters or {})
+    }
+    result = session.request("content/users/{0}/publish".format(session.user), params, idempotent=False)
+    services = result.get("services", [])
+    if not services or not services[0].get("jobId"):
+        raise RuntimeError("Publish not submitted for {0}: {1}".format(name or sd_item.id, json.dumps(result)))
+    service = services[0]
+    if "error" in service:
+        raise RuntimeError("Publish not submitted for {0}: {1}".format(name or sd_item.id, json.dumps(service["error"])))
+    job = PublishJob(session, name or sd_item.id, sd_item.id, service["serviceItemId"], service["jobId"], callback)
+    logging.info("Publish submitted for {0}, job {1}".format(job.name, job.job_id))
+    return job
+
+
+# Class: JobPoller
+# Description: Tracks many publish jobs.  Each job is polled with its own backoff and its callback is called once
+# when it finishes.  Callbacks run on the polling thread and should hand longer work to a thread pool.  A job whose
+# callback raises is marked failed.
+class JobPoller(object):
+    def __init__(self):
+        self.jobs = []
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self.jobs.append(job)
+
+    @property
+    def pending(self):
+        with self._lock:
+            return [job for job in self.jobs if not job.done]
+
+    # Function: next_due
+    # Description: Seconds until the next job needs to be polled, or None when nothing is pending
+    def next_due(self):
+        pending = self.pending
+        if not pending:
+            return None
+        return max(0, min(job.next_poll for job in pending) - time.time())
+
+    # Function: poll
+    # Description: Check the jobs that are due and return the ones that finished
+    def poll(self):
+        finished = []
+        now = time.time()
+        for job in self.pending:
+            if job.next_poll > now:
+                continue
+            if job.check() in ("completed", "failed"):
+                finished.append(job)
+            elif now - job.submitted > JOB_TIMEOUT:
+                job.status = "failed"
+                job.message = "Timed out"
+                job.finished = now
+                finished.append(job)
+            else:
+                job.delay = min(job.delay * BACKOFF, MAX_POLL)
+                job.next_poll = time.time() + job.delay
+        for job in finished:
+            modTrace.record("publish", job.seconds, job.status == "completed", service=job.name, job=job.job_id)
+            logging.info("Publish {0} {1} in {2:.0f}s {3}".format(job.status, job.name, job.seconds, job.message))
+            if job.callback is not None:
+                # A failing callback fails its own job, the other jobs are still polled
+                try:
+                    job.callback(job)
+                except Exception as e:
+                    logging.exception("Callback failed for {0}".format(job.name))
+                    job.status = "failed"
+                    job.message = "Callback failed: " + str(e)
+        return finished
+
+    # Function: wait_all
+    # Description: Poll until all jobs have finished.  Returns all jobs.
+    def wait_all(self):
+        while True:
+            due = self.next_due()
+            if due is None:
+                return list(self.jobs)
+            time.sleep(due)
+            self.poll()
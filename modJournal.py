@@ -0,0 +1,261 @@
+# ---------------------------------------------------------------------------
+# modJournal.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Write-ahead journal of item updates in SQLite.  Item information, thumbnail and sharing updates are
+# written to the journal first and sent to the portal by flush().  Updates queued for the same item are
+# merged, the last value queued for a field wins, so an item updated by several runs while the portal
+# was down is sent once.  Items are flushed in batches: one search finds the items of a batch, their
+# updates go out on a pool of worker threads, and their sharing in bulk requests (see modShare).
+# Updates that could not be sent stay in the journal and are tried again by the next flush, so a portal
+# outage delays updates instead of losing them.  Thumbnails are copied next to the journal, the run
+# folder they were written to may be removed before the flush.
+#---------------------------------------------------------------------------
+
+import collections
+import concurrent.futures
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import modAGOL
+import modChange
+import modGovernor
+import modShare
+import modTrace
+import modWorkspace
+
+
+JOURNAL_NAME = "AGOL_journal.sqlite"    # Journal file in the workspace root
+BATCH_SIZE = 100        # Items per flush batch, one search request finds them all
+WORKERS = 8             # Item updates in flight during a flush
+MAX_ATTEMPTS = 5        # Flushes an update is tried in before it is dropped, portal outages do not count
+SHARING = "sharing"
+
+# Result of one item in a flush.  status is one of: updated, unchanged, missing, failed, queued (kept for the next flush)
+# A missing item was not found or is not the session user's, its update is dropped and counts as a failure
+JournalResult = collections.namedtuple('JournalResult', ['itemid', 'status', 'message'])
+
+
+def _portal(session):
+    return session.url.rstrip("/").lower()
+
+
+# Class: UpdateJournal
+# Description: Journal of queued item updates.  One journal can be shared by threads and by processes.
+class UpdateJournal(object):
+    def __init__(self, path):
+        self.path = path
+        self.thumb_dir = os.path.splitext(path)[0] + "_thumbs"
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # seq grows with every write, a field replaced while a flush sends it keeps its newer value
+        self._conn.execute("CREATE TABLE IF NOT EXISTS updates (seq INTEGER PRIMARY KEY AUTOINCREMENT, portal TEXT, user TEXT, itemid TEXT, "
+                           "field TEXT, value TEXT, queued REAL, attempts INTEGER DEFAULT 0, error TEXT, owned INTEGER DEFAULT 1, "
+                           "UNIQUE (portal, user, itemid, field))")
+        # Journals made before the owned flag get the column, their updates are searched without the owner restriction
+        if "owned" not in [column[1] for column in self._conn.execute("PRAGMA table_info(updates)")]:
+            self._conn.execute("ALTER TABLE updates ADD COLUMN owned INTEGER DEFAULT 0")
+        self._conn.commit()
+
+    # Function: enqueue
+    # Description: Queue item information for an item, replacing what is queued for the same fields.  The thumbnail is
+    # copied into the journal.  sharing is an (everyone, org, groups) tuple as in the [FS_SHARE] section, or None.
+    # With owned=False the item is found when the session user can edit it without owning it (see modAGOL.find_item).
+    def enqueue(self, session, itemid, item_properties, itemthumb_file=None, sharing=None, owned=True):
+        fields = dict((field, json.dumps(value)) for field, value in item_properties.items())
+        thumbhash = modChange.file_hash(itemthumb_file)
+        if thumbhash:
+            fields[modChange.THUMBNAIL] = json.dumps(modWorkspace.commit(itemthumb_file, os.path.join(self.thumb_dir, thumbhash + ".jpg"), copy=True))
+        if sharing is not None:
+            fields[SHARING] = json.dumps(list(sharing))
+        now = time.time()
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO updates (portal, user, itemid, field, value, queued, owned) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   [(_portal(session), session.user, itemid, field, value, now, int(owned)) for field, value in fields.items()])
+            self._conn.commit()
+        logging.info("Queued update of {0}: {1}".format(itemid, ", ".join(sorted(fields))))
+        return True
+
+    # Function: pending
+    # Description: Number of items with queued updates, for one session's portal and user or for all
+    def pending(self, session=None):
+        with self._lock:
+            if session is None:
+                return self._conn.execute("SELECT COUNT(DISTINCT portal || '|' || user || '|' || itemid) FROM updates").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(DISTINCT itemid) FROM updates WHERE portal = ? AND user = ?",
+                                      (_portal(session), session.user)).fetchone()[0]
+
+    # Returns the queued fields by item, and the items with an update queued with owned=False
+    def _read(self, session):
+        with self._lock:
+            rows = self._conn.execute("SELECT seq, itemid, field, value, owned FROM updates WHERE portal = ? AND user = ? ORDER BY seq",
+                                      (_portal(session), session.user)).fetchall()
+        queued = collections.OrderedDict()
+        unowned = set()
+        for seq, itemid, field, value, owned in rows:
+            queued.setdefault(itemid, {})[field] = (seq, json.loads(value))
+            if not owned:
+                unowned.add(itemid)
+        return queued, unowned
+
+    # Function: flush
+    # Description: Send the queued updates of the session's portal and user, in batches of batch_size items.  Pass an
+    # item index (modIndex.prefetch) so items are not searched, and a change manifest (modChange.ChangeManifest) so
+    # only changed fields are sent.  Stops while the portal is unavailable, the rest stays queued.  Returns a
+    # JournalResult per item.
+    def flush(self, session, index=None, manifest=None, batch_size=BATCH_SIZE, workers=WORKERS):
+        results = []
+        # One run at a time flushes, so no update is sent twice
+        with modWorkspace.FileLock(self.path + ".lock"):
+            queued, unowned = self._read(session)
+            if not queued:
+                return results
+            itemids = list(queued)
+            logging.info("Flush {0} queued items to {1}".format(len(itemids), session.url))
+            with modTrace.span("flush", items=len(itemids)):
+                for num in range(0, len(itemids), batch_size):
+                    batch = itemids[num:num + batch_size]
+                    # After an outage the rest waits for the next flush instead of for the portal
+                    if session.governor.state == "open" or (results and results[-1].status == "queued"):
+                        results.extend(JournalResult(itemid, "queued", "Portal unavailable") for itemid in batch)
+                        continue
+                    results.extend(self._flush_batch(session, batch, queued, unowned, index, manifest, workers))
+
+        counts = collections.Counter(result.status for result in results)
+        logging.info("Journal flush: {0} items, {1} updated, {2} unchanged, {3} missing, {4} failed, {5} still queued".format(
+            len(results), counts["updated"], counts["unchanged"], counts["missing"], counts["failed"], counts["queued"]))
+        return results
+
+    def _flush_batch(self, session, batch, queued, unowned, index, manifest, workers):
+        try:
+            items = find_items(session, [itemid for itemid in batch if itemid not in unowned], index)
+            items.update(find_items(session, [itemid for itemid in batch if itemid in unowned], index, owned=False))
+        except Exception as e:
+            return self._failed(session, batch, queued, e)
+
+        engine = modShare.ShareEngine(session)
+        outcomes = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = dict((pool.submit(_send, session, items.get(itemid), queued[itemid], manifest, engine), itemid) for itemid in batch)
+            for future in concurrent.futures.as_completed(futures):
+                itemid = futures[future]
+                try:
+                    outcomes[itemid] = (future.result(), None)
+                except Exception as e:
+                    outcomes[itemid] = ("failed", e)
+        for share in engine.apply():
+            if share.status == "failed":
+                outcomes[share.itemid] = ("failed", RuntimeError(share.message))
+            elif share.status == "shared":
+                outcomes[share.itemid] = ("updated", None)
+
+        results = []
+        for itemid in batch:
+            status, error = outcomes[itemid]
+            if status == "failed":
+                results.extend(self._failed(session, [itemid], queued, error))
+                continue
+            message = ""
+            if status == "missing":
+                message = "Item not found or not owned by " + session.user if itemid not in unowned else "Item not found"
+                logging.info("{0}: {1}, queued update dropped".format(itemid, message))
+            self._remove(session, itemid, queued[itemid])
+            results.append(JournalResult(itemid, status, message))
+        return results
+
+    # Updates that failed because the portal is unavailable stay queued as they are, other failures use up an attempt.
+    # The governor gives up on a portal that stays down with "Portal ... unavailable".
+    def _failed(self, session, itemids, queued, error):
+        if modGovernor.classify(error) is not None or session.governor.state == "open" or "unavailable" in str(error):
+            return [JournalResult(itemid, "queued", str(error)) for itemid in itemids]
+        results = []
+        for itemid in itemids:
+            seqs = [seq for seq, value in queued[itemid].values()]
+            with self._lock:
+                self._conn.executemany("UPDATE updates SET attempts = attempts + 1, error = ? WHERE seq = ?", [(str(error), seq) for seq in seqs])
+                self._conn.commit()
+                attempts = self._conn.execute("SELECT MAX(attempts) FROM updates WHERE seq IN ({0})".format(",".join("?" * len(seqs))), seqs).fetchone()[0] or 0
+            if attempts >= MAX_ATTEMPTS:
+                logging.info("Update of {0} failed {1} times, dropped: {2}".format(itemid, attempts, error))
+                self._remove(session, itemid, queued[itemid])
+            else:
+                logging.info("Update of {0} failed, attempt {1} of {2}: {3}".format(itemid, attempts, MAX_ATTEMPTS, error))
+            results.append(JournalResult(itemid, "failed", str(error)))
+        return results
+
+    # Removes the sent rows.  Rows replaced since they were read have a new seq and stay queued.
+    def _remove(self, session, itemid, fields):
+        with self._lock:
+            self._conn.executemany("DELETE FROM updates WHERE seq = ?", [(seq,) for seq, value in fields.values()])
+            self._conn.commit()
+            thumbnail = fields.get(modChange.THUMBNAIL)
+            if thumbnail and not self._conn.execute("SELECT 1 FROM updates WHERE field = ? AND value = ?",
+                                                    (modChange.THUMBNAIL, json.dumps(thumbnail[1]))).fetchone():
+                with contextlib.suppress(OSError):
+                    os.remove(thumbnail[1])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Function: find_items
+# Description: Find items by id, from the item index when given, the others with one search per batch.  With owned=True
+# (as modAGOL.find_item) only items of the session user are searched for.  The index holds the items of its owner,
+# so it is only used when that is the session user.
+def find_items(session, itemids, index=None, owned=True):
+    items = {}
+    if index is not None and index.owner.lower() == session.user.lower():
+        for itemid in itemids:
+            item = index.item(index.get(itemid))
+            if item is not None:
+                items[itemid] = item
+    missing = [itemid for itemid in itemids if itemid not in items]
+    for num in range(0, len(missing), BATCH_SIZE):
+        query = " OR ".join("id:" + itemid for itemid in missing[num:num + BATCH_SIZE])
+        if owned:
+            query = "({0}) AND owner:{1}".format(query, session.user)
+        for item in session.call(session.gis.content.search, query, max_items=BATCH_SIZE):
+            items[item.id] = item
+    return items
+
+
+# Runs in a worker thread per item.  Sends the merged item information and thumbnail and queues the sharing.
+def _send(session, item, fields, manifest, engine):
+    if item is None:
+        return "missing"
+    item_properties = dict((field, value) for field, (seq, value) in fields.items() if field in modChange.ITEM_FIELDS)
+    thumbnail = fields.get(modChange.THUMBNAIL, (None, None))[1]
+    changed = False
+    if item_properties or thumbnail:
+        changed = modAGOL.update_item_properties(item, item_properties, thumbnail, manifest, session)
+    if SHARING in fields:
+        everyone, org, groups = fields[SHARING][1]
+        engine.add(item, everyone, org, groups)
+    return "updated" if changed else "unchanged"
+
+
+# Function: log_failures
+# Description: Log the failed and missing results of a flush as errors.  Returns them.
+def log_failures(results):
+    failed = [result for result in results if result.status in ("failed", "missing")]
+    for result in failed:
+        logging.error("Update of {0} failed: {1}".format(result.itemid, result.message))
+    return failed
+
+
+# Function: open_journal
+# Description: The update journal in a workspace root
+def open_journal(root):
+    return UpdateJournal(os.path.join(root, JOURNAL_NAME))
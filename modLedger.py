@@ -0,0 +1,245 @@
+# ---------------------------------------------------------------------------
+# modLedger.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# History of runs in a SQLite ledger.  Each run records its script, duration, outcome and portal request
+# totals, and for each service its staging, upload and publish times, SD size, bytes uploaded, request
+# count and outcome.  Service figures are collected from the spans and requests of modTrace that carry a
+# service name.  The report compares each service's latest run with the trailing runs before it and
+# flags regressions, e.g. staging time over the 95th percentile of the last 30 runs.
+#---------------------------------------------------------------------------
+
+import atexit
+import collections
+import csv
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import modTrace
+
+
+LEDGER_NAME = "AGOL_ledger.sqlite"     # Ledger file in the workspace root
+WINDOW = 30             # Trailing runs a service's latest run is compared with
+MIN_RUNS = 5            # Trailing runs needed before regressions are flagged
+PERCENTILE = 95
+MIN_GROWTH = 1.1        # The latest value must also be this much over the median, so flat series are not flagged
+METRICS = ["stage_seconds", "upload_seconds", "publish_seconds", "sd_bytes", "uploaded_bytes", "requests"]
+
+# Trend of one metric of one service (or of a script's run time, with service "*")
+Trend = collections.namedtuple('Trend', ['service', 'metric', 'runs', 'last', 'median', 'p95', 'regression'])
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def _connect(path):
+    folder = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, script TEXT, started REAL, seconds REAL, status TEXT, "
+                 "requests INTEGER, errors INTEGER, throttled INTEGER, sent INTEGER, received INTEGER)")
+    conn.execute("CREATE TABLE IF NOT EXISTS services (run_id TEXT, script TEXT, service TEXT, started REAL, status TEXT, message TEXT, "
+                 "stage_seconds REAL, upload_seconds REAL, publish_seconds REAL, sd_bytes INTEGER, uploaded_bytes INTEGER, requests INTEGER, "
+                 "PRIMARY KEY (run_id, service))")
+    conn.execute("CREATE INDEX IF NOT EXISTS services_service ON services (service, started)")
+    conn.commit()
+    return conn
+
+
+# Class: RunLedger
+# Description: Ledger entry of the current run.  Collects service figures from modTrace until finish() is called.
+# A run that ends without finish() (sys.exit, an exception) is recorded as failed.
+class RunLedger(object):
+    def __init__(self, path, script):
+        self.path = path
+        self.script = script
+        self.pid = os.getpid()
+        self.started = time.time()
+        self.run_id = "{0}-{1}".format(time.strftime("%Y%m%d-%H%M%S"), self.pid)
+        self.services = collections.OrderedDict()
+        self.finished = False
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO runs (run_id, script, started, status) VALUES (?, ?, ?, ?)",
+                               (self.run_id, script, self.started, "running"))
+            self._conn.commit()
+        modTrace.add_listener(self._listen)
+        atexit.register(self._exit)
+
+    def _stats(self, service):
+        stats = self.services.get(service)
+        if stats is None:
+            stats = dict((metric, 0) for metric in METRICS)
+            stats.update({"status": None, "message": "", "tagged": 0})
+            self.services[service] = stats
+        return stats
+
+    # Receives modTrace records.  Records made in forked worker processes are ignored, they report to the parent.
+    def _listen(self, record):
+        service = record.get("service")
+        if not service or os.getpid() != self.pid:
+            return
+        with self._lock:
+            stats = self._stats(service)
+            if record.get("event") == "span":
+                name = record.get("name")
+                if name in ("draft", "stage"):
+                    stats["stage_seconds"] += record.get("seconds", 0)
+                elif name == "upload":
+                    stats["upload_seconds"] += record.get("seconds", 0)
+                    stats["sd_bytes"] = record.get("bytes", 0)
+                elif name == "publish":
+                    stats["publish_seconds"] += record.get("seconds", 0)
+            elif record.get("event") == "request":
+                stats["requests"] += 1
+                stats["tagged"] += 1
+                stats["uploaded_bytes"] += record.get("sent", 0)
+
+    # Function: service_result
+    # Description: Record the outcome of a service (published, unchanged, synced, failed) and write its row
+    def service_result(self, service, status, message=""):
+        with self._lock:
+            stats = self._stats(service)
+            stats["status"] = status
+            stats["message"] = message
+            self._write_service(service, stats)
+            self._conn.commit()
+
+    def _write_service(self, service, stats):
+        self._conn.execute("INSERT OR REPLACE INTO services VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           (self.run_id, self.script, service, self.started, stats["status"] or "unknown", stats["message"],
+                            stats["stage_seconds"], stats["upload_seconds"], stats["publish_seconds"],
+                            stats["sd_bytes"], stats["uploaded_bytes"], stats["requests"]))
+
+    # Function: finish
+    # Description: Record the run's duration, outcome and request totals, and the services without an outcome yet
+    def finish(self, status="ok"):
+        if self.finished:
+            return
+        self.finished = True
+        modTrace.remove_listener(self._listen)
+        requests = modTrace.request_stats()
+        with self._lock:
+            if len(self.services) == 1:
+                # One service per run: sign in, searches and item updates are its requests too
+                stats = list(self.services.values())[0]
+                stats["requests"] = max(stats["requests"], requests["count"])
+                stats["uploaded_bytes"] = max(stats["uploaded_bytes"], requests["sent"])
+            for service, stats in self.services.items():
+                if stats["status"] is None:
+                    stats["status"] = "failed" if status == "failed" else "unknown"
+                self._write_service(service, stats)
+            self._conn.execute("UPDATE runs SET seconds = ?, status = ?, requests = ?, errors = ?, throttled = ?, sent = ?, received = ? WHERE run_id = ?",
+                               (time.time() - self.started, status, requests["count"], requests["errors"], requests["throttled"],
+                                requests["sent"], requests["received"], self.run_id))
+            self._conn.commit()
+            self._conn.close()
+
+    def _exit(self):
+        if not self.finished and os.getpid() == self.pid:
+            self.finish("failed")
+
+
+# Function: start_run
+# Description: Start the ledger entry of this run.  Later service_result and finish_run calls go to it.
+def start_run(path, script):
+    global _ledger
+    try:
+        ledger = RunLedger(path, script)
+    except (sqlite3.Error, OSError) as e:
+        logging.info("Run ledger not available: " + str(e))
+        return None
+    with _ledger_lock:
+        _ledger = ledger
+    return ledger
+
+
+# Function: service_result
+# Description: Record the outcome of a service in the current run, if a ledger was started
+def service_result(service, status, message=""):
+    with _ledger_lock:
+        ledger = _ledger
+    if ledger is not None and os.getpid() == ledger.pid:
+        ledger.service_result(service, status, message)
+
+
+# Function: finish_run
+# Description: Close the ledger entry of this run
+def finish_run(status="ok"):
+    global _ledger
+    with _ledger_lock:
+        ledger, _ledger = _ledger, None
+    if ledger is not None:
+        ledger.finish(status)
+
+
+# Function: percentile
+# Description: Nearest rank percentile of a list of numbers
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _trend(service, metric, values, window):
+    last = values[-1]
+    history = values[-window - 1:-1]
+    if not history:
+        return Trend(service, metric, len(values), last, None, None, False)
+    median = percentile(history, 50)
+    p95 = percentile(history, PERCENTILE)
+    regression = len(history) >= MIN_RUNS and last > p95 and last > median * MIN_GROWTH
+    return Trend(service, metric, len(values), last, median, p95, regression)
+
+
+# Function: report
+# Description: Trends of each service's metrics and of each script's run time, the latest run against the trailing
+# window of runs before it.  Failed runs are left out, their times are not comparable.
+def report(path, window=WINDOW, service=None):
+    conn = _connect(path)
+    trends = []
+    rows = conn.execute("SELECT service, " + ", ".join(METRICS) + " FROM services WHERE status != 'failed' "
+                        "AND (? IS NULL OR service = ?) ORDER BY service, started", (service, service)).fetchall()
+    series = collections.OrderedDict()
+    for row in rows:
+        series.setdefault(row[0], []).append(row[1:])
+    for name, values in series.items():
+        for num, metric in enumerate(METRICS):
+            column = [value[num] for value in values if value[num] is not None]
+            # Skipped stages (cached SD, unchanged service) are not runs of that stage
+            if metric != "requests":
+                column = [value for value in column if value]
+            if column:
+                trends.append(_trend(name, metric, column, window))
+    if service is None:
+        for script, in conn.execute("SELECT DISTINCT script FROM runs ORDER BY script").fetchall():
+            seconds = [row[0] for row in conn.execute("SELECT seconds FROM runs WHERE script = ? AND status = 'ok' ORDER BY started", (script,))]
+            if seconds:
+                trends.append(_trend("*", script + " seconds", seconds, window))
+    conn.close()
+    return trends
+
+
+# Function: write_report
+# Description: Write trends to a CSV file and log the regressions.  Returns the regressions.
+def write_report(trends, reportfile):
+    with open(reportfile, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(Trend._fields)
+        for trend in trends:
+            writer.writerow(list(trend))
+    regressions = [trend for trend in trends if trend.regression]
+    for trend in regressions:
+        logging.info("Regression: {0} {1} {2} over p{3} {4} of the last {5} runs".format(
+            trend.service, trend.metric, trend.last, PERCENTILE, trend.p95, min(trend.runs - 1, WINDOW)))
+    logging.info("Ledger report: {0} trends, {1} regressions".format(len(trends), len(regressions)))
+    return regressions
@@ -0,0 +1,200 @@
+# ---------------------------------------------------------------------------
+# modMetaCache.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Cache of parsed metadata exports in a SQLite database.  Each record holds the values read from one
+# XML file (summary, credits, tags, use limits, and the item description values as json) and the hash of
+# its thumbnail, keyed by the file's path, size and modification time and by the hash of its contents.
+# Unchanged files, and copies of files already seen, are served from the cache without parsing.  Thumbnails
+# are kept once per hash.  The least recently used records are dropped when the cache grows over its size
+# limit.  In verify mode the contents of every file are hashed, even when the size and modification time match.
+# The cache is only used once a run sets its file with configure, the scripts keep it in their workspace root
+# (see modWorkspace) next to the manifest and journal, so runs with other workspaces or accounts do not share it.
+#---------------------------------------------------------------------------
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import modChange
+import modWorkspace
+
+
+CACHE_NAME = "AGOL_metacache.sqlite"     # Cache file in the workspace root
+MAX_BYTES = 512 * 1024 * 1024   # Size limit of cached records and thumbnails
+ROW_BYTES = 256                 # Allowance for the key columns of a record
+
+_settings = {"path": None, "max_bytes": MAX_BYTES, "verify": False}
+_cache = None
+_cache_pid = None
+_cache_lock = threading.Lock()
+
+
+# Class: MetadataCache
+# Description: Parsed metadata records in a SQLite file.  One connection per process, shared by its threads.
+class MetadataCache(object):
+    def __init__(self, path, max_bytes=MAX_BYTES, verify=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.stats = collections.Counter()
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        with self._lock:
+            # WAL lets staging processes read while another process writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS metadata (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, sha1 TEXT, "
+                               "summary TEXT, credits TEXT, tags TEXT, uselimit TEXT, thumbhash TEXT, bytes INTEGER, used REAL, fields TEXT)")
+            # Caches made before the description values were kept get the column, their records are parsed again
+            if "fields" not in [column[1] for column in self._conn.execute("PRAGMA table_info(metadata)")]:
+                self._conn.execute("ALTER TABLE metadata ADD COLUMN fields TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS metadata_sha1 ON metadata (sha1)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS thumbnails (sha1 TEXT PRIMARY KEY, data BLOB, size INTEGER)")
+            self._conn.commit()
+
+    # Function: load
+    # Description: Return the metadata list for an XML file and write its thumbnail to thumbpath.  Served from the
+    # cache when the file is unchanged, otherwise parse(metadatafile, thumbpath) is called and the result stored.
+    # The last value of the list is the dict of item description values.
+    def load(self, metadatafile, thumbpath, parse):
+        key = os.path.normcase(os.path.abspath(metadatafile))
+        st = os.stat(metadatafile)
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime, sha1, summary, credits, tags, uselimit, thumbhash, fields FROM metadata WHERE path = ?", (key,)).fetchone()
+        if row is not None and row[8] is None:
+            row = None
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime and not self.verify:
+            if self._serve(key, row, thumbpath):
+                self.stats["hits"] += 1
+                return list(row[3:7]) + [json.loads(row[8])]
+
+        # Size or time changed, or verifying: the contents decide
+        sha = modChange.file_hash(metadatafile)
+        if row is not None and row[2] != sha and row[0] == st.st_size and row[1] == st.st_mtime:
+            logging.info("Metadata cache entry stale, parsed again: " + metadatafile)
+            self.stats["stale"] += 1
+        with self._lock:
+            found = self._conn.execute("SELECT size, mtime, sha1, summary, credits, tags, uselimit, thumbhash, fields FROM metadata WHERE sha1 = ? "
+                                       "AND fields IS NOT NULL ORDER BY path = ? DESC LIMIT 1", (sha, key)).fetchone()
+        if found is not None and self._serve(key, found, thumbpath, st):
+            self.stats["hits"] += 1
+            return list(found[3:7]) + [json.loads(found[8])]
+
+        self.stats["misses"] += 1
+        metadatalist = parse(metadatafile, thumbpath)
+        self._store(key, st, sha, metadatalist, thumbpath)
+        return metadatalist
+
+    # Write the cached thumbnail and mark the record used.  With st the record is (re)keyed to this path and stat.
+    # Returns False, and the file is parsed, when the thumbnail is missing or damaged or could not be written.
+    def _serve(self, key, row, thumbpath, st=None):
+        thumbhash = row[7]
+        if thumbhash:
+            with self._lock:
+                thumb = self._conn.execute("SELECT data FROM thumbnails WHERE sha1 = ?", (thumbhash,)).fetchone()
+            if thumb is None or hashlib.sha1(thumb[0]).hexdigest() != thumbhash:
+                return False
+            tmppath = modWorkspace.temp_name(thumbpath)
+            with open(tmppath, "wb") as f:
+                f.write(thumb[0])
+            os.replace(tmppath, thumbpath)
+            if not os.path.isfile(thumbpath) or os.path.getsize(thumbpath) != len(thumb[0]):
+                logging.info("Cached thumbnail not written, parsed again: " + thumbpath)
+                return False
+        with self._lock:
+            if st is None:
+                self._conn.execute("UPDATE metadata SET used = ? WHERE path = ?", (time.time(), key))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                   (key, st.st_size, st.st_mtime, row[2], row[3], row[4], row[5], row[6], thumbhash,
+                                    ROW_BYTES + sum(len(value or "") for value in row[3:7]) + len(row[8]), time.time(), row[8]))
+            self._conn.commit()
+        return True
+
+    def _store(self, key, st, sha, metadatalist, thumbpath):
+        thumbhash = None
+        data = None
+        if thumbpath and os.path.isfile(thumbpath):
+            with open(thumbpath, "rb") as f:
+                data = f.read()
+            thumbhash = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            if data is not None:
+                self._conn.execute("INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?)", (thumbhash, sqlite3.Binary(data), len(data)))
+            fields = json.dumps(metadatalist[4])
+            self._conn.execute("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (key, st.st_size, st.st_mtime, sha, metadatalist[0], metadatalist[1], metadatalist[2], metadatalist[3], thumbhash,
+                                ROW_BYTES + sum(len(value or "") for value in metadatalist[:4]) + len(fields), time.time(), fields))
+            self._evict()
+            self._conn.commit()
+
+    # Drop the least recently used records, a tenth at a time, and thumbnails no record uses, until under the size limit
+    def _evict(self):
+        while True:
+            total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM metadata").fetchone()[0]
+            total += self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM thumbnails").fetchone()[0]
+            count = self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+            if total <= self.max_bytes or count == 0:
+                return
+            self._conn.execute("DELETE FROM metadata WHERE path IN (SELECT path FROM metadata ORDER BY used LIMIT ?)", (max(1, count // 10),))
+            self._conn.execute("DELETE FROM thumbnails WHERE sha1 NOT IN (SELECT thumbhash FROM metadata WHERE thumbhash IS NOT NULL)")
+            self.stats["evicted"] += max(1, count // 10)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        logging.info("Metadata cache: {0} hits, {1} misses, {2} stale, {3} evicted".format(
+            self.stats["hits"], self.stats["misses"], self.stats["stale"], self.stats["evicted"]))
+
+
+# Function: configure
+# Description: Set the cache file, size limit and verify mode used by default_cache.  Call before the first parse.
+# Without a cache file metadata is parsed every time.
+def configure(path=None, max_bytes=None, verify=None):
+    global _cache
+    with _cache_lock:
+        if path is not None:
+            _settings["path"] = path
+        if max_bytes is not None:
+            _settings["max_bytes"] = max_bytes
+        if verify is not None:
+            _settings["verify"] = verify
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+
+
+# Function: settings
+# Description: The arguments of configure that give the current settings, to set up other processes the same way
+def settings():
+    with _cache_lock:
+        return (_settings["path"], _settings["max_bytes"], _settings["verify"])
+
+
+# Function: default_cache
+# Description: Return the cache shared by this process, opening it on first use.  Returns None when no cache
+# file was configured or it cannot be opened, and metadata is then parsed every time.
+def default_cache():
+    global _cache, _cache_pid
+    with _cache_lock:
+        if _settings["path"] is None:
+            return None
+        # A connection can not be used in a forked process, each process opens its own
+        if _cache is None or _cache_pid != os.getpid():
+            try:
+                _cache = MetadataCache(_settings["path"], _settings["max_bytes"], _settings["verify"])
+                _cache_pid = os.getpid()
+            except (sqlite3.Error, OSError) as e:
+                logging.info("Metadata cache not available: " + str(e))
+                return None
+        return _cache
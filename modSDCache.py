@@ -0,0 +1,150 @@
+# ---------------------------------------------------------------------------
+# modSDCache.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Cache of staged service definition files.  A fingerprint is made from the ArcGIS Pro project,
+# the data sources of the map's layers (with modification times) and the draft parameters.  When
+# the fingerprint matches the last run the staged SD is reused, and when that SD was already
+# published the upload and publish are skipped entirely.
+#---------------------------------------------------------------------------
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+import modWorkspace
+
+
+# Function: path_stamp
+# Description: Size and modification time of a file, or of the newest file in a folder (file
+# geodatabases change the files inside the .gdb folder).  Returns None when the path cannot be found.
+def path_stamp(path):
+    # Feature classes inside a geodatabase are not paths on disk, walk up to the .gdb folder
+    while path and not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    if not path:
+        return None
+    if os.path.isfile(path):
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime]
+    size = 0
+    mtime = os.stat(path).st_mtime
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            st = os.stat(os.path.join(dirpath, name))
+            size += st.st_size
+            mtime = max(mtime, st.st_mtime)
+    return [size, mtime]
+
+
+# Function: fingerprint
+# Description: Fingerprint of everything that goes into the staged SD.  Returns None when a layer
+# data source cannot be checked (e.g. enterprise geodatabase), so the service is always staged.
+def fingerprint(aprx_file, map_obj, draft_params):
+    parts = {"aprx": [os.path.abspath(aprx_file), path_stamp(aprx_file)],
+             "params": draft_params,
+             "sources": []
+    }
+    for lyr in map_obj.listLayers() + map_obj.listTables():
+        if not lyr.supports("DATASOURCE"):
+            continue
+        source = lyr.dataSource
+        if source.lower().endswith(".sde") or ".sde" + os.sep in source.lower():
+            logging.info("Layer source can not be fingerprinted: " + source)
+            return None
+        stamp = path_stamp(source)
+        if stamp is None:
+            logging.info("Layer source not found: " + source)
+            return None
+        parts["sources"].append([lyr.name, source, stamp])
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# Class: SDCache
+# Description: Staged SD files kept under a cache folder, one record per service name
+class SDCache(object):
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _record_file(self, service_name):
+        return os.path.join(self.cache_dir, service_name + ".json")
+
+    def _read(self, service_name):
+        try:
+            with open(self._record_file(service_name)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _write(self, service_name, record):
+        tmpfile = modWorkspace.temp_name(self._record_file(service_name))
+        with open(tmpfile, "w") as f:
+            json.dump(record, f, indent=1)
+        os.replace(tmpfile, self._record_file(service_name))
+
+    # Function: lookup
+    # Description: Return the cache record {fingerprint, sd, published} when it matches the fingerprint
+    def lookup(self, service_name, fp):
+        if fp is None:
+            return None
+        with self._lock:
+            record = self._read(service_name)
+        if record and record.get("fingerprint") == fp and os.path.isfile(record.get("sd", "")):
+            return record
+        return None
+
+    # Function: store
+    # Description: Move a newly staged SD into the cache, replacing the previous one for the service.  Returns the
+    # record, whose sd is the path to upload from.
+    def store(self, service_name, fp, final_sd):
+        if fp is None:
+            return None
+        # Keep the SD file name so the uploaded item file name does not change
+        sd_dir = os.path.join(self.cache_dir, fp[:16])
+        cached_sd = os.path.join(sd_dir, service_name + ".sd")
+        with self._lock:
+            old = self._read(service_name)
+            if not os.path.isdir(sd_dir):
+                os.makedirs(sd_dir)
+            modWorkspace.commit(final_sd, cached_sd)
+            record = {"fingerprint": fp, "sd": cached_sd, "published": False}
+            self._write(service_name, record)
+            if old and old.get("sd") != cached_sd:
+                shutil.rmtree(os.path.dirname(old.get("sd", "")), ignore_errors=True)
+        return record
+
+    # Function: mark_published
+    # Description: Record that the cached SD for this fingerprint was published.  With a target (see modFanout) it is
+    # recorded as published to that portal only.
+    def mark_published(self, service_name, fp, target=None):
+        with self._lock:
+            record = self._read(service_name)
+            if record and record.get("fingerprint") == fp:
+                if target is None:
+                    record["published"] = True
+                elif target not in record.setdefault("targets", []):
+                    record["targets"].append(target)
+                self._write(service_name, record)
+
+    # Function: published_targets
+    # Description: Targets the cached SD for this fingerprint was published to
+    def published_targets(self, service_name, fp):
+        if fp is None:
+            return []
+        with self._lock:
+            record = self._read(service_name)
+        if record and record.get("fingerprint") == fp:
+            return record.get("targets", [])
+        return []
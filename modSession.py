@@ -0,0 +1,219 @@
+# ---------------------------------------------------------------------------
+# modSession.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Shared ArcGIS Online sessions.  One signed in session is kept per portal and user, with a
+# keep-alive HTTP connection pool and a cached token.  REST calls and the arcgis GIS object built from
+# the token (item update, add, publish) share the pool.  The token can optionally be saved
+# encrypted to disk so later runs do not have to sign in again.  Tokens are refreshed before
+# they expire.  Requests are governed per portal (see modGovernor): retried on throttling and
+# transient failures, limited in concurrency, and paused while the portal is down.
+#---------------------------------------------------------------------------
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import modGovernor
+import modTrace
+
+
+TOKEN_MINUTES = 120         # Lifetime requested for new tokens
+REFRESH_MARGIN = 300        # Seconds before expiry that a token is refreshed
+POOL_SIZE = 16              # Keep-alive connections per portal host
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+# Class: AGOLSession
+# Description: A signed in portal session.  Holds the token, the pooled http session used by request()
+# and the arcgis GIS object.  Safe to share between threads.
+class AGOLSession(object):
+    def __init__(self, agol_url, agol_user, agol_pass, token_file=None, pool_size=POOL_SIZE):
+        self.url = agol_url.rstrip("/")
+        self.user = agol_user
+        self._pass = agol_pass
+        self.token_file = token_file
+        self._token = None
+        self._expires = 0
+        self._gis = None
+        self._gis_token = None
+        self._lock = threading.RLock()
+        self.governor = modGovernor.get_governor(self.url)
+
+        # requests is imported here, scripts that never open a session do not load it
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.http = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount("https://", self.adapter)
+        self.http.mount("http://", self.adapter)
+        self.http.headers.update({"Referer": self.url})
+        modTrace.instrument(self.http)
+
+        if token_file:
+            self._load_token()
+
+    @property
+    def rest_url(self):
+        return self.url + "/sharing/rest"
+
+    # Function: token
+    # Description: Return a valid token, generating a new one when missing or about to expire
+    def token(self):
+        with self._lock:
+            if self._token is None or time.time() > self._expires - REFRESH_MARGIN:
+                self._generate_token()
+            return self._token
+
+    # Function: gis
+    # Description: Return the GIS object for this session.  Built from the cached token so no
+    # extra sign in is needed, and rebuilt when the token is refreshed.  Its requests go through the session's
+    # connection pool.  arcgis is imported on first use, runs that only make REST calls never load it.
+    @property
+    def gis(self):
+        from arcgis.gis import GIS
+        with self._lock:
+            token = self.token()
+            if self._gis is None or self._gis_token != token:
+                try:
+                    self._gis = GIS(self.url, token=token)
+                except Exception:
+                    logging.info("Token sign in failed, signing in with user and password")
+                    self._gis = GIS(self.url, self.user, self._pass)
+                self._gis_token = token
+                self._share_pool(self._gis)
+                modTrace.instrument_gis(self._gis)
+            return self._gis
+
+    # GIS takes no session argument, so the pooled adapter is mounted on the requests session of its connection
+    def _share_pool(self, gis):
+        http = getattr(getattr(gis, "_con", None), "_session", None)
+        if hasattr(http, "mount"):
+            http.mount("https://", self.adapter)
+            http.mount("http://", self.adapter)
+        else:
+            logging.info("GIS connection has no requests session, its calls are not pooled")
+
+    # Function: request
+    # Description: Send a REST request to the portal through the pooled connection.  The token
+    # and f=json are added.  Returns the decoded json response.  Pass idempotent=False for requests
+    # that must not be sent twice after a server error (a throttled request is still retried).
+    def request(self, path, params=None, files=None, method="POST", idempotent=True):
+        if path.startswith("http"):
+            url = path
+        else:
+            url = self.rest_url + "/" + path.lstrip("/")
+        data = dict(params or {})
+        data.setdefault("f", "json")
+
+        def send():
+            data["token"] = self.token()
+            if method == "GET":
+                response = self.http.get(url, params=data, timeout=300)
+            else:
+                response = self.http.post(url, data=data, files=files, timeout=300)
+            response.raise_for_status()
+            result = response.json()
+            if isinstance(result, dict) and "error" in result:
+                error = result["error"]
+                if error.get("code") in (498, 499):
+                    # Token was revoked on the portal side, generate a new one next time
+                    with self._lock:
+                        self._token = None
+                raise RuntimeError("Portal error {0}: {1}".format(error.get("code"), error.get("message")))
+            return result
+        return self.governor.call(send, idempotent)
+
+    # Function: call
+    # Description: Run an arcgis API call (item update, publish, search) under the portal governor,
+    # e.g. session.call(item.update, props, thumbnail=path)
+    def call(self, fn, *args, **kwargs):
+        idempotent = kwargs.pop("idempotent", True)
+        return self.governor.call(lambda: fn(*args, **kwargs), idempotent)
+
+    # Function: close
+    # Description: Close pooled connections
+    def close(self):
+        self.http.close()
+
+    def _generate_token(self):
+        logging.info("Generate token for " + self.user)
+        params = {"username": self.user,
+                  "password": self._pass,
+                  "client": "referer",
+                  "referer": self.url,
+                  "expiration": TOKEN_MINUTES,
+                  "f": "json"
+        }
+        response = self.http.post(self.rest_url + "/generateToken", data=params, timeout=60)
+        response.raise_for_status()
+        result = response.json()
+        if "token" not in result:
+            raise RuntimeError("Sign in failed for " + self.user + ": " + json.dumps(result.get("error", result)))
+        self._token = result["token"]
+        self._expires = result.get("expires", (time.time() + TOKEN_MINUTES * 60) * 1000) / 1000.0
+        if self.token_file:
+            self._save_token()
+
+    def _fernet(self, salt):
+        # cryptography ships with the ArcGIS Pro python environment
+        from cryptography.fernet import Fernet
+        key = hashlib.pbkdf2_hmac("sha256", (self.user + ":" + self._pass).encode("utf-8"), salt, 100000)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def _save_token(self):
+        try:
+            salt = os.urandom(16)
+            payload = json.dumps({"url": self.url, "user": self.user, "token": self._token, "expires": self._expires})
+            data = {"salt": base64.b64encode(salt).decode("ascii"),
+                    "data": self._fernet(salt).encrypt(payload.encode("utf-8")).decode("ascii")}
+            tmpfile = self.token_file + ".tmp"
+            with open(tmpfile, "w") as f:
+                json.dump(data, f)
+            os.replace(tmpfile, self.token_file)
+        except Exception as e:
+            logging.info("Could not save token file: " + str(e))
+
+    def _load_token(self):
+        if not os.path.isfile(self.token_file):
+            return
+        try:
+            with open(self.token_file) as f:
+                data = json.load(f)
+            salt = base64.b64decode(data["salt"])
+            payload = json.loads(self._fernet(salt).decrypt(data["data"].encode("ascii")).decode("utf-8"))
+            if payload["url"] == self.url and payload["user"] == self.user:
+                self._token = payload["token"]
+                self._expires = payload["expires"]
+                logging.info("Loaded cached token for " + self.user)
+        except Exception as e:
+            logging.info("Could not read token file: " + str(e))
+
+
+# Function: get_session
+# Description: Return the shared session for a portal and user, creating it on first use
+def get_session(agol_url, agol_user, agol_pass, token_file=None):
+    key = (agol_url.rstrip("/").lower(), agol_user.lower())
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = AGOLSession(agol_url, agol_user, agol_pass, token_file)
+            _sessions[key] = session
+        return session
+
+
+# Function: close_sessions
+# Description: Close all shared sessions
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
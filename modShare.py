@@ -0,0 +1,204 @@
+# ---------------------------------------------------------------------------
+# modShare.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Diff-aware sharing of many items.  The wanted sharing of each item (everyone, organization, groups)
+# is compared with its current access level and with the items already in each group.  Items that
+# already match are skipped, and the rest are shared with one bulk request per 100 items that need
+# the same change.  Group names are resolved to group ids once per portal user and cached.
+#---------------------------------------------------------------------------
+
+import collections
+import logging
+import re
+import threading
+
+import modTrace
+
+
+BULK_SIZE = 100         # Items per bulk share request
+PAGE_SIZE = 100         # Largest page the portal search returns
+ACCESS_RANK = {"private": 0, "org": 1, "public": 2}
+
+_group_ids = {}
+_group_lock = threading.Lock()
+
+# Result of sharing one item.  status is one of: shared, unchanged, failed
+ShareResult = collections.namedtuple('ShareResult', ['itemid', 'status', 'message'])
+
+
+# Function: as_bool
+# Description: Settings files hold true/false as text
+def as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+# Function: parse_groups
+# Description: Split a comma separated list of group ids or names.  Empty and None mean no groups.
+def parse_groups(groups):
+    if not groups:
+        return []
+    if isinstance(groups, str):
+        groups = groups.split(",")
+    return [group.strip() for group in groups if group and group.strip() and group.strip() != "None"]
+
+
+# Function: group_ids
+# Description: Resolve group ids or names to ids.  The groups of the signed in user are read once per
+# portal user and cached for the rest of the run; names not among them are searched for.
+def group_ids(session, groups):
+    key = (session.url.lower(), session.user.lower())
+    with _group_lock:
+        lookup = _group_ids.get(key)
+        if lookup is None:
+            user = session.request("community/users/" + session.user, method="GET")
+            lookup = dict((group["title"].lower(), group["id"]) for group in user.get("groups", []))
+            _group_ids[key] = lookup
+    ids = []
+    for group in parse_groups(groups):
+        if re.match(r"^[0-9a-f]{32}$", group):
+            ids.append(group)
+            continue
+        groupid = lookup.get(group.lower())
+        if groupid is None:
+            result = session.request("community/groups", {"q": 'title:"{0}"'.format(group), "num": PAGE_SIZE}, method="GET")
+            for found in result.get("results", []):
+                if found["title"].lower() == group.lower():
+                    groupid = found["id"]
+                    break
+            with _group_lock:
+                lookup[group.lower()] = groupid
+        if groupid is None:
+            raise RuntimeError("Group not found: " + group)
+        ids.append(groupid)
+    return ids
+
+
+# Class: ShareEngine
+# Description: Collects the wanted sharing of items with add(), then sends only the differences with apply()
+class ShareEngine(object):
+    def __init__(self, session):
+        self.session = session
+        self.wanted = {}
+        self._lock = threading.Lock()
+
+    # Function: add
+    # Description: Queue the wanted sharing for an item (an arcgis Item or item json).  Values are as in the
+    # [FS_SHARE] section of the settings files, groups by id or name.
+    def add(self, item, everyone, org, groups):
+        if isinstance(item, dict):
+            itemid, access = item["id"], item.get("access")
+        else:
+            itemid, access = item.id, getattr(item, "access", None)
+        # Items shared only with groups have access "shared", which is private for everyone and org
+        if not access or access == "shared":
+            access = "private"
+        with self._lock:
+            self.wanted[itemid] = {"access": access,
+                                   "want": "public" if as_bool(everyone) else "org" if as_bool(org) else "private",
+                                   "groups": group_ids(self.session, groups)}
+
+    # Function: group_members
+    # Description: Ids of the session user's items that are shared with a group, in one paged search
+    def group_members(self, groupid):
+        members = set()
+        start = 1
+        while start > 0:
+            result = self.session.request("search", {"q": "group:{0} AND owner:{1}".format(groupid, self.session.user),
+                                                     "num": PAGE_SIZE,
+                                                     "start": start}, method="GET")
+            members.update(item["id"] for item in result.get("results", []))
+            start = result.get("nextStart", -1)
+        return members
+
+    # Function: item_groups
+    # Description: Ids of the groups one item is shared with
+    def item_groups(self, itemid):
+        result = self.session.request("content/items/{0}/groups".format(itemid), method="GET")
+        return set(group["id"] for key in ("admin", "member", "other") for group in result.get(key, []))
+
+    # Function: apply
+    # Description: Share the queued items that differ from their wanted sharing.  Returns a ShareResult per item.
+    def apply(self):
+        with self._lock:
+            wanted, self.wanted = self.wanted, {}
+        if not wanted:
+            return []
+        with modTrace.span("share", items=len(wanted)):
+            # Read group membership with whichever takes fewer requests: one sweep per group, or one request per item
+            groupids = set(groupid for want in wanted.values() for groupid in want["groups"])
+            members = dict((groupid, set()) for groupid in groupids)
+            if len(wanted) <= len(groupids):
+                for itemid, want in wanted.items():
+                    if want["groups"]:
+                        for groupid in self.item_groups(itemid) & groupids:
+                            members[groupid].add(itemid)
+            else:
+                for groupid in groupids:
+                    members[groupid] = self.group_members(groupid)
+
+            results = {}
+            batches = {}
+            for itemid, want in wanted.items():
+                missing = tuple(sorted(groupid for groupid in want["groups"] if itemid not in members[groupid]))
+                if want["access"] == want["want"] and not missing:
+                    results[itemid] = ShareResult(itemid, "unchanged", "")
+                elif ACCESS_RANK.get(want["access"], 0) > ACCESS_RANK[want["want"]]:
+                    # Bulk sharing only adds access, lowering it is done item by item
+                    results[itemid] = self._share_item(itemid, want["want"], want["groups"])
+                else:
+                    batches.setdefault((want["want"], missing), []).append(itemid)
+
+            for (access, missing), itemids in batches.items():
+                for num in range(0, len(itemids), BULK_SIZE):
+                    for result in self._share_items(itemids[num:num + BULK_SIZE], access, missing):
+                        results[result.itemid] = result
+
+        counts = collections.Counter(result.status for result in results.values())
+        logging.info("Sharing: {0} items, {1} shared, {2} unchanged, {3} failed".format(len(results), counts["shared"], counts["unchanged"], counts["failed"]))
+        return [results.get(itemid, ShareResult(itemid, "failed", "No result from portal")) for itemid in wanted]
+
+    def _share_items(self, itemids, access, groups):
+        params = {"items": ",".join(itemids),
+                  "everyone": "true" if access == "public" else "false",
+                  "org": "true" if access in ("public", "org") else "false",
+                  "groups": ",".join(groups)
+        }
+        try:
+            result = self.session.request("content/users/{0}/shareItems".format(self.session.user), params)
+        except Exception as e:
+            return [ShareResult(itemid, "failed", str(e)) for itemid in itemids]
+        results = []
+        for item in result.get("results", []):
+            if item.get("success") and not item.get("notSharedWith"):
+                results.append(ShareResult(item["itemId"], "shared", ""))
+            else:
+                results.append(ShareResult(item["itemId"], "failed", "Not shared with: " + ",".join(item.get("notSharedWith", []))))
+        return results
+
+    def _share_item(self, itemid, access, groups):
+        params = {"everyone": "true" if access == "public" else "false",
+                  "org": "true" if access in ("public", "org") else "false",
+                  "groups": ",".join(groups)
+        }
+        try:
+            self.session.request("content/items/{0}/share".format(itemid), params)
+        except Exception as e:
+            return ShareResult(itemid, "failed", str(e))
+        return ShareResult(itemid, "shared", "")
+
+
+# Function: share_item
+# Description: Share one item with the diff check, for scripts that publish a single service.  Returns True
+# when the item's sharing was changed.
+def share_item(session, item, everyone, org, groups):
+    engine = ShareEngine(session)
+    engine.add(item, everyone, org, groups)
+    results = engine.apply()
+    if results and results[0].status == "failed":
+        raise RuntimeError("Sharing failed for {0}: {1}".format(results[0].itemid, results[0].message))
+    return bool(results) and results[0].status == "shared"
@@ -0,0 +1,105 @@
+# ---------------------------------------------------------------------------
+# modStaging.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Warm staging processes.  Importing arcpy and opening an ArcGIS Pro project each take seconds before
+# CreateWebLayerSDDraft starts.  A StagingPool keeps processes that import arcpy once when they start,
+# usually while the caller is still reading metadata and signing in, and then run staging jobs sent to
+# them over the pool's queue.  Each process keeps the projects it opened (open_project), so services
+# from the same project, and later runs of a watch, do not open it again.  Jobs return futures, results
+# come back as each job finishes.
+#---------------------------------------------------------------------------
+
+import collections
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+
+import modMetaCache
+import modTrace
+
+
+WORKERS = 2             # Staging processes
+MAX_PROJECTS = 8        # Opened projects kept in each process, least recently used are closed first
+
+_projects = collections.OrderedDict()
+_projects_lock = threading.Lock()
+
+
+# Function: open_project
+# Description: Open an ArcGIS Pro project, or return the one this process opened before while the file's size and
+# modification time are unchanged
+def open_project(aprx_file):
+    import arcpy
+    key = os.path.normcase(os.path.abspath(aprx_file))
+    st = os.stat(aprx_file)
+    stamp = (st.st_size, st.st_mtime)
+    with _projects_lock:
+        cached = _projects.get(key)
+        if cached is not None and cached[0] == stamp:
+            _projects.move_to_end(key)
+            return cached[1]
+    with modTrace.span("open_project", file=os.path.basename(aprx_file)):
+        aprx = arcpy.mp.ArcGISProject(aprx_file)
+    with _projects_lock:
+        _projects[key] = (stamp, aprx)
+        _projects.move_to_end(key)
+        while len(_projects) > MAX_PROJECTS:
+            _projects.popitem(last=False)
+    return aprx
+
+
+# Runs once in each staging process when it starts
+def _warm(cache_settings):
+    modMetaCache.configure(*cache_settings)
+    start = time.time()
+    import arcpy
+    modTrace.record("warm", time.time() - start, pid=os.getpid())
+
+
+def _ready():
+    return os.getpid()
+
+
+# Class: StagingPool
+# Description: Pool of staging processes with arcpy imported.  Use as a context manager, or call close() when done.
+# Keep one pool for a whole run (or watch) so its processes and their opened projects are reused.
+class StagingPool(object):
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_warm,
+                                                            initargs=(modMetaCache.settings(),))
+
+    # Function: warm
+    # Description: Start the processes now, without waiting for them, so arcpy is imported while the caller does other work
+    def warm(self):
+        for num in range(self.workers):
+            self._pool.submit(_ready)
+        logging.info("Starting {0} staging processes".format(self.workers))
+
+    # Function: submit
+    # Description: Run fn(*args) in a staging process.  fn and args must be picklable.  Returns a future.
+    def submit(self, fn, *args):
+        return self._pool.submit(fn, *args)
+
+    # Function: as_completed
+    # Description: Results of fn for each argument tuple, as (args, result, exception) in the order the jobs finish
+    def as_completed(self, fn, arglist):
+        futures = dict((self._pool.submit(fn, *args), args) for args in arglist)
+        for future in concurrent.futures.as_completed(futures):
+            error = future.exception()
+            yield futures[future], None if error else future.result(), error
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
@@ -0,0 +1,336 @@
+# ---------------------------------------------------------------------------
+# modSync.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Delta sync of hosted feature layers.  Every row of each map layer's data source is hashed (attributes
+# and geometry) under a stable key field and compared with the hashes saved at the last sync.  Inserted,
+# updated and deleted features are then sent to the hosted layer with batched applyEdits calls, so the
+# service stays online and only the changed features travel.  When there is no saved snapshot, the schema
+# changed, or most rows changed, the caller falls back to the full stage and overwrite.
+# Settings come from an optional [FS_SYNC] section of the settings file:
+#   KEYFIELD  - field with a unique, stable value per feature (required to sync)
+#   LAYERS    - map layers to sync, comma separated (default all)
+#   BATCHSIZE - features per applyEdits call (default 500)
+#---------------------------------------------------------------------------
+
+import calendar
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+import modStaging
+import modTrace
+
+
+BATCH_SIZE = 500            # Features per applyEdits call
+QUERY_KEYS = 500            # Keys per query for object ids
+MAX_CHANGE = 0.5            # Share of changed rows above which an overwrite is faster than a sync
+SKIP_TYPES = ("OID", "Geometry", "GlobalID", "Blob", "Raster")
+SKIP_FIELDS = ("shape_length", "shape_area", "shape.starea()", "shape.stlength()", "shape__area", "shape__length")
+
+# Result of syncing one layer
+SyncResult = collections.namedtuple('SyncResult', ['layer', 'adds', 'updates', 'deletes', 'failed', 'seconds'])
+
+
+# Function: read_sync_settings
+# Description: Read the [FS_SYNC] section of a settings file.  Returns None when delta sync is not set up.
+def read_sync_settings(config):
+    if not config.has_section('FS_SYNC') or not config.get('FS_SYNC', 'KEYFIELD', fallback=None):
+        return None
+    layers = config.get('FS_SYNC', 'LAYERS', fallback='')
+    return {"keyfield": config.get('FS_SYNC', 'KEYFIELD'),
+            "layers": [name.strip() for name in layers.split(",") if name.strip() and name.strip() != "None"],
+            "batchsize": config.getint('FS_SYNC', 'BATCHSIZE', fallback=BATCH_SIZE)
+    }
+
+
+# Class: SyncStore
+# Description: Row hashes of the last sync and the schema they were made with, one SQLite file per service
+class SyncStore(object):
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS layers (layer TEXT PRIMARY KEY, schema TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS rows (layer TEXT, key TEXT, hash TEXT, PRIMARY KEY (layer, key))")
+        self.conn.commit()
+
+    def schema(self, layer):
+        row = self.conn.execute("SELECT schema FROM layers WHERE layer = ?", (layer,)).fetchone()
+        return row[0] if row else None
+
+    # Function: replace
+    # Description: Save a new snapshot of a layer, e.g. after a full overwrite
+    def replace(self, layer, schema, rows):
+        self.conn.execute("DELETE FROM rows WHERE layer = ?", (layer,))
+        self.conn.executemany("INSERT INTO rows VALUES (?, ?, ?)", ((layer, key, rowhash) for key, rowhash in rows))
+        self.conn.execute("INSERT OR REPLACE INTO layers VALUES (?, ?)", (layer, schema))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+# Function: sync_store
+# Description: The sync store of a service under the temp directory
+def sync_store(tempdir, service_name):
+    return SyncStore(os.path.join(tempdir, "sync", service_name + ".sqlite"))
+
+
+# Function: map_layers
+# Description: (name, data source) of the map layers and tables to sync.  With a staging pool (see modStaging) the
+# project is read in one of its processes, so arcpy is not imported here.
+def map_layers(aprx_file, map_name, names=None, pool=None):
+    if pool is not None:
+        return pool.submit(map_layers, aprx_file, map_name, names).result()
+    aprx = modStaging.open_project(aprx_file)
+    maplist = aprx.listMaps(map_name)
+    if not maplist:
+        raise RuntimeError("Map not found in ArcGIS project file. \nMake sure a valid map exists.")
+    layers = []
+    for lyr in maplist[0].listLayers() + maplist[0].listTables():
+        if not lyr.supports("DATASOURCE"):
+            continue
+        if names and lyr.name not in names:
+            continue
+        layers.append((lyr.name, lyr.dataSource))
+    del aprx
+    return layers
+
+
+# Function: source_schema
+# Description: Fields sent to the hosted layer and a signature of the source schema (fields, geometry type,
+# spatial reference).  A changed signature means the service has to be overwritten.
+def source_schema(source, keyfield):
+    import arcpy
+    desc = arcpy.Describe(source)
+    fields = [field.name for field in arcpy.ListFields(source)
+              if field.type not in SKIP_TYPES and field.name.lower() not in SKIP_FIELDS]
+    if keyfield not in fields:
+        raise RuntimeError("Key field {0} not found in {1}".format(keyfield, source))
+    shape = getattr(desc, "shapeType", None)
+    wkid = None
+    if shape:
+        wkid = getattr(getattr(desc, "spatialReference", None), "factoryCode", None)
+    signature = json.dumps({"fields": [[field.name, field.type] for field in arcpy.ListFields(source)],
+                            "shape": shape, "wkid": wkid}, sort_keys=True)
+    return fields, shape is not None, hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
+
+def _value(value):
+    # Dates are sent as epoch milliseconds
+    if isinstance(value, datetime.datetime):
+        return calendar.timegm(value.timetuple()) * 1000 + value.microsecond // 1000
+    if isinstance(value, datetime.date):
+        return calendar.timegm(value.timetuple()) * 1000
+    return value
+
+
+# Function: read_rows
+# Description: Yield (key, row hash, attributes, geometry json) for every row of a source
+def read_rows(source, fields, has_shape, keyfield):
+    import arcpy
+    keyindex = fields.index(keyfield)
+    cursorfields = fields + (["SHAPE@JSON"] if has_shape else [])
+    with arcpy.da.SearchCursor(source, cursorfields) as cursor:
+        for row in cursor:
+            values = [_value(value) for value in row[:len(fields)]]
+            shape = row[len(fields)] if has_shape else None
+            rowhash = hashlib.sha1(json.dumps([values, shape], default=str).encode("utf-8")).hexdigest()
+            yield str(values[keyindex]), rowhash, dict(zip(fields, values)), shape
+
+
+# Function: record_baseline
+# Description: Save the current rows of the service's layers as the snapshot the next sync compares with.
+# Call after the service was published from the same data.  With a staging pool the rows are read in one of its
+# processes.
+def record_baseline(store, aprx_file, map_name, settings, pool=None):
+    if pool is not None:
+        return pool.submit(_baseline_job, store.path, aprx_file, map_name, settings).result()
+    for name, source in map_layers(aprx_file, map_name, settings["layers"]):
+        fields, has_shape, signature = source_schema(source, settings["keyfield"])
+        store.replace(name, signature, ((key, rowhash) for key, rowhash, attributes, shape in read_rows(source, fields, has_shape, settings["keyfield"])))
+        logging.info("Sync snapshot saved for " + name)
+
+
+# record_baseline in a staging process, the store is opened there by its path
+def _baseline_job(store_path, aprx_file, map_name, settings):
+    store = SyncStore(store_path)
+    try:
+        record_baseline(store, aprx_file, map_name, settings)
+    finally:
+        store.close()
+
+
+# Function: _target_layers
+# Description: Layer json of the hosted service by lower case name
+def _target_layers(session, service_url):
+    service = session.request(service_url, method="GET")
+    layers = {}
+    for entry in service.get("layers", []) + service.get("tables", []):
+        layer = session.request("{0}/{1}".format(service_url, entry["id"]), method="GET")
+        layer["url"] = "{0}/{1}".format(service_url, entry["id"])
+        layers[entry["name"].lower()] = layer
+    return layers
+
+
+# Function: _object_ids
+# Description: Object ids of the hosted features with the given keys
+def _object_ids(session, layer, keyfield, keys):
+    oidfield = layer.get("objectIdField", "OBJECTID")
+    keytype = dict((field["name"].lower(), field.get("type")) for field in layer.get("fields", [])).get(keyfield.lower())
+    oids = {}
+    keys = list(keys)
+    for num in range(0, len(keys), QUERY_KEYS):
+        chunk = keys[num:num + QUERY_KEYS]
+        if keytype == "esriFieldTypeString":
+            values = ",".join("'" + key.replace("'", "''") + "'" for key in chunk)
+        else:
+            values = ",".join(chunk)
+        result = session.request(layer["url"] + "/query", {"where": "{0} IN ({1})".format(keyfield, values),
+                                                           "outFields": "{0},{1}".format(oidfield, keyfield),
+                                                           "returnGeometry": "false"})
+        for feature in result.get("features", []):
+            attributes = dict((name.lower(), value) for name, value in feature["attributes"].items())
+            oids[str(attributes[keyfield.lower()])] = attributes[oidfield.lower()]
+    return oids
+
+
+# Function: _apply
+# Description: Send one applyEdits call.  Returns the keys that succeeded.  A call that failed after the server may have
+# applied it is not sent again, adds of an interrupted sync are found by key and sent as updates on the next sync.
+def _apply(session, layer, adds=(), updates=(), deletes=()):
+    params = {"rollbackOnFailure": "true"}
+    if adds:
+        params["adds"] = json.dumps([feature for key, feature in adds])
+    if updates:
+        params["updates"] = json.dumps([feature for key, feature in updates])
+    if deletes:
+        params["deletes"] = ",".join(str(oid) for key, oid in deletes)
+    result = session.request(layer["url"] + "/applyEdits", params, idempotent=False)
+    done = []
+    for edits, name in ((adds, "addResults"), (updates, "updateResults"), (deletes, "deleteResults")):
+        for (key, value), outcome in zip(edits, result.get(name, [])):
+            if outcome.get("success"):
+                done.append(key)
+            else:
+                logging.info("Edit failed for {0}: {1}".format(key, json.dumps(outcome.get("error"))))
+    return done
+
+
+# Function: sync_layer
+# Description: Send the inserted, updated and deleted rows of one layer.  Returns a SyncResult, or None when the
+# layer has to be overwritten instead (no snapshot, schema changed, too many changes).
+def sync_layer(session, store, name, source, layer, settings):
+    start = time.time()
+    keyfield = settings["keyfield"]
+    fields, has_shape, signature = source_schema(source, keyfield)
+    if store.schema(name) is None:
+        logging.info("No sync snapshot for {0}, overwrite needed".format(name))
+        return None
+    if store.schema(name) != signature:
+        logging.info("Schema of {0} changed, overwrite needed".format(name))
+        return None
+    editable = dict((field["name"].lower(), field["name"]) for field in layer.get("fields", []) if field.get("editable", True))
+    missing = [field for field in fields if field.lower() not in editable]
+    if missing:
+        logging.info("Hosted layer {0} is missing fields {1}, overwrite needed".format(name, ",".join(missing)))
+        return None
+
+    # Compare the current rows with the snapshot in SQLite, so large layers are not held in memory
+    conn = store.conn
+    conn.execute("DROP TABLE IF EXISTS temp.current")
+    conn.execute("CREATE TEMP TABLE current (key TEXT PRIMARY KEY, hash TEXT)")
+    try:
+        conn.executemany("INSERT INTO temp.current VALUES (?, ?)", ((key, rowhash) for key, rowhash, attributes, shape in read_rows(source, fields, has_shape, keyfield)))
+    except sqlite3.IntegrityError:
+        logging.info("Key field {0} of {1} is not unique, overwrite needed".format(keyfield, name))
+        return None
+    total = conn.execute("SELECT COUNT(*) FROM temp.current").fetchone()[0]
+    added = dict(conn.execute("SELECT c.key, c.hash FROM temp.current c LEFT JOIN rows r ON r.layer = ? AND r.key = c.key WHERE r.key IS NULL", (name,)).fetchall())
+    changed = dict(conn.execute("SELECT c.key, c.hash FROM temp.current c JOIN rows r ON r.layer = ? AND r.key = c.key WHERE r.hash != c.hash", (name,)).fetchall())
+    deleted = [row[0] for row in conn.execute("SELECT key FROM rows WHERE layer = ? AND key NOT IN (SELECT key FROM temp.current)", (name,))]
+    conn.execute("DROP TABLE temp.current")
+    logging.info("{0}: {1} rows, {2} inserted, {3} updated, {4} deleted".format(name, total, len(added), len(changed), len(deleted)))
+    if total and len(added) + len(changed) + len(deleted) > MAX_CHANGE * total:
+        logging.info("Most rows of {0} changed, overwrite is faster".format(name))
+        return None
+
+    # Object ids of the hosted features to update or delete.  Inserted keys are looked up too, a row the service
+    # already has (added by a sync that stopped before its snapshot was saved) is updated instead of added twice.
+    oids = _object_ids(session, layer, keyfield, list(added) + list(changed) + deleted) if added or changed or deleted else {}
+    oidfield = layer.get("objectIdField", "OBJECTID")
+    adds = []
+    updates = []
+    if added or changed:
+        for key, rowhash, attributes, shape in read_rows(source, fields, has_shape, keyfield):
+            if key not in added and key not in changed:
+                continue
+            feature = {"attributes": dict((editable[field.lower()], value) for field, value in attributes.items())}
+            if shape:
+                feature["geometry"] = json.loads(shape)
+            if key in added and key not in oids:
+                adds.append((key, feature))
+            elif key in oids:
+                feature["attributes"][oidfield] = oids[key]
+                updates.append((key, feature))
+            else:
+                # Changed in the source but gone from the service, add it back
+                adds.append((key, feature))
+    deletes = [(key, oids[key]) for key in deleted if key in oids]
+
+    # Apply in batches and move the snapshot forward after each one, so an interrupted sync continues where it stopped
+    batchsize = settings["batchsize"]
+    hashes = dict(added, **changed)
+    failed = 0
+    with modTrace.span("sync", layer=name, adds=len(adds), updates=len(updates), deletes=len(deletes)):
+        for edits, kind in ((adds, "adds"), (updates, "updates"), (deletes, "deletes")):
+            for num in range(0, len(edits), batchsize):
+                batch = edits[num:num + batchsize]
+                done = _apply(session, layer, **{kind: batch})
+                failed += len(batch) - len(done)
+                if kind == "deletes":
+                    conn.executemany("DELETE FROM rows WHERE layer = ? AND key = ?", ((name, key) for key in done))
+                else:
+                    conn.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?)", ((name, key, hashes[key]) for key in done))
+                conn.commit()
+        # Deleted in the source and already gone from the service
+        conn.executemany("DELETE FROM rows WHERE layer = ? AND key = ?", ((name, key) for key in deleted if key not in oids))
+        conn.commit()
+    return SyncResult(name, len(adds), len(updates), len(deletes), failed, time.time() - start)
+
+
+# Function: sync_service
+# Description: Delta sync all layers of a hosted feature service.  Returns the SyncResults, or None when the
+# service has to be staged and overwritten instead.
+def sync_service(session, service_url, aprx_file, map_name, store, settings):
+    logging.info("Start sync of " + service_url)
+    targets = _target_layers(session, service_url.rstrip("/"))
+    layers = map_layers(aprx_file, map_name, settings["layers"])
+    if not layers:
+        return None
+    for name, source in layers:
+        if name.lower() not in targets:
+            logging.info("Layer {0} not found in the hosted service, overwrite needed".format(name))
+            return None
+    results = []
+    for name, source in layers:
+        result = sync_layer(session, store, name, source, targets[name.lower()], settings)
+        if result is None:
+            if results:
+                # Earlier layers are synced, this one needs the overwrite
+                logging.info("Sync stopped at {0}".format(name))
+            return None
+        logging.info("Synced {0}: {1} added, {2} updated, {3} deleted, {4} failed in {5:.1f}s".format(
+            result.layer, result.adds, result.updates, result.deletes, result.failed, result.seconds))
+        results.append(result)
+    return results
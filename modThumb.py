@@ -0,0 +1,105 @@
+# ---------------------------------------------------------------------------
+# modThumb.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Thumbnail normalization.  Thumbnails are resized to fit the ArcGIS Online recommended item
+# thumbnail size and saved as compressed JPEG.  Results are cached by the content hash of the source
+# image, so a thumbnail shared by many services is only converted once.  Whether the upload can be
+# skipped is decided by the change manifest (see modChange) from the hash of the converted file.  The
+# cache is kept under MAX_BYTES, the least recently used thumbnails are removed first.
+#---------------------------------------------------------------------------
+
+import logging
+import os
+import tempfile
+import threading
+
+import modChange
+import modWorkspace
+
+
+THUMB_SIZE = (600, 400)     # ArcGIS Online recommended item thumbnail size
+JPEG_QUALITY = 85
+THUMB_CACHE = os.path.join(tempfile.gettempdir(), "AGOL_thumbcache")
+MAX_BYTES = 64 * 1024 * 1024    # Size limit of the thumbnail cache
+
+_lock = threading.Lock()
+
+
+# Function: optimize_thumbnail
+# Description: Return the path of the normalized copy of a thumbnail, converting it on first use.
+# The original path is returned when the file is missing or cannot be converted.  The cache is THUMB_CACHE unless
+# cache_dir is given.
+def optimize_thumbnail(thumbpath, cache_dir=None):
+    if not thumbpath or not os.path.isfile(thumbpath):
+        return thumbpath
+    cache_dir = cache_dir or THUMB_CACHE
+    srchash = modChange.file_hash(thumbpath)
+    outpath = os.path.join(cache_dir, srchash + ".jpg")
+    if os.path.isfile(outpath):
+        try:
+            # The modification time of a thumbnail is its last use
+            os.utime(outpath)
+        except OSError:
+            pass
+        return outpath
+
+    try:
+        # Pillow ships with the ArcGIS Pro python environment
+        from PIL import Image
+    except ImportError:
+        logging.info("Pillow not available, thumbnail uploaded as is")
+        return thumbpath
+
+    try:
+        with _lock:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+        with Image.open(thumbpath) as img:
+            img.load()
+            if img.mode in ("RGBA", "LA", "P"):
+                # JPEG has no transparency, flatten onto white
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1])
+                img = background
+            else:
+                img = img.convert("RGB")
+            img.thumbnail(THUMB_SIZE, Image.LANCZOS)
+            tmppath = modWorkspace.temp_name(outpath)
+            img.save(tmppath, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        os.replace(tmppath, outpath)
+    except Exception as e:
+        logging.info("Thumbnail could not be converted, uploaded as is: " + str(e))
+        return thumbpath
+
+    logging.info("Thumbnail {0} bytes -> {1} bytes".format(os.path.getsize(thumbpath), os.path.getsize(outpath)))
+    _trim(cache_dir, outpath)
+    return outpath
+
+
+# Remove the least recently used thumbnails until the cache is under MAX_BYTES.  keep is never removed.
+def _trim(cache_dir, keep, max_bytes=None):
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    files = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for mtime, size, path in files)
+    for mtime, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            # In use or removed by another process
+            pass
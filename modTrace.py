@@ -0,0 +1,172 @@
+# ---------------------------------------------------------------------------
+# modTrace.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Timing and request tracing.  Work is wrapped in named spans (parse, draft, stage, upload, publish,
+# update, share) and every portal HTTP request made through an instrumented requests session is
+# recorded with its latency, status and bytes.  Records are appended to a JSON lines file, and a
+# summary table of spans and requests is written to the log at the end of a run.  Requests made inside
+# a span or context with a service name are tagged with it.  Listeners (e.g. the run ledger in
+# modLedger) receive every record.
+#---------------------------------------------------------------------------
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+_lock = threading.Lock()
+_tracefile = None
+_spans = {}
+_requests = {"count": 0, "errors": 0, "throttled": 0, "seconds": 0.0, "sent": 0, "received": 0}
+_listeners = []
+_context = threading.local()
+
+
+# Function: configure
+# Description: Append trace records to a JSON lines file.  Without it records are only kept for the summary.
+def configure(tracefile):
+    global _tracefile
+    with _lock:
+        _tracefile = tracefile
+    _write({"event": "run", "pid": os.getpid()})
+
+
+def _write(record):
+    record["time"] = time.time()
+    for listener in list(_listeners):
+        listener(record)
+    with _lock:
+        if _tracefile is None:
+            return
+        with open(_tracefile, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+
+
+# Function: add_listener
+# Description: Call listener(record) with every span and request record, from the thread that made it
+def add_listener(listener):
+    with _lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+
+def remove_listener(listener):
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+# Function: context
+# Description: Context manager tagging the requests made in this thread with a service name
+@contextlib.contextmanager
+def context(service):
+    previous = getattr(_context, "service", None)
+    _context.service = service
+    try:
+        yield
+    finally:
+        _context.service = previous
+
+
+# Function: record
+# Description: Record a span that was timed elsewhere, e.g. in a worker process
+def record(name, seconds, ok=True, **attrs):
+    with _lock:
+        stats = _spans.setdefault(name, {"count": 0, "errors": 0, "seconds": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        if not ok:
+            stats["errors"] += 1
+    entry = {"event": "span", "name": name, "seconds": round(seconds, 4), "ok": ok}
+    entry.update(attrs)
+    _write(entry)
+
+
+# Function: span
+# Description: Context manager timing a named stage.  Extra keyword arguments are written with the record.
+@contextlib.contextmanager
+def span(name, **attrs):
+    start = time.time()
+    ok = True
+    try:
+        if "service" in attrs:
+            with context(attrs["service"]):
+                yield
+        else:
+            yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        record(name, time.time() - start, ok, **attrs)
+
+
+# Function: _response_hook
+# Description: requests response hook recording latency, status and bytes of one portal request
+def _response_hook(response, *args, **kwargs):
+    seconds = response.elapsed.total_seconds()
+    body = response.request.body
+    sent = len(body) if isinstance(body, (bytes, str)) else int(response.request.headers.get("Content-Length", 0) or 0)
+    received = len(response.content)
+    with _lock:
+        _requests["count"] += 1
+        _requests["seconds"] += seconds
+        _requests["sent"] += sent
+        _requests["received"] += received
+        if response.status_code >= 400:
+            _requests["errors"] += 1
+        if response.status_code == 429:
+            _requests["throttled"] += 1
+    path = response.request.path_url.split("?")[0]
+    entry = {"event": "request", "method": response.request.method, "path": path, "status": response.status_code,
+             "seconds": round(seconds, 4), "sent": sent, "received": received}
+    service = getattr(_context, "service", None)
+    if service:
+        entry["service"] = service
+    _write(entry)
+
+
+# Function: instrument
+# Description: Record all requests sent through a requests session
+def instrument(http):
+    if http is not None and _response_hook not in http.hooks["response"]:
+        http.hooks["response"].append(_response_hook)
+
+
+# Function: instrument_gis
+# Description: Record requests of an arcgis GIS object.  Its requests session is not public, so this is skipped
+# quietly when the arcgis version keeps it elsewhere.
+def instrument_gis(gis):
+    con = getattr(gis, "_con", None)
+    instrument(getattr(con, "_session", None))
+
+
+# Function: request_stats
+# Description: Copy of the request counters
+def request_stats():
+    with _lock:
+        return dict(_requests)
+
+
+# Function: summary
+# Description: Write the span and request summary table to the log and trace file, and return it
+def summary():
+    with _lock:
+        spans = dict((name, dict(stats)) for name, stats in _spans.items())
+        requests = dict(_requests)
+    logging.info("{0:<12} {1:>6} {2:>6} {3:>10} {4:>9} {5:>9}".format("stage", "count", "errors", "total s", "mean s", "max s"))
+    for name in sorted(spans, key=lambda name: -spans[name]["seconds"]):
+        stats = spans[name]
+        logging.info("{0:<12} {1:>6} {2:>6} {3:>10.2f} {4:>9.2f} {5:>9.2f}".format(
+            name, stats["count"], stats["errors"], stats["seconds"], stats["seconds"] / stats["count"], stats["max"]))
+    logging.info("requests {0}, errors {1}, throttled {2}, {3:.2f}s, sent {4} bytes, received {5} bytes".format(
+        requests["count"], requests["errors"], requests["throttled"], requests["seconds"], requests["sent"], requests["received"]))
+    _write({"event": "summary", "spans": spans, "requests": requests})
+    return {"spans": spans, "requests": requests}
@@ -0,0 +1,184 @@
+# ---------------------------------------------------------------------------
+# modUpload.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Multipart upload of service definition files to an existing SD item.  The file is sent in parts
+# (addPart) by a pool of threads and then committed.  Each part's checksum and completion is written to
+# a journal file next to the SD, so an interrupted upload continues from the parts already on the portal
+# instead of starting over.  On resume only parts the portal lists are kept, and parts whose bytes in the
+# local file no longer match the journal checksum are sent again.  The portal reports part numbers only, no
+# sizes or checksums, so before the commit the part list is checked for every part of the file.
+#---------------------------------------------------------------------------
+
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+PART_SIZE = 20 * 1024 * 1024    # Bytes per part
+WORKERS = 4                     # Parts uploaded at once
+COMMIT_TIMEOUT = 3600           # Seconds to wait for the portal to assemble the file
+
+
+# Class: UploadJournal
+# Description: Resume journal of one multipart upload, saved as json next to the SD file
+class UploadJournal(object):
+    def __init__(self, sd_file, itemid, part_size):
+        st = os.stat(sd_file)
+        self.path = sd_file + ".upload.json"
+        self.key = {"item": itemid, "size": st.st_size, "mtime": st.st_mtime, "part_size": part_size}
+        self.parts = {}
+        self._lock = threading.Lock()
+
+    # Function: load
+    # Description: Read a journal for the same file, item and part size.  Returns False when there is none.
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return False
+        if data.get("key") != self.key:
+            return False
+        self.parts = dict((int(num), sha) for num, sha in data.get("parts", {}).items())
+        return True
+
+    def commit_part(self, num, sha):
+        with self._lock:
+            self.parts[num] = sha
+            self._save()
+
+    def reset(self):
+        with self._lock:
+            self.parts = {}
+            self._save()
+
+    def remove(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def _save(self):
+        tmpfile = self.path + ".tmp"
+        with open(tmpfile, "w") as f:
+            json.dump({"key": self.key, "parts": self.parts}, f)
+        os.replace(tmpfile, self.path)
+
+
+# Function: _item_path
+# Description: REST path of an item in its owner's content folder
+def _item_path(sd_item):
+    folder = getattr(sd_item, "ownerFolder", None)
+    if folder:
+        return "content/users/{0}/{1}/items/{2}".format(sd_item.owner, folder, sd_item.id)
+    return "content/users/{0}/items/{1}".format(sd_item.owner, sd_item.id)
+
+
+def _server_parts(session, itempath):
+    return set(int(num) for num in session.request(itempath + "/parts", method="GET").get("parts", []))
+
+
+def _read_part(sd_file, num, part_size):
+    with open(sd_file, "rb") as f:
+        f.seek((num - 1) * part_size)
+        return f.read(part_size)
+
+
+# Function: upload_sd
+# Description: Upload an SD file to an existing SD item in parts.  progress(bytes_done, bytes_total) is called
+# as parts finish.  Returns True when the portal has assembled the file.
+def upload_sd(session, sd_item, sd_file, part_size=PART_SIZE, workers=WORKERS, progress=None):
+    itempath = _item_path(sd_item)
+    filename = os.path.basename(sd_file)
+    total = os.path.getsize(sd_file)
+    partcount = max(1, (total + part_size - 1) // part_size)
+
+    # Continue an interrupted upload when the portal still has its parts
+    journal = UploadJournal(sd_file, sd_item.id, part_size)
+    done = set()
+    if journal.load() and journal.parts:
+        try:
+            serverparts = _server_parts(session, itempath)
+            done = set(num for num in journal.parts if num in serverparts)
+            logging.info("Resuming upload of {0}: {1} of {2} parts on portal".format(filename, len(done), partcount))
+        except (RuntimeError, OSError) as e:
+            # Portal errors, and HTTP and connection errors (requests exceptions are OSErrors)
+            logging.info("Upload can not be resumed, starting over: " + str(e))
+            done = set()
+    if not done:
+        journal.reset()
+        session.request(itempath + "/update", {"multipart": "true", "filename": filename})
+        logging.info("Started multipart upload of {0}: {1} bytes in {2} parts".format(filename, total, partcount))
+
+    # Local change check: parts already on the portal were sent from the file as it was, send them again if it changed
+    for num in sorted(done):
+        if hashlib.sha256(_read_part(sd_file, num, part_size)).hexdigest() != journal.parts[num]:
+            logging.info("Part {0} checksum changed, sending again".format(num))
+            done.discard(num)
+
+    lock = threading.Lock()
+    sent = [sum(min(part_size, total - (num - 1) * part_size) for num in done)]
+
+    def send(num):
+        data = _read_part(sd_file, num, part_size)
+        sha = hashlib.sha256(data).hexdigest()
+        session.request(itempath + "/addPart", {"partNum": num}, files={"file": (filename, data, "application/octet-stream")})
+        journal.commit_part(num, sha)
+        with lock:
+            sent[0] += len(data)
+            if progress is not None:
+                progress(sent[0], total)
+        return num
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in concurrent.futures.as_completed([executor.submit(send, num) for num in range(1, partcount + 1) if num not in done]):
+            future.result()
+
+        # Every part must be on the portal before the commit, parts it lost are sent once more
+        missing = set(range(1, partcount + 1)) - _server_parts(session, itempath)
+        if missing:
+            logging.info("Portal is missing parts {0} of {1}, sending again".format(",".join(str(num) for num in sorted(missing)), filename))
+            for future in concurrent.futures.as_completed([executor.submit(send, num) for num in sorted(missing)]):
+                future.result()
+            missing = set(range(1, partcount + 1)) - _server_parts(session, itempath)
+    if missing:
+        logging.error("Upload of {0} incomplete, portal is missing parts {1}, not committed".format(filename, ",".join(str(num) for num in sorted(missing))))
+        return False
+
+    # Assemble the file on the portal and wait for it to finish
+    session.request(itempath + "/commit", {"id": sd_item.id})
+    delay = 1
+    waited = 0
+    while waited < COMMIT_TIMEOUT:
+        status = session.request(itempath + "/status", method="GET")
+        if status.get("status") == "completed":
+            journal.remove()
+            logging.info("Upload of {0} committed".format(filename))
+            return True
+        if status.get("status") == "failed":
+            journal.remove()
+            logging.info("Upload commit failed: " + json.dumps(status))
+            return False
+        time.sleep(delay)
+        waited += delay
+        delay = min(delay * 2, 30)
+    logging.info("Upload commit timed out for " + filename)
+    return False
+
+
+# Function: log_progress
+# Description: progress callback that logs every 10 percent
+def log_progress(filename):
+    state = {"next": 10}
+
+    def progress(done, total):
+        percent = 100 * done // max(total, 1)
+        if percent >= state["next"]:
+            logging.info("Upload {0}: {1}%".format(filename, percent))
+            state["next"] = percent // 10 * 10 + 10
+    return progress
@@ -0,0 +1,164 @@
+# ---------------------------------------------------------------------------
+# modWatch.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Watch mode.  The metadata exports (XML and HTML) of listed items and the project, data and
+# metadata files of listed services are checked for changes on a short interval.  A burst of
+# changes is debounced, then only the affected items are updated and only the affected services
+# are republished, all from one long running process that keeps its portal session, item index
+# and change manifest between changes.
+#---------------------------------------------------------------------------
+
+import logging
+import os
+import time
+
+import modBatch
+import modFleet
+import modSDCache
+import modStaging
+import modSync
+
+
+INTERVAL = 5        # Seconds between checks for changed files
+DEBOUNCE = 10       # Seconds a changed file must stay unchanged before it is pushed
+MAX_RETRY = 600     # Most seconds between pushes of an item or service that keeps failing, the wait doubles from INTERVAL
+
+
+# Function: service_paths
+# Description: Files to watch for a service: the project, the metadata files, the description template and the
+# data sources of the map's layers.  Enterprise geodatabase sources can not be watched and are left out.  With a
+# staging pool (see modStaging) the project is read in one of its processes, which keeps it open for staging.
+def service_paths(settings, pool=None):
+    paths = [path for path in (settings["aprx"], settings["descfile"], settings["xmlfile"], settings.get("template")) if path]
+    try:
+        for name, source in modSync.map_layers(settings["aprx"], settings["mapname"], pool=pool):
+            if source.lower().endswith(".sde") or ".sde" + os.sep in source.lower():
+                logging.info("Layer source can not be watched: " + source)
+                continue
+            paths.append(source)
+    except Exception as e:
+        logging.info("Could not read layer sources of {0}, watching project and metadata only: {1}".format(settings["servicename"], e))
+    return paths
+
+
+# Class: Watcher
+# Description: Tracks the size and modification time of a set of paths for each key (an item or a service).
+# poll() returns the keys with a changed path once none of their changes is newer than the debounce time.
+class Watcher(object):
+    def __init__(self, debounce=DEBOUNCE):
+        self.debounce = debounce
+        self.keys = {}
+        self.stamps = {}
+        self.changed = {}
+
+    # Function: add
+    # Description: Watch paths for a key.  The current state of the paths is the starting point.
+    def add(self, key, paths):
+        self.keys[key] = list(paths)
+        for path in paths:
+            if path not in self.stamps:
+                self.stamps[path] = modSDCache.path_stamp(path)
+
+    # Function: poll
+    # Description: Check all paths once and return the keys that are ready to push
+    def poll(self):
+        now = time.time()
+        changed_paths = set()
+        for path in list(self.stamps):
+            stamp = modSDCache.path_stamp(path)
+            if stamp != self.stamps[path]:
+                self.stamps[path] = stamp
+                changed_paths.add(path)
+        for key, paths in self.keys.items():
+            if changed_paths.intersection(paths):
+                if key not in self.changed:
+                    logging.info("Change seen for {0}".format(key[1]))
+                self.changed[key] = now
+        ready = [key for key, seen in self.changed.items() if now - seen >= self.debounce]
+        for key in ready:
+            del self.changed[key]
+        return ready
+
+
+# Function: run_watch
+# Description: Push changes until interrupted.  items are (item id, file name) pairs with metadata files in metadir,
+# services are service settings (modFleet.read_service_settings).  With push_all everything is pushed once at
+# start, otherwise only changes made after the watch starts.  The change manifest is saved after each push.
+# Scratch files go to the run folders of workspace (see modWorkspace) when one is given.
+def run_watch(items, metadir, services, tempdir, session, index=None, manifest=None, workers=modBatch.WORKERS,
+              stage_workers=modFleet.STAGE_WORKERS, io_workers=modFleet.IO_WORKERS, interval=INTERVAL, debounce=DEBOUNCE, push_all=False,
+              workspace=None):
+    watcher = Watcher(debounce)
+    for itemid, filename in items:
+        watcher.add(("item", filename, itemid), [os.path.join(metadir, filename + ".xml"), os.path.join(metadir, filename + ".html")])
+
+    # Next try and wait of the keys whose last push failed
+    retry = {}
+
+    # Removes the pushed keys from the ready list, except those that failed.  They stay with a doubling wait.
+    def settle(ready, pushed, failed):
+        now = time.time()
+        for key in pushed:
+            if key in failed:
+                delay = min(retry[key][1] * 2, MAX_RETRY) if key in retry else interval
+                retry[key] = (now + delay, delay)
+                logging.info("Push of {0} failed, retried in {1:.0f}s".format(key[1], delay))
+            else:
+                retry.pop(key, None)
+        ready[:] = [key for key in ready if key not in pushed or key in failed]
+
+    # Pushes the changes of the ready keys that are not waiting for a retry.  Items are settled once they are pushed,
+    # so when the services then fail only the services are pushed again.
+    def push(ready):
+        now = time.time()
+        due = [key for key in ready if key not in retry or retry[key][0] <= now]
+        batch = [(key[2], key[1]) for key in due if key[0] == "item"]
+        fleet = [by_name[key[1]] for key in due if key[0] == "service"]
+        if batch:
+            results = modBatch.run_batch(batch, metadir, workspace.run_dir if workspace else tempdir, session, workers, index, manifest)
+            if manifest is not None:
+                manifest.save()
+            for result in results:
+                print("{0} {1} ({2}) {3}".format(result.status, result.filename, result.itemid, result.message))
+            settle(ready, [key for key in due if key[0] == "item"],
+                   set(("item", result.filename, result.itemid) for result in results if result.status == "failed"))
+        if fleet:
+            results = modFleet.run_fleet(fleet, tempdir, stage_workers, io_workers, manifest=manifest, workspace=workspace, pool=pool)
+            for result in results:
+                print("{0} {1} {2}".format(result.status, result.service, result.message))
+            settle(ready, [key for key in due if key[0] == "service"],
+                   set(("service", result.service) for result in results if result.status == "failed"))
+
+    # Staging processes stay warm between pushes, with their projects open
+    pool = None
+    if services:
+        pool = modStaging.StagingPool(stage_workers)
+        pool.warm()
+    try:
+        by_name = {}
+        for settings in services:
+            by_name[settings["servicename"]] = settings
+            watcher.add(("service", settings["servicename"]), service_paths(settings, pool))
+        logging.info("Watching {0} items and {1} services ({2} paths)".format(len(items), len(services), len(watcher.stamps)))
+        print("Watching {0} items and {1} services. Press Ctrl+C to stop.".format(len(items), len(services)))
+
+        ready = list(watcher.keys) if push_all else []
+        while True:
+            # A push that raised keeps all its keys, they are pushed again after the next check
+            try:
+                push(ready)
+            except Exception:
+                logging.exception("Push of {0} changes failed, retried after {1}s".format(len(ready), interval))
+            time.sleep(interval)
+            try:
+                ready = ready + [key for key in watcher.poll() if key not in ready]
+            except Exception:
+                logging.exception("Check for changes failed")
+    except KeyboardInterrupt:
+        logging.info("Watch stopped")
+    finally:
+        if pool is not None:
+            pool.close()
@@ -0,0 +1,213 @@
+# ---------------------------------------------------------------------------
+# modWorkspace.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Scratch space for runs that may overlap.  Each run gets its own folder under <root>\runs, with a
+# folder per service for drafts, SD files and thumbnails, so parallel runs never write the same file.
+# Work on one service is serialized across processes with a lock file per service name, finished
+# files are moved into shared folders with a rename, and old run folders are removed once they take
+# more than the retention size.  Stores kept between runs (SD cache, change manifest, sync snapshots)
+# stay directly under the root.
+# The root is the [WORKSPACE] ROOT setting, the AGOL_WORKDIR environment variable, or tempDir under the
+# script.  Put it on a fast local disk.
+#---------------------------------------------------------------------------
+
+import contextlib
+import itertools
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+KEEP_MB = 2048          # Size of finished run folders kept for troubleshooting
+LOCK_POLL = 0.5         # Seconds between tries of a held lock
+
+_run_numbers = itertools.count(1)
+
+
+# Function: temp_name
+# Description: A temporary name next to path that no other process or thread uses, for writing a file before
+# it is renamed into place
+def temp_name(path):
+    return "{0}.{1}-{2}.tmp".format(path, os.getpid(), threading.get_ident())
+
+
+# Function: commit
+# Description: Move or copy a finished file to dest.  Readers of dest see the old file or the new one, never part of it.
+def commit(src, dest, copy=False):
+    folder = os.path.dirname(os.path.abspath(dest))
+    if not os.path.isdir(folder):
+        os.makedirs(folder, exist_ok=True)
+    tmpfile = temp_name(dest)
+    if copy:
+        shutil.copyfile(src, tmpfile)
+    else:
+        shutil.move(src, tmpfile)
+    os.replace(tmpfile, dest)
+    return dest
+
+
+def _try_lock(f):
+    try:
+        if msvcrt:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if msvcrt:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# Class: FileLock
+# Description: Lock held through an open lock file.  The operating system releases it when the process ends,
+# so a crashed run never leaves a service locked.
+class FileLock(object):
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    # Function: acquire
+    # Description: Take the lock, waiting up to timeout seconds (None waits for ever).  Returns False on timeout.
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        waiting = False
+        while True:
+            f = open(self.path, "a+")
+            if _try_lock(f):
+                f.seek(0)
+                f.truncate()
+                f.write(str(os.getpid()))
+                f.flush()
+                self._file = f
+                return True
+            f.close()
+            if deadline is not None and time.time() >= deadline:
+                return False
+            if not waiting:
+                logging.info("Waiting for lock " + self.path)
+                waiting = True
+            time.sleep(LOCK_POLL)
+
+    def release(self):
+        if self._file is not None:
+            _unlock(self._file)
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+        return False
+
+
+# Function: folder_size
+# Description: Bytes in the files of a folder
+def folder_size(path):
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            with contextlib.suppress(OSError):
+                size += os.path.getsize(os.path.join(dirpath, name))
+    return size
+
+
+# Class: Workspace
+# Description: The scratch folders of one run.  Close it when the run ends to release its folder for cleanup.
+class Workspace(object):
+    def __init__(self, root, keep_bytes=KEEP_MB * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.keep_bytes = keep_bytes
+        self.run_id = "{0}-{1}-{2}".format(time.strftime("%Y%m%d-%H%M%S"), os.getpid(), next(_run_numbers))
+        self.run_dir = os.path.join(self.root, "runs", self.run_id)
+        self.lock_dir = os.path.join(self.root, "locks")
+        for folder in (self.run_dir, self.lock_dir):
+            os.makedirs(folder, exist_ok=True)
+        # Held while the run is going, cleanup of other runs skips folders whose lock is held
+        self._active = FileLock(os.path.join(self.run_dir, ".active"))
+        self._active.acquire()
+        logging.info("Workspace " + self.run_dir)
+
+    # Function: service_dir
+    # Description: Scratch folder of one service in this run
+    def service_dir(self, service_name):
+        folder = os.path.join(self.run_dir, service_name)
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    # Function: lock
+    # Description: Lock for work on one service, shared by all runs using the same root.  Use as a context manager
+    # to wait for it, or call acquire(timeout) on it.
+    def lock(self, service_name):
+        return FileLock(os.path.join(self.lock_dir, service_name.lower() + ".lock"))
+
+    # Function: cleanup
+    # Description: Remove the oldest finished run folders until those left take at most keep_bytes
+    def cleanup(self):
+        runs_dir = os.path.join(self.root, "runs")
+        kept = 0
+        for name in sorted(os.listdir(runs_dir), reverse=True):
+            folder = os.path.join(runs_dir, name)
+            if folder == self.run_dir and self._active._file is not None:
+                continue
+            if not os.path.isdir(folder):
+                continue
+            marker = FileLock(os.path.join(folder, ".active"))
+            try:
+                if not marker.acquire(timeout=0):
+                    continue
+            except OSError:
+                # Removed by another run meanwhile
+                continue
+            marker.release()
+            kept += folder_size(folder)
+            if kept > self.keep_bytes:
+                shutil.rmtree(folder, ignore_errors=True)
+                logging.info("Removed run folder " + folder)
+
+    # Function: close
+    # Description: Mark the run finished and clean up old run folders
+    def close(self):
+        self._active.release()
+        self.cleanup()
+
+
+# Function: default_root
+# Description: Workspace root from the AGOL_WORKDIR environment variable, or tempDir under the script
+def default_root():
+    return os.environ.get("AGOL_WORKDIR") or os.path.join(sys.path[0], "tempDir")
+
+
+# Function: open_workspace
+# Description: Workspace for a run.  Root and retention come from the [WORKSPACE] section of config when given
+# (ROOT, KEEPMB), otherwise from the AGOL_WORKDIR and AGOL_WORKDIR_KEEPMB environment variables, otherwise
+# tempDir under the script is used.
+def open_workspace(config=None):
+    root = default_root()
+    keep_mb = int(os.environ.get("AGOL_WORKDIR_KEEPMB", KEEP_MB))
+    if config is not None and config.has_section('WORKSPACE'):
+        root = config.get('WORKSPACE', 'ROOT', fallback=root)
+        keep_mb = config.getint('WORKSPACE', 'KEEPMB', fallback=keep_mb)
+    return Workspace(root, keep_mb * 1024 * 1024)
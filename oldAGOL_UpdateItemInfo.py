@@ -19,15 +19,19 @@
 
 import arcpy
 import logging
+import sys
 import getopt
 import os
 import configparser
 import contextlib
 
-from sympy import true
 import codecs
 
 import modAGOL
+import modSession
+import modTrace
+import modIndex
+import modChange
 
 
 # Defines the entry point into the script
@@ -41,6 +45,8 @@ def main(argv=None):
                     filemode='w')
     logging.info("**************************")
     logging.info("")
+    # Timing spans and portal requests are appended as JSON lines
+    modTrace.configure('.\AGOL_UpdateItemInfo.trace.jsonl')
   
      # Read command line options
     argv = sys.argv[1:]
@@ -80,6 +86,7 @@ def main(argv=None):
         inputUsername = config.get('AGOL', 'USER')
         inputPswd = config.get('AGOL', 'PASS')
         inputURL = config.get('AGOL', 'URL')
+        tokenFile = config.get('AGOL', 'TOKENFILE', fallback=None)  # Optional encrypted token cache
         fp.close()
     
     # Make temp directory of thumbnail
@@ -89,6 +96,11 @@ def main(argv=None):
     if not os.path.isdir(tempDir):
         os.mkdir(tempDir)
 
+    # Sign in once for all rows
+    session = modSession.get_session(inputURL, inputUsername, inputPswd, tokenFile)
+    index = modIndex.prefetch(session)
+    manifest = modChange.ChangeManifest(os.path.join(tempDir, "AGOL_manifest.json"))
+
     # Search each metadata page
     fields = ['AGOL_ITEMID', 'FILENAME']
     cursor = arcpy.da.SearchCursor(InputTable, fields)
@@ -118,8 +130,8 @@ def main(argv=None):
                 htmlopen.close()
 
                 #Update item information
-                modAGOL.update_featureservice(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], htmldesc, inthumbnail, itemId, inputURL, inputUsername, inputPswd, False,
-                        False, False, "None")
+                modAGOL.update_featureservice(metadatalist[0], metadatalist[1], metadatalist[3], metadatalist[2], htmldesc, inthumbnail, itemId, session, False,
+                        False, False, "None", index, manifest)
                 logging.info("moving on")
             else:
                 logging.info("Input metadata file not found. \nMake sure a valid settings files exists.")
@@ -131,6 +143,9 @@ def main(argv=None):
             logging.info(arcpy.GetMessages(2))
 
                 
+    manifest.save()
+    modTrace.summary()
+
     #Shutdown logging    
     logging.shutdown()    
 
@@ -0,0 +1,18 @@
+# ---------------------------------------------------------------------------
+# conftest.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Unit tests run offline: the modules are imported from the repository root and arcpy from the stub
+# used by the benchmarks (benchmarks/stubs/arcpy).
+#---------------------------------------------------------------------------
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks", "stubs"))
+sys.path.insert(1, os.path.join(ROOT_DIR, "benchmarks"))
+sys.path.insert(2, ROOT_DIR)
@@ -0,0 +1,94 @@
+# ---------------------------------------------------------------------------
+# test_change.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of change detection (modChange): normalized comparison with the item, the change manifest
+# entries used instead of the item when present, thumbnail changes, and saving the manifest.
+#---------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+import modChange
+
+
+class _Item(object):
+    def __init__(self, itemid, **properties):
+        self.id = itemid
+        for field, value in properties.items():
+            setattr(self, field, value)
+
+
+def test_normalize():
+    assert modChange.normalize("tags", ["roads", " parcels ", ""]) == "roads,parcels"
+    assert modChange.normalize("tags", "roads, parcels") == "roads,parcels"
+    assert modChange.normalize("snippet", None) == ""
+    assert modChange.normalize("snippet", " Town parcels ") == "Town parcels"
+
+
+def test_changed_properties_against_item():
+    item = _Item("a1", snippet="Town parcels", tags=["roads", "parcels"], description=None)
+    properties = {"snippet": "Town parcels ", "tags": "roads, parcels", "description": "Parcels of the town"}
+    assert modChange.changed_properties(item, properties) == {"description": "Parcels of the town"}
+
+
+def test_changed_properties_against_manifest(tmpdir):
+    manifest = modChange.ChangeManifest(os.path.join(str(tmpdir), "manifest.json"))
+    manifest.record("a1", {"snippet": "Town parcels", "tags": "roads"})
+    # The item is not read for fields in the manifest
+    item = _Item("a1", snippet="stale", tags="stale")
+    properties = {"snippet": "Town parcels", "tags": "roads,parcels", "description": "new"}
+    assert modChange.changed_properties(item, properties, manifest) == {"tags": "roads,parcels", "description": "new"}
+
+
+def test_thumbnail_changed(tmpdir):
+    manifest = modChange.ChangeManifest(os.path.join(str(tmpdir), "manifest.json"))
+    assert not modChange.thumbnail_changed("a1", None, manifest)
+    assert modChange.thumbnail_changed("a1", "abc", None)
+    assert modChange.thumbnail_changed("a1", "abc", manifest)
+    manifest.record("a1", {}, "abc")
+    assert not modChange.thumbnail_changed("a1", "abc", manifest)
+    assert modChange.thumbnail_changed("a1", "def", manifest)
+
+
+def test_file_hash(tmpdir):
+    path = os.path.join(str(tmpdir), "thumb.jpg")
+    assert modChange.file_hash(path) is None
+    with open(path, "wb") as f:
+        f.write(b"jpeg")
+    assert modChange.file_hash(path) == hashlib.sha1(b"jpeg").hexdigest()
+
+
+def test_save_and_load(tmpdir):
+    path = os.path.join(str(tmpdir), "manifest.json")
+    manifest = modChange.ChangeManifest(path)
+    manifest.record("a1", {"snippet": "Town parcels"}, "abc")
+    manifest.save()
+    loaded = modChange.ChangeManifest(path)
+    assert loaded.get("a1") == {"snippet": modChange.content_hash("snippet", "Town parcels"), "thumbnail": "abc"}
+
+
+def test_save_keeps_items_of_other_runs(tmpdir):
+    path = os.path.join(str(tmpdir), "manifest.json")
+    first = modChange.ChangeManifest(path)
+    second = modChange.ChangeManifest(path)
+    first.record("a1", {"snippet": "one"})
+    first.save()
+    second.record("b2", {"snippet": "two"})
+    second.save()
+    with open(path) as f:
+        assert sorted(json.load(f)) == ["a1", "b2"]
+
+
+def test_unreadable_manifest_starts_over(tmpdir):
+    path = os.path.join(str(tmpdir), "manifest.json")
+    with open(path, "w") as f:
+        f.write("{not json")
+    manifest = modChange.ChangeManifest(path)
+    assert manifest.get("a1") is None
+    manifest.record("a1", {"snippet": "one"})
+    manifest.save()
+    assert modChange.ChangeManifest(path).get("a1") is not None
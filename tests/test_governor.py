@@ -0,0 +1,143 @@
+# ---------------------------------------------------------------------------
+# test_governor.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of the portal governor (modGovernor): failure classification, retries with backoff, no retries of
+# non idempotent requests on transient failures, the adaptive limit and the circuit breaker.
+#---------------------------------------------------------------------------
+
+import pytest
+
+import modGovernor
+
+
+class _Response(object):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class _HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        Exception.__init__(self, "HTTP {0}".format(status_code))
+        self.response = _Response(status_code, headers)
+
+
+class _Flaky(object):
+    # Fails with the given errors, then returns "ok"
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(modGovernor.time, "sleep", slept.append)
+    monkeypatch.setattr(modGovernor.random, "uniform", lambda low, high: high)
+    return slept
+
+
+def test_classify():
+    assert modGovernor.classify(_HTTPError(429)) == modGovernor.THROTTLED
+    assert modGovernor.classify(_HTTPError(503)) == modGovernor.TRANSIENT
+    assert modGovernor.classify(_HTTPError(404)) is None
+    assert modGovernor.classify(RuntimeError("Portal error 504: gateway timeout")) == modGovernor.TRANSIENT
+    assert modGovernor.classify(RuntimeError("Error Code: 429")) == modGovernor.THROTTLED
+    assert modGovernor.classify(RuntimeError("Too many requests")) == modGovernor.THROTTLED
+    assert modGovernor.classify(ConnectionResetError()) == modGovernor.TRANSIENT
+    assert modGovernor.classify(ValueError("bad input")) is None
+
+
+def test_retries_with_backoff(sleeps):
+    governor = modGovernor.Governor("test")
+    fn = _Flaky([_HTTPError(503), _HTTPError(429)])
+    assert governor.call(fn) == "ok"
+    assert fn.calls == 3
+    assert sleeps == [modGovernor.BASE_BACKOFF, modGovernor.BASE_BACKOFF * 2]
+
+
+def test_retry_after_header(sleeps):
+    governor = modGovernor.Governor("test")
+    fn = _Flaky([_HTTPError(429, {"Retry-After": "7"})])
+    assert governor.call(fn) == "ok"
+    assert sleeps == [7.0]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    governor = modGovernor.Governor("test")
+    fn = _Flaky([_HTTPError(429)] * (modGovernor.MAX_RETRIES + 1))
+    with pytest.raises(_HTTPError):
+        governor.call(fn)
+    assert fn.calls == modGovernor.MAX_RETRIES + 1
+
+
+def test_not_idempotent_not_retried_on_transient(sleeps):
+    governor = modGovernor.Governor("test")
+    fn = _Flaky([_HTTPError(502)])
+    with pytest.raises(_HTTPError):
+        governor.call(fn, idempotent=False)
+    assert fn.calls == 1
+    # Throttled requests never ran, so they are retried either way
+    fn = _Flaky([_HTTPError(429)])
+    assert governor.call(fn, idempotent=False) == "ok"
+    assert fn.calls == 2
+
+
+def test_other_errors_not_retried(sleeps):
+    governor = modGovernor.Governor("test")
+    fn = _Flaky([ValueError("bad input")])
+    with pytest.raises(ValueError):
+        governor.call(fn)
+    assert fn.calls == 1 and sleeps == []
+
+
+def test_limit_halves_and_grows():
+    governor = modGovernor.Governor("test", limit=8)
+    governor.active = 1
+    governor._release(0.1, modGovernor.THROTTLED)
+    assert governor.limit == 4
+    for num in range(20):
+        governor.active = 1
+        governor._release(0.1, None)
+    assert 4 < governor.limit <= governor.max_limit
+
+
+def test_breaker_opens_and_closes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(modGovernor.time, "time", lambda: now[0])
+    governor = modGovernor.Governor("test")
+    for num in range(modGovernor.BREAKER_THRESHOLD):
+        governor.active = 1
+        governor._release(0.1, modGovernor.TRANSIENT)
+    assert governor.state == "open"
+    assert governor.open_until == now[0] + modGovernor.BREAKER_COOLDOWN
+
+    # After the cool down one probe goes through, a failed probe doubles the cool down
+    now[0] = governor.open_until + 1
+    governor._acquire(now[0] + 10)
+    assert governor.state == "half-open" and governor.active == 1
+    governor._release(0.1, modGovernor.TRANSIENT)
+    assert governor.state == "open"
+    assert governor.cooldown == modGovernor.BREAKER_COOLDOWN * 2
+
+    # A healthy probe closes the breaker
+    now[0] = governor.open_until + 1
+    governor._acquire(now[0] + 10)
+    governor._release(0.1, None)
+    assert governor.state == "closed"
+    assert governor.cooldown == modGovernor.BREAKER_COOLDOWN and governor.failures == 0
+
+
+def test_get_governor_shared_per_portal():
+    first = modGovernor.get_governor("https://easton.maps.arcgis.com/")
+    assert modGovernor.get_governor("https://Easton.maps.arcgis.com") is first
+    assert modGovernor.get_governor("https://other.maps.arcgis.com") is not first
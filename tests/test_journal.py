@@ -0,0 +1,182 @@
+# ---------------------------------------------------------------------------
+# test_journal.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of the update journal (modJournal): merging of queued updates, flushing them to a fake portal,
+# reporting missing items, keeping updates queued while the portal is unavailable, and the owner
+# restriction of the item search for updates queued with owned=True.
+#---------------------------------------------------------------------------
+
+import re
+import sqlite3
+
+import pytest
+
+import modGovernor
+import modJournal
+
+
+class _Item(object):
+    def __init__(self, itemid, fail=None):
+        self.id = itemid
+        self.snippet = ""
+        self.fail = fail
+        self.updates = []
+
+    def update(self, item_properties, thumbnail=None):
+        if self.fail is not None:
+            raise self.fail
+        self.updates.append(dict(item_properties))
+        for field, value in item_properties.items():
+            setattr(self, field, value)
+
+
+class _Content(object):
+    def __init__(self, items):
+        self.items = items
+        self.queries = []
+
+    def search(self, query, max_items=100):
+        self.queries.append(query)
+        return [self.items[itemid] for itemid in re.findall(r"id:(\w+)", query) if itemid in self.items]
+
+
+class _GIS(object):
+    def __init__(self, items):
+        self.content = _Content(items)
+
+
+class _Session(object):
+    def __init__(self, items, user="easton_gis"):
+        self.url = "https://easton.maps.arcgis.com"
+        self.user = user
+        self.gis = _GIS(dict((item.id, item) for item in items))
+        self.governor = modGovernor.Governor(self.url)
+
+    def call(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture
+def journal(tmpdir):
+    journal = modJournal.open_journal(str(tmpdir))
+    yield journal
+    journal.close()
+
+
+def test_enqueue_last_write_wins(journal):
+    item = _Item("a1")
+    session = _Session([item])
+    journal.enqueue(session, "a1", {"snippet": "first", "tags": "roads"})
+    journal.enqueue(session, "a1", {"snippet": "second"})
+    assert journal.pending(session) == 1
+    assert journal.pending() == 1
+
+    results = journal.flush(session)
+    assert results == [modJournal.JournalResult("a1", "updated", "")]
+    assert item.updates == [{"snippet": "second", "tags": "roads"}]
+    assert journal.pending(session) == 0
+
+
+def test_queues_are_per_user(journal):
+    session = _Session([_Item("a1")])
+    other = _Session([_Item("a1")], user="other_user")
+    journal.enqueue(session, "a1", {"snippet": "mine"})
+    assert journal.pending(other) == 0
+    assert journal.flush(other) == []
+    assert journal.pending(session) == 1
+
+
+def test_missing_items_dropped_and_failed(journal):
+    session = _Session([_Item("a1")])
+    journal.enqueue(session, "a1", {"snippet": "found"})
+    journal.enqueue(session, "b2", {"snippet": "gone"})
+    results = journal.flush(session)
+    assert dict((result.itemid, result.status) for result in results) == {"a1": "updated", "b2": "missing"}
+    assert journal.pending(session) == 0
+    assert [result.itemid for result in modJournal.log_failures(results)] == ["b2"]
+
+
+def test_unowned_updates_searched_without_owner(journal):
+    session = _Session([_Item("a1"), _Item("b2")])
+    journal.enqueue(session, "a1", {"snippet": "mine"})
+    journal.enqueue(session, "b2", {"snippet": "shared with me"}, owned=False)
+    results = dict((result.itemid, result.status) for result in journal.flush(session))
+    assert results == {"a1": "updated", "b2": "updated"}
+    assert session.gis.content.queries == ["(id:a1) AND owner:easton_gis", "id:b2"]
+
+
+def test_unchanged_items_not_sent(journal):
+    item = _Item("a1")
+    item.snippet = "same"
+    session = _Session([item])
+    journal.enqueue(session, "a1", {"snippet": "same"})
+    assert journal.flush(session)[0].status == "unchanged"
+    assert item.updates == []
+
+
+def test_transient_failures_stay_queued(journal):
+    session = _Session([_Item("a1", fail=ConnectionResetError("reset"))])
+    journal.enqueue(session, "a1", {"snippet": "new"})
+    assert journal.flush(session)[0].status == "queued"
+    assert journal.pending(session) == 1
+
+
+def test_open_breaker_keeps_everything_queued(journal):
+    session = _Session([_Item("a1")])
+    session.governor.state = "open"
+    journal.enqueue(session, "a1", {"snippet": "new"})
+    assert journal.flush(session) == [modJournal.JournalResult("a1", "queued", "Portal unavailable")]
+    assert journal.pending(session) == 1
+
+
+def test_failures_dropped_after_max_attempts(journal):
+    session = _Session([_Item("a1", fail=ValueError("Invalid tags"))])
+    journal.enqueue(session, "a1", {"snippet": "new"})
+    for attempt in range(modJournal.MAX_ATTEMPTS - 1):
+        assert journal.flush(session)[0].status == "failed"
+        assert journal.pending(session) == 1
+    results = journal.flush(session)
+    assert results[0].status == "failed"
+    assert journal.pending(session) == 0
+    assert modJournal.log_failures(results) == results
+
+
+def test_find_items_owner_restriction():
+    session = _Session([_Item("a1"), _Item("b2")])
+    items = modJournal.find_items(session, ["a1", "b2", "c3"])
+    assert sorted(items) == ["a1", "b2"]
+    items = modJournal.find_items(session, ["a1", "b2", "c3"], owned=False)
+    assert sorted(items) == ["a1", "b2"]
+    assert session.gis.content.queries == ["(id:a1 OR id:b2 OR id:c3) AND owner:easton_gis", "id:a1 OR id:b2 OR id:c3"]
+    assert modJournal.find_items(session, [], owned=False) == {}
+
+
+def test_find_items_ignores_index_of_other_owner():
+    class _Index(object):
+        owner = "other_user"
+
+        def get(self, itemid):
+            raise AssertionError("index of another owner used")
+
+    session = _Session([_Item("a1")])
+    assert list(modJournal.find_items(session, ["a1"], _Index())) == ["a1"]
+    assert list(modJournal.find_items(session, ["a1"], _Index(), owned=False)) == ["a1"]
+
+
+def test_old_journal_gets_owned_column(tmpdir):
+    path = str(tmpdir.join(modJournal.JOURNAL_NAME))
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE updates (seq INTEGER PRIMARY KEY AUTOINCREMENT, portal TEXT, user TEXT, itemid TEXT, "
+                 "field TEXT, value TEXT, queued REAL, attempts INTEGER DEFAULT 0, error TEXT, UNIQUE (portal, user, itemid, field))")
+    conn.execute("INSERT INTO updates (portal, user, itemid, field, value, queued) VALUES (?, ?, ?, ?, ?, ?)",
+                 ("https://easton.maps.arcgis.com", "easton_gis", "a1", "snippet", '"old"', 0))
+    conn.commit()
+    conn.close()
+    journal = modJournal.UpdateJournal(path)
+    session = _Session([_Item("a1")])
+    assert journal.flush(session)[0].status == "updated"
+    assert session.gis.content.queries == ["id:a1"]
+    journal.close()
@@ -0,0 +1,62 @@
+# ---------------------------------------------------------------------------
+# test_ledger.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of the run ledger (modLedger): nearest rank percentiles, regression flags and the run and
+# service rows written by a run.
+#---------------------------------------------------------------------------
+
+import os
+
+import modLedger
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 21))
+    assert modLedger.percentile(values, 95) == 19
+    assert modLedger.percentile(values, 50) == 10
+    assert modLedger.percentile(values, 100) == 20
+    values = list(range(1, 31))
+    assert modLedger.percentile(values, 50) == 15
+    assert modLedger.percentile(values, 95) == 29
+
+
+def test_percentile_small_lists():
+    assert modLedger.percentile([7], 95) == 7
+    assert modLedger.percentile([7], 0) == 7
+    assert modLedger.percentile([3, 1, 2], 50) == 2
+    assert modLedger.percentile([4, 1, 3, 2], 50) == 2
+
+
+def test_trend_flags_regression():
+    history = [10.0] * 10
+    trend = modLedger._trend("Parcels", "stage_seconds", history + [30.0], modLedger.WINDOW)
+    assert trend.regression
+    assert trend.median == 10.0 and trend.p95 == 10.0
+    trend = modLedger._trend("Parcels", "stage_seconds", history + [10.5], modLedger.WINDOW)
+    assert not trend.regression
+
+
+def test_trend_needs_min_runs():
+    trend = modLedger._trend("Parcels", "stage_seconds", [10.0] * (modLedger.MIN_RUNS - 1) + [30.0], modLedger.WINDOW)
+    assert not trend.regression
+
+
+def test_failed_runs_left_out_of_report(tmp_path):
+    path = str(tmp_path / modLedger.LEDGER_NAME)
+    for num, status in enumerate(["published"] * 6 + ["failed"]):
+        ledger = modLedger.RunLedger(path, "test")
+        # Runs started in the same second share an id, give each its own
+        ledger.run_id = "run{0}".format(num)
+        ledger.started = num
+        stats = ledger._stats("Parcels")
+        stats["stage_seconds"] = 100.0 if status == "failed" else 10.0
+        ledger.service_result("Parcels", status)
+        ledger.finish("failed" if status == "failed" else "ok")
+    trends = dict((trend.metric, trend) for trend in modLedger.report(path) if trend.service == "Parcels")
+    assert trends["stage_seconds"].runs == 6
+    assert trends["stage_seconds"].last == 10.0
+    assert not trends["stage_seconds"].regression
+    assert os.path.isfile(path)
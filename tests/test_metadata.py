@@ -0,0 +1,88 @@
+# ---------------------------------------------------------------------------
+# test_metadata.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of the streaming metadata reader (modAGOL.metadata_to_list): the item information values, the
+# first value rules, text before child elements, the thumbnail decoded in pieces and the values kept
+# for the item description.
+#---------------------------------------------------------------------------
+
+import base64
+import os
+import xml.parsers.expat as expat
+
+import pytest
+
+import modAGOL
+
+
+METADATA = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata>
+<dataIdInfo>
+<idPurp>Parcels of the town</idPurp>
+<idCredit>Town of Easton GIS</idCredit>
+<idCitation><resTitle>Parcels</resTitle></idCitation>
+<idAbs>Tax parcels &amp; lots</idAbs>
+<searchKeys><keyword>parcels</keyword><keyword>assessing</keyword></searchKeys>
+<searchKeys><keyword>ignored</keyword></searchKeys>
+<resConst><Consts><useLimit>For planning only</useLimit><useLimit>second, ignored</useLimit></Consts></resConst>
+<resConst><LegConsts><othConsts>Not a legal survey</othConsts></LegConsts></resConst>
+</dataIdInfo>
+<dataIdInfo><idPurp>Second dataIdInfo, ignored</idPurp></dataIdInfo>
+{0}
+</metadata>
+"""
+
+
+def read(tmpdir, text, fields=None):
+    metadatafile = os.path.join(str(tmpdir), "metadata.xml")
+    with open(metadatafile, "w") as f:
+        f.write(text)
+    thumbpath = os.path.join(str(tmpdir), "thumbnail.jpg")
+    return modAGOL.metadata_to_list(metadatafile, thumbpath, cache=False, fields=fields), thumbpath
+
+
+def test_item_information(tmpdir):
+    fields = {}
+    (summary, credits, tags, uselimit), thumbpath = read(tmpdir, METADATA.format(""), fields)
+    assert summary == "Parcels of the town"
+    assert credits == "Town of Easton GIS"
+    assert tags == "parcels,assessing"
+    assert uselimit == "For planning only\nNot a legal survey"
+    assert not os.path.exists(thumbpath)
+    assert fields == {"title": "Parcels", "abstract": "Tax parcels & lots", "summary": "Parcels of the town",
+                      "credits": "Town of Easton GIS", "tags": ["parcels", "assessing"],
+                      "uselimits": ["For planning only"], "legalconsts": ["Not a legal survey"]}
+
+
+def test_missing_values(tmpdir):
+    fields = {}
+    (summary, credits, tags, uselimit), thumbpath = read(tmpdir, "<metadata><dataIdInfo><idPurp/></dataIdInfo></metadata>", fields)
+    assert (summary, credits, tags) == (None, "", "")
+    assert uselimit == "There are not access and use constraints for this item."
+    assert fields["title"] == "" and fields["tags"] == []
+
+
+def test_text_before_first_child(tmpdir):
+    text = "<metadata><dataIdInfo><idPurp>head<b>bold</b>tail</idPurp><idCredit>credits<br/></idCredit></dataIdInfo></metadata>"
+    (summary, credits, tags, uselimit), thumbpath = read(tmpdir, text)
+    assert summary == "head"
+    assert credits == "credits"
+
+
+def test_thumbnail_decoded_in_pieces(tmpdir, monkeypatch):
+    monkeypatch.setattr(modAGOL._MetadataReader, "BLOCK_SIZE", 64)
+    image = os.urandom(3001)
+    encoded = base64.encodebytes(image).decode("ascii")
+    thumbnail = '<Binary><Thumbnail><Data EsriPropertyType="PictureX">{0}</Data></Thumbnail></Binary>'.format(encoded)
+    (summary, credits, tags, uselimit), thumbpath = read(tmpdir, METADATA.format(thumbnail))
+    assert summary == "Parcels of the town"
+    with open(thumbpath, "rb") as f:
+        assert f.read() == image
+
+
+def test_invalid_xml_raises(tmpdir):
+    with pytest.raises(expat.ExpatError):
+        read(tmpdir, "<metadata><dataIdInfo></metadata>")
@@ -0,0 +1,119 @@
+# ---------------------------------------------------------------------------
+# test_sdcache.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of the staged SD cache (modSDCache): the fingerprint follows the project, the layer data and the
+# draft parameters, and cached SDs are stored, found and marked published by fingerprint.
+#---------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+import modSDCache
+
+
+PARAMS = {"service_name": "Parcels", "overwrite": True}
+
+
+class _Layer(object):
+    def __init__(self, name, source):
+        self.name = name
+        self.dataSource = source
+
+    def supports(self, prop):
+        return prop == "DATASOURCE"
+
+
+class _Map(object):
+    def __init__(self, layers, tables=()):
+        self.layers = list(layers)
+        self.tables = list(tables)
+
+    def listLayers(self):
+        return self.layers
+
+    def listTables(self):
+        return self.tables
+
+
+def write(path, text, mtime=None):
+    with open(path, "w") as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def project(tmpdir):
+    folder = str(tmpdir)
+    aprx_file = os.path.join(folder, "Parcels.aprx")
+    write(aprx_file, "project", 1000000)
+    gdb = os.path.join(folder, "Town.gdb")
+    os.makedirs(gdb)
+    write(os.path.join(gdb, "a00000009.gdbtable"), "parcels", 1000000)
+    return aprx_file, _Map([_Layer("Parcels", os.path.join(gdb, "Parcels"))])
+
+
+def test_fingerprint_stable(project):
+    aprx_file, map_obj = project
+    assert modSDCache.fingerprint(aprx_file, map_obj, PARAMS) == modSDCache.fingerprint(aprx_file, map_obj, dict(PARAMS))
+
+
+def test_fingerprint_follows_data(project):
+    aprx_file, map_obj = project
+    before = modSDCache.fingerprint(aprx_file, map_obj, PARAMS)
+    gdb = os.path.dirname(map_obj.layers[0].dataSource)
+    write(os.path.join(gdb, "a00000009.gdbtable"), "parcels changed", 1000000)
+    assert modSDCache.fingerprint(aprx_file, map_obj, PARAMS) != before
+
+
+def test_fingerprint_follows_project_and_params(project):
+    aprx_file, map_obj = project
+    before = modSDCache.fingerprint(aprx_file, map_obj, PARAMS)
+    assert modSDCache.fingerprint(aprx_file, map_obj, dict(PARAMS, overwrite=False)) != before
+    write(aprx_file, "project", 2000000)
+    assert modSDCache.fingerprint(aprx_file, map_obj, PARAMS) != before
+
+
+def test_fingerprint_none_for_enterprise_sources(project):
+    aprx_file, map_obj = project
+    sde = _Map([_Layer("Parcels", os.path.join("C:" + os.sep, "connections", "gis.sde", "Town.Parcels"))])
+    assert modSDCache.fingerprint(aprx_file, sde, PARAMS) is None
+
+
+def test_store_lookup_and_publish(tmpdir):
+    cache = modSDCache.SDCache(os.path.join(str(tmpdir), "sdcache"))
+    staged = os.path.join(str(tmpdir), "Parcels.sd")
+    write(staged, "sd one")
+    assert cache.lookup("Parcels", "a" * 40) is None
+
+    record = cache.store("Parcels", "a" * 40, staged)
+    assert os.path.basename(record["sd"]) == "Parcels.sd" and os.path.isfile(record["sd"])
+    assert not record["published"]
+    assert cache.lookup("Parcels", "a" * 40) == record
+    assert cache.lookup("Parcels", "b" * 40) is None
+    assert cache.lookup("Parcels", None) is None
+
+    cache.mark_published("Parcels", "a" * 40)
+    assert cache.lookup("Parcels", "a" * 40)["published"]
+    cache.mark_published("Parcels", "a" * 40, "https://other.maps.arcgis.com")
+    assert cache.published_targets("Parcels", "a" * 40) == ["https://other.maps.arcgis.com"]
+    assert cache.published_targets("Parcels", "b" * 40) == []
+
+
+def test_store_replaces_old_sd(tmpdir):
+    cache = modSDCache.SDCache(os.path.join(str(tmpdir), "sdcache"))
+    staged = os.path.join(str(tmpdir), "Parcels.sd")
+    write(staged, "sd one")
+    first = cache.store("Parcels", "a" * 40, staged)
+    write(staged, "sd two")
+    second = cache.store("Parcels", "b" * 40, staged)
+    assert not os.path.exists(first["sd"])
+    assert cache.lookup("Parcels", "a" * 40) is None
+    assert cache.lookup("Parcels", "b" * 40) == second
+    # Marking an older fingerprint does not touch the new record
+    cache.mark_published("Parcels", "a" * 40)
+    assert not cache.lookup("Parcels", "b" * 40)["published"]
@@ -0,0 +1,135 @@
+# ---------------------------------------------------------------------------
+# test_sync.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of the delta sync (modSync): inserted, updated and deleted rows found against the snapshot, the
+# applyEdits calls sent for them, and the cases that fall back to an overwrite.  Sources are CSV tables
+# read by the arcpy stub, the hosted layer is a fake session.
+#---------------------------------------------------------------------------
+
+import csv
+import json
+import os
+
+import pytest
+
+import modSync
+
+
+KEYFIELD = "PARCEL_ID"
+OWNERS = ["Adams", "Baker", "Clark", "Davis", "Evans", "Frank", "Grant", "Hayes", "Irwin", "Jones"]
+ROWS = [("P{0}".format(num + 1), owner) for num, owner in enumerate(OWNERS)]
+KEYS = [key for key, owner in ROWS]
+SETTINGS = {"keyfield": KEYFIELD, "layers": [], "batchsize": 2}
+LAYER = {"url": "https://services.example.com/Parcels/FeatureServer/0", "objectIdField": "OBJECTID",
+         "fields": [{"name": "OBJECTID", "type": "esriFieldTypeOID", "editable": False},
+                    {"name": KEYFIELD, "type": "esriFieldTypeString"},
+                    {"name": "OWNER", "type": "esriFieldTypeString"}]}
+
+
+def write_source(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["OBJECTID", KEYFIELD, "OWNER", "SHAPE@JSON"])
+        for num, (parcelid, owner) in enumerate(rows):
+            shape = json.dumps({"x": 100000 + num, "y": 800000, "spatialReference": {"wkid": 2249}})
+            writer.writerow([num + 1, parcelid, owner, shape])
+
+
+class _Session(object):
+    # Hosted features by key, and the applyEdits calls received
+    def __init__(self, keys):
+        self.oids = dict((key, num + 1) for num, key in enumerate(keys))
+        self.edits = []
+
+    def request(self, url, params=None, method="POST", idempotent=True):
+        if url.endswith("/query"):
+            keys = [key.strip("'") for key in params["where"].split(" IN (")[1].rstrip(")").split(",")]
+            return {"features": [{"attributes": {"OBJECTID": self.oids[key], KEYFIELD: key}} for key in keys if key in self.oids]}
+        assert url.endswith("/applyEdits") and not idempotent
+        self.edits.append(params)
+        result = {}
+        if "adds" in params:
+            result["addResults"] = [{"success": True} for feature in json.loads(params["adds"])]
+        if "updates" in params:
+            result["updateResults"] = [{"success": True} for feature in json.loads(params["updates"])]
+        if "deletes" in params:
+            result["deleteResults"] = [{"success": True} for oid in params["deletes"].split(",")]
+        return result
+
+
+@pytest.fixture
+def source(tmpdir):
+    path = os.path.join(str(tmpdir), "Parcels.dat")
+    write_source(path, ROWS)
+    return path
+
+
+@pytest.fixture
+def store(tmpdir, source):
+    store = modSync.sync_store(str(tmpdir), "Parcels")
+    fields, has_shape, signature = modSync.source_schema(source, KEYFIELD)
+    store.replace("Parcels", signature, ((key, rowhash) for key, rowhash, attributes, shape in modSync.read_rows(source, fields, has_shape, KEYFIELD)))
+    yield store
+    store.close()
+
+
+def test_no_snapshot_needs_overwrite(tmpdir, source):
+    store = modSync.sync_store(str(tmpdir), "Other")
+    assert modSync.sync_layer(_Session([]), store, "Parcels", source, LAYER, SETTINGS) is None
+    store.close()
+
+
+def test_unchanged_source_sends_nothing(store, source):
+    session = _Session(KEYS)
+    result = modSync.sync_layer(session, store, "Parcels", source, LAYER, SETTINGS)
+    assert (result.adds, result.updates, result.deletes, result.failed) == (0, 0, 0, 0)
+    assert session.edits == []
+
+
+def test_delta_sent_and_snapshot_moved(store, source):
+    write_source(source, [ROWS[0], ("P2", "Baker Trust")] + ROWS[2:9] + [("P11", "Kelly")])
+    session = _Session(KEYS)
+    result = modSync.sync_layer(session, store, "Parcels", source, LAYER, SETTINGS)
+    assert (result.adds, result.updates, result.deletes, result.failed) == (1, 1, 1, 0)
+
+    adds = [json.loads(edit["adds"]) for edit in session.edits if "adds" in edit]
+    updates = [json.loads(edit["updates"]) for edit in session.edits if "updates" in edit]
+    deletes = [edit["deletes"] for edit in session.edits if "deletes" in edit]
+    assert adds == [[{"attributes": {KEYFIELD: "P11", "OWNER": "Kelly"}, "geometry": {"x": 100009, "y": 800000, "spatialReference": {"wkid": 2249}}}]]
+    assert updates[0][0]["attributes"] == {KEYFIELD: "P2", "OWNER": "Baker Trust", "OBJECTID": 2}
+    assert deletes == ["10"]
+
+    # The snapshot now matches the source
+    session = _Session(KEYS[:9] + ["P11"])
+    result = modSync.sync_layer(session, store, "Parcels", source, LAYER, SETTINGS)
+    assert (result.adds, result.updates, result.deletes) == (0, 0, 0)
+
+
+def test_inserted_row_already_hosted_is_updated(store, source):
+    # An earlier sync added P11 and stopped before its snapshot was saved
+    write_source(source, ROWS + [("P11", "Kelly")])
+    session = _Session(KEYS + ["P11"])
+    result = modSync.sync_layer(session, store, "Parcels", source, LAYER, SETTINGS)
+    assert (result.adds, result.updates) == (0, 1)
+    assert json.loads(session.edits[0]["updates"])[0]["attributes"]["OBJECTID"] == 11
+
+
+def test_schema_change_needs_overwrite(store, source):
+    with open(source, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["OBJECTID", KEYFIELD, "OWNER", "ZONE", "SHAPE@JSON"])
+        writer.writerow([1, "P1", "Adams", "R1", json.dumps({"x": 1, "y": 1})])
+    assert modSync.sync_layer(_Session(["P1"]), store, "Parcels", source, LAYER, SETTINGS) is None
+
+
+def test_most_rows_changed_needs_overwrite(store, source):
+    write_source(source, [(key, owner + " Trust") for key, owner in ROWS[:6]] + ROWS[6:])
+    assert modSync.sync_layer(_Session(KEYS), store, "Parcels", source, LAYER, SETTINGS) is None
+
+
+def test_duplicate_keys_need_overwrite(store, source):
+    write_source(source, [ROWS[0], ("P1", "Baker")] + ROWS[2:])
+    assert modSync.sync_layer(_Session([]), store, "Parcels", source, LAYER, SETTINGS) is None
@@ -0,0 +1,105 @@
+# ---------------------------------------------------------------------------
+# test_upload.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of the multipart SD upload (modUpload): the part list is checked before the commit, lost parts
+# are sent again, and an upload that can not be resumed starts over.
+#---------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+import modUpload
+
+
+PART_SIZE = 1024
+
+
+class _Item(object):
+    id = "sd1"
+    owner = "easton_gis"
+
+
+class _Session(object):
+    # Keeps the parts received.  lose holds part numbers the portal drops once, parts_error is raised by the
+    # first part list request.
+    def __init__(self, lose=(), parts_error=None):
+        self.parts = {}
+        self.lose = set(lose)
+        self.parts_error = parts_error
+        self.actions = []
+
+    def request(self, path, params=None, method="POST", files=None):
+        action = path.rsplit("/", 1)[-1]
+        self.actions.append(action)
+        if action == "update":
+            self.parts = {}
+        elif action == "addPart":
+            num = int(params["partNum"])
+            if num in self.lose:
+                self.lose.discard(num)
+            else:
+                self.parts[num] = files["file"][1]
+        elif action == "parts":
+            if self.parts_error is not None:
+                error, self.parts_error = self.parts_error, None
+                raise error
+            return {"parts": sorted(self.parts)}
+        elif action == "status":
+            return {"status": "completed"}
+        return {"success": True}
+
+
+@pytest.fixture
+def sd_file(tmpdir):
+    path = os.path.join(str(tmpdir), "Parcels.sd")
+    with open(path, "wb") as f:
+        f.write(os.urandom(PART_SIZE * 3 + 100))
+    return path
+
+
+def received(session):
+    return b"".join(session.parts[num] for num in sorted(session.parts))
+
+
+def test_upload_commits_all_parts(sd_file):
+    session = _Session()
+    assert modUpload.upload_sd(session, _Item(), sd_file, PART_SIZE, workers=2)
+    with open(sd_file, "rb") as f:
+        assert received(session) == f.read()
+    assert session.actions[-2:] == ["commit", "status"]
+    assert not os.path.exists(sd_file + ".upload.json")
+
+
+def test_lost_parts_sent_again_before_commit(sd_file):
+    session = _Session(lose=[2])
+    assert modUpload.upload_sd(session, _Item(), sd_file, PART_SIZE, workers=2)
+    assert sorted(session.parts) == [1, 2, 3, 4]
+    assert session.actions.count("addPart") == 5
+
+
+def test_parts_still_missing_not_committed(sd_file):
+    class _Losing(_Session):
+        def request(self, path, params=None, method="POST", files=None):
+            if path.endswith("/addPart") and int(params["partNum"]) == 3:
+                self.actions.append("addPart")
+                return {"success": True}
+            return _Session.request(self, path, params, method, files)
+
+    session = _Losing()
+    assert not modUpload.upload_sd(session, _Item(), sd_file, PART_SIZE, workers=2)
+    assert "commit" not in session.actions
+    # The journal stays, the next run resumes from the parts the portal has
+    assert os.path.exists(sd_file + ".upload.json")
+
+
+def test_resume_falls_back_on_request_errors(sd_file):
+    journal = modUpload.UploadJournal(sd_file, _Item.id, PART_SIZE)
+    journal.commit_part(1, "0" * 64)
+    session = _Session(parts_error=ConnectionResetError("reset"))
+    assert modUpload.upload_sd(session, _Item(), sd_file, PART_SIZE, workers=2)
+    assert session.actions[:2] == ["parts", "update"]
+    assert sorted(session.parts) == [1, 2, 3, 4]
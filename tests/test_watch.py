@@ -0,0 +1,51 @@
+# ---------------------------------------------------------------------------
+# test_watch.py
+# Created on: 10/18/2026
+# Town of Easton, MA
+
+# Description:
+# Tests of watch mode (modWatch.run_watch): services whose publish failed are pushed again with a
+# doubling wait, and services that succeeded are not.
+#---------------------------------------------------------------------------
+
+import modFleet
+import modWatch
+
+
+class _Pool(object):
+    def __init__(self, workers):
+        pass
+
+    def warm(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_failed_services_retried_with_backoff(monkeypatch):
+    clock = [1000.0]
+    pushes = []
+
+    def run_fleet(services, tempdir, stage_workers, io_workers, **kwargs):
+        names = [settings["servicename"] for settings in services]
+        pushes.append((clock[0], names))
+        # Parcels fails on its first two pushes, Roads always publishes
+        failing = len([push for push in pushes if "Parcels" in push[1]]) <= 2
+        return [modFleet.ServiceResult(name, "failed" if name == "Parcels" and failing else "published", 0, 0, "") for name in names]
+
+    def sleep(seconds):
+        clock[0] += seconds
+        if clock[0] > 1200:
+            raise KeyboardInterrupt()
+
+    monkeypatch.setattr(modWatch.modStaging, "StagingPool", _Pool)
+    monkeypatch.setattr(modWatch, "service_paths", lambda settings, pool=None: [])
+    monkeypatch.setattr(modWatch.modFleet, "run_fleet", run_fleet)
+    monkeypatch.setattr(modWatch.time, "time", lambda: clock[0])
+    monkeypatch.setattr(modWatch.time, "sleep", sleep)
+
+    services = [{"servicename": "Parcels"}, {"servicename": "Roads"}]
+    modWatch.run_watch([], "", services, "", None, interval=5, push_all=True)
+
+    assert pushes == [(1000.0, ["Parcels", "Roads"]), (1005.0, ["Parcels"]), (1015.0, ["Parcels"])]